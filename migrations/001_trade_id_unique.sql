@@ -0,0 +1,14 @@
+-- Finished trades are upserted on trade_id (src/handlers/db_handler.py), so
+-- re-sending a batch after a restart never duplicates rows. The upsert needs
+-- a unique trade_id column on the signals table.
+--
+-- Run once in the Supabase SQL editor before deploying the spool writer.
+
+alter table "signals-data-20" add column if not exists trade_id text;
+
+-- Rows written before trade_id existed get a synthetic id so the index can be built.
+update "signals-data-20"
+set trade_id = symbol || '_legacy_' || gen_random_uuid()::text
+where trade_id is null;
+
+create unique index if not exists "signals-data-20_trade_id_key" on "signals-data-20" (trade_id);
@@ -0,0 +1,22 @@
+"""
+Backtest package
+Replays recorded market data through the detector and the trade state
+machine on a simulated clock.
+"""
+
+from .engine import Backtest, BacktestParams
+from .sinks import MemorySink
+from .sources import Frame, load_frames, read_frames, read_klines
+from .stats import summarize, write_ledger
+
+__all__ = [
+    'Backtest',
+    'BacktestParams',
+    'MemorySink',
+    'Frame',
+    'load_frames',
+    'read_frames',
+    'read_klines',
+    'summarize',
+    'write_ledger'
+]
@@ -0,0 +1,62 @@
+"""
+Replay recorded data through the detector and trade logic.
+
+    cd src
+    python -m backtest data/frames.jsonl --ledger ledger.csv
+    python -m backtest data/recordings
+    python -m backtest klines/*.csv --threshold 15 --tp 0.03 0.06 0.09 0.12
+"""
+
+import argparse
+import json
+import time
+
+from backtest.engine import Backtest, BacktestParams
+from backtest.sinks import MemorySink
+from backtest.sources import load_frames
+from backtest.stats import summarize, write_ledger
+
+
+def parse_args(argv=None):
+    defaults = BacktestParams()
+    parser = argparse.ArgumentParser(prog='python -m backtest', description=__doc__.splitlines()[1])
+    parser.add_argument('paths', nargs='+', help='recorder directory, .jsonl[.gz] miniTicker frames or kline .csv/.parquet files')
+    parser.add_argument('--threshold', type=float, default=defaults.threshold)
+    parser.add_argument('--window', type=float, default=defaults.time_window, help='TIME_WINDOW in seconds')
+    parser.add_argument('--detector', default=defaults.detector)
+    parser.add_argument('--tp', type=float, nargs='+', default=defaults.tp_levels, help='TP_LEVELS')
+    parser.add_argument('--sl', type=float, nargs=2, default=defaults.sl_levels, help='SL_LEVELS')
+    parser.add_argument('--min-volume', type=float, default=defaults.min_volume)
+    parser.add_argument('--max-volume', type=float, default=defaults.max_volume)
+    parser.add_argument('--ledger', help='write closed trades to this .csv/.jsonl file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    params = BacktestParams(
+        threshold=args.threshold,
+        time_window=args.window,
+        detector=args.detector,
+        tp_levels=tuple(args.tp),
+        sl_levels=tuple(args.sl),
+        min_volume=args.min_volume,
+        max_volume=args.max_volume,
+    )
+
+    started = time.perf_counter()
+    engine = Backtest(params, MemorySink(keep=False))
+    ledger = engine.run(load_frames(args.paths))
+    elapsed = time.perf_counter() - started
+
+    if args.ledger:
+        write_ledger(ledger, args.ledger)
+
+    counters = engine.counters
+    print(f"Replayed {counters['frames']} frames ({counters['ticks']} ticks) in {elapsed:.1f}s")
+    print(f"Signals: {counters['signals']} ({counters['filtered']} filtered by symbol/volume)")
+    print(json.dumps(summarize(ledger), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from backtest.sinks import MemorySink
+from models.trade import Trade
+from utils.detector import create_detector
+from utils.price_history import PriceHistory
+from utils.timer_wheel import TimerWheel
+from config.settings import (
+    THRESHOLD, TIME_WINDOW, DETECTOR, TP_LEVELS, SL_LEVELS, MIN_VOLUME, MAX_VOLUME
+)
+
+
+@dataclass(slots=True)
+class BacktestParams:
+    threshold: float = THRESHOLD
+    time_window: float = TIME_WINDOW
+    detector: str = DETECTOR
+    tp_levels: tuple = tuple(TP_LEVELS)
+    sl_levels: tuple = tuple(SL_LEVELS)
+    min_volume: float = MIN_VOLUME
+    max_volume: float = MAX_VOLUME
+    history_capacity: int = field(default=0)
+
+    def __post_init__(self):
+        if not self.history_capacity:
+            self.history_capacity = int(self.time_window) + 60
+
+
+class Backtest:
+    """
+    Replays Frames through the live detection and trade logic.
+
+    The clock is the frame time, so a run is deterministic and only bound by
+    the CPU. Signals open trades at the detection price (the live path adds
+    the Telegram round trip on top); TP/SL checks use Trade.check, timeouts
+    come from a TimerWheel advanced with the frames and every side effect goes
+    to ``sink``.
+    """
+
+    def __init__(self, params=None, sink=None):
+        self.params = params or BacktestParams()
+        self.sink = sink if sink is not None else MemorySink()
+
+        p = self.params
+        self.history = PriceHistory(p.time_window, p.history_capacity)
+        self.detector = create_detector(p.detector, self.history, p.threshold)
+        self.timeouts = None
+
+        self.active_trades = {}
+        self.trades_by_symbol = {}
+        self.last_prices = {}
+        self.ledger = []
+        self.now = None
+        self.counters = {'frames': 0, 'ticks': 0, 'signals': 0, 'filtered': 0}
+
+    def preload(self, symbols):
+        """
+        Registers ``symbols`` on a fresh engine so that history row i holds
+        symbols[i]; Frames built against that table can then carry ``rows``.
+        """
+        for i, symbol in enumerate(symbols):
+            self.detector.add(symbol)
+            if self.history.row(symbol) != i:
+                raise ValueError("preload() must be called before any frame is replayed")
+
+    def _rows(self, symbols):
+        index = self.history.index
+        rows = np.empty(len(symbols), dtype=np.int64)
+        for i, symbol in enumerate(symbols):
+            row = index.get(symbol)
+            if row is None:
+                self.detector.add(symbol)
+                row = index[symbol]
+            rows[i] = row
+        return rows
+
+    def _close(self, trade, result):
+        if result is not None:
+            self.sink.update(trade, result)
+        if trade.active:
+            return
+
+        del self.active_trades[trade.trade_id]
+        self.timeouts.cancel(trade.trade_id)
+        trades = self.trades_by_symbol[trade.symbol]
+        del trades[trade.trade_id]
+        if not trades:
+            del self.trades_by_symbol[trade.symbol]
+
+        if trade.close_time and trade.close_price:
+            self.sink.insert(trade)
+            self.ledger.append(trade)
+
+    def _expire(self, now):
+        for trade_id in self.timeouts.advance(now):
+            trade = self.active_trades[trade_id]
+            price = self.last_prices.get(trade.symbol, trade.entry_price)
+            self._close(trade, trade.expire(price, now))
+
+    def _open(self, symbol, percentage_change, price, volume, now):
+        p = self.params
+        self.counters['signals'] += 1
+        if not symbol.endswith('USDT') or not p.min_volume <= volume <= p.max_volume:
+            self.counters['filtered'] += 1
+            return
+
+        message_id = self.sink.alert(symbol, percentage_change, price, volume, now)
+        trade = Trade.open(
+            symbol, percentage_change, price, message_id, volume, now, p.tp_levels, p.sl_levels
+        )
+        self.sink.order({
+            "symbol": symbol,
+            "direction": trade.direction.name,
+            "volume": volume,
+            "price": trade.entry_price,
+            "signal_time": now
+        })
+
+        self.active_trades[trade.trade_id] = trade
+        self.trades_by_symbol.setdefault(symbol, {})[trade.trade_id] = trade
+        self.timeouts.schedule(trade.trade_id, now + p.time_window)
+
+    def step(self, frame):
+        now = frame.time
+        if self.timeouts is None:
+            self.timeouts = TimerWheel(tick=1.0, now=now)
+        self.now = now
+        self.counters['frames'] += 1
+        self.counters['ticks'] += len(frame.symbols)
+
+        self._expire(now)
+
+        rows = frame.rows if frame.rows is not None else self._rows(frame.symbols)
+        closes = frame.closes
+        positions, changes = self.detector.update_batch(rows, now, closes)
+
+        if self.trades_by_symbol:
+            index = self.history.index
+            frame_position = dict(zip(rows.tolist(), range(len(rows))))
+            for symbol in list(self.trades_by_symbol):
+                i = frame_position.get(index[symbol])
+                if i is None:
+                    continue
+                price = float(closes[i])
+                self.last_prices[symbol] = price
+                for trade in list(self.trades_by_symbol[symbol].values()):
+                    self._close(trade, trade.check(price, now))
+
+        for i, percentage_change in zip(positions.tolist(), changes.tolist()):
+            symbol = frame.symbols[i]
+            self.detector.reset(symbol)
+            self._open(symbol, percentage_change, float(closes[i]), float(frame.volumes[i]), now)
+
+    def run(self, frames, close_open=True):
+        """
+        Replays ``frames`` and returns the ledger of closed trades. With
+        ``close_open`` trades still running at the end of the data are closed
+        as TIME at their last price.
+        """
+        for frame in frames:
+            self.step(frame)
+
+        if close_open:
+            for trade in list(self.active_trades.values()):
+                price = self.last_prices.get(trade.symbol, trade.entry_price)
+                result = trade.expire(price, self.now)
+                self._close(trade, result)
+
+        return self.ledger
@@ -0,0 +1,35 @@
+class MemorySink:
+    """
+    In-memory stand-in for Telegram, the order engine and the database.
+
+    The replay engine reports every side effect the live handlers would
+    perform here instead, so a run can be inspected afterwards.
+    """
+
+    def __init__(self, keep=True):
+        self.keep = keep
+        self.alerts = []
+        self.orders = []
+        self.updates = []
+        self.records = []
+        self._message_id = 0
+
+    def alert(self, symbol, percentage_change, price, volume, now):
+        """Signal alert; returns a fake message id (alert_handler returns a future of one)."""
+        self._message_id += 1
+        if self.keep:
+            self.alerts.append((now, symbol, percentage_change, price, volume))
+        return self._message_id
+
+    def order(self, signal_data):
+        if self.keep:
+            self.orders.append(signal_data)
+
+    def update(self, trade, result):
+        """TP/SL/TIME reply to the original alert."""
+        if self.keep:
+            self.updates.append((trade.close_time, trade.trade_id, result))
+
+    def insert(self, trade):
+        if self.keep:
+            self.records.append(trade.to_record())
@@ -0,0 +1,206 @@
+import gzip
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from utils.recorder import list_segments, load_segment, load_symbols
+
+# One market snapshot: ``symbols`` is a sequence of names aligned with the
+# ``closes`` and ``volumes`` (24h quote volume) arrays. ``rows`` optionally
+# holds the history rows of those symbols (see Backtest.preload).
+Frame = namedtuple('Frame', ['time', 'symbols', 'closes', 'volumes', 'rows'], defaults=(None,))
+
+DAY = 24 * 60 * 60
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt')
+    return open(path)
+
+
+def read_frames(path):
+    """
+    Yields Frames from a JSONL file of recorded ``!miniTicker@arr`` messages.
+
+    Each line is either the combined-stream message (``{"stream", "data"}``)
+    or the bare ticker list. The frame time is the latest event time (``E``)
+    among its tickers.
+    """
+    with _open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+
+            msg = json.loads(line)
+            tickers = msg.get('data') if isinstance(msg, dict) else msg
+            if not isinstance(tickers, list):
+                continue
+
+            symbols = []
+            closes = []
+            volumes = []
+            event_time = 0
+
+            for ticker in tickers:
+                try:
+                    if ticker.get('e', '24hrMiniTicker') != '24hrMiniTicker':
+                        continue
+                    close = float(ticker['c'])
+                    volume = float(ticker.get('q') or 0.0)
+                    event_time = max(event_time, ticker.get('E', 0))
+                except (KeyError, TypeError, ValueError, AttributeError):
+                    continue
+                symbols.append(ticker['s'])
+                closes.append(close)
+                volumes.append(volume)
+
+            if symbols and event_time:
+                yield Frame(
+                    event_time / 1000,
+                    symbols,
+                    np.array(closes, dtype=np.float64),
+                    np.array(volumes, dtype=np.float64),
+                )
+
+
+def _kline_symbol(path):
+    """BTCUSDT-1m-2024-01.csv -> BTCUSDT (Binance data dump naming)."""
+    return os.path.basename(path).split('-')[0].split('.')[0].upper()
+
+
+def _kline_columns(path):
+    """Returns (close_times, closes, quote_volumes) of one kline file."""
+    if path.endswith('.parquet'):
+        try:
+            import pandas as pd
+        except ImportError:
+            raise RuntimeError("Reading Parquet klines requires pandas and pyarrow")
+        df = pd.read_parquet(path, columns=['close_time', 'close', 'quote_volume'])
+        return (
+            df['close_time'].to_numpy(dtype=np.float64),
+            df['close'].to_numpy(dtype=np.float64),
+            df['quote_volume'].to_numpy(dtype=np.float64),
+        )
+
+    with _open(path) as f:
+        first = f.readline()
+    skiprows = 0 if first[:1].isdigit() else 1
+
+    # open_time, open, high, low, close, volume, close_time, quote_volume, ...
+    data = np.loadtxt(path, delimiter=',', skiprows=skiprows, usecols=(4, 6, 7), ndmin=2)
+    return data[:, 1], data[:, 0], data[:, 2]
+
+
+def read_klines(paths):
+    """
+    Merges per-symbol kline files (CSV or Parquet) into time-ordered Frames.
+
+    Every kline becomes one tick at its close time with its close price. The
+    volume is the rolling 24h quote volume, the same figure !miniTicker
+    reports in ``q``.
+    """
+    times = []
+    ids = []
+    closes = []
+    volumes = []
+    names = []
+
+    for path in paths:
+        close_times, close, quote_volume = _kline_columns(path)
+        if not close_times.size:
+            continue
+
+        # Binance dumps switched from milliseconds to microseconds.
+        scale = 1e6 if close_times[0] > 1e14 else 1e3
+        t = np.floor(close_times / scale)
+
+        order = np.argsort(t, kind='stable')
+        t = t[order]
+        cumulative = np.concatenate(([0.0], np.cumsum(quote_volume[order])))
+        start = np.searchsorted(t, t - DAY, side='right')
+
+        symbol = _kline_symbol(path)
+        if symbol not in names:
+            names.append(symbol)
+
+        times.append(t)
+        ids.append(np.full(t.size, names.index(symbol), dtype=np.int64))
+        closes.append(close[order])
+        volumes.append(cumulative[1:] - cumulative[start])
+
+    if not times:
+        return
+
+    times = np.concatenate(times)
+    ids = np.concatenate(ids)
+    closes = np.concatenate(closes)
+    volumes = np.concatenate(volumes)
+
+    order = np.lexsort((ids, times))
+    times = times[order]
+    ids = ids[order]
+    closes = closes[order]
+    volumes = volumes[order]
+
+    names = np.array(names, dtype=object)
+    bounds = np.flatnonzero(np.diff(times)) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [times.size]))
+
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        yield Frame(
+            float(times[start]),
+            names[ids[start:end]].tolist(),
+            closes[start:end],
+            volumes[start:end],
+        )
+
+
+def read_recording(directory):
+    """Yields Frames from a TickRecorder directory, one per received frame."""
+    names = np.array(load_symbols(directory), dtype=object)
+
+    for segment in list_segments(directory):
+        columns = load_segment(segment)
+        times = columns['time']
+        if not times.size:
+            continue
+
+        bounds = np.flatnonzero(np.diff(times)) + 1
+        starts = np.concatenate(([0], bounds)).tolist()
+        ends = np.concatenate((bounds, [times.size])).tolist()
+        for start, end in zip(starts, ends):
+            yield Frame(
+                float(times[start]),
+                names[columns['symbol'][start:end]].tolist(),
+                np.asarray(columns['close'][start:end]),
+                np.asarray(columns['volume'][start:end]),
+            )
+
+
+def load_frames(paths):
+    """
+    Picks the reader from the path: a recorder directory, .jsonl[.gz] frames
+    or kline .csv/.parquet files.
+    """
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    recordings = [p for p in paths if os.path.isdir(p)]
+    frame_files = [p for p in paths if p.endswith(('.jsonl', '.jsonl.gz'))]
+    kline_files = [p for p in paths if p not in frame_files and p not in recordings]
+
+    if sum(1 for group in (recordings, frame_files, kline_files) if group) > 1:
+        raise ValueError("Mixing recordings, recorded frames and kline files is not supported")
+
+    if kline_files:
+        yield from read_klines(kline_files)
+        return
+
+    for path in recordings:
+        yield from read_recording(path)
+
+    for path in frame_files:
+        yield from read_frames(path)
@@ -0,0 +1,54 @@
+import csv
+import json
+
+from models.trade import TradeResult
+
+
+def summarize(trades):
+    """Win rate and profit statistics (profits are per-trade percentages)."""
+    profits = [trade.profit for trade in trades]
+    n = len(profits)
+    results = {result.name: 0 for result in TradeResult}
+    for trade in trades:
+        results[trade.result.name] += 1
+
+    if not n:
+        return {'trades': 0, 'results': results}
+
+    wins = sum(1 for profit in profits if profit > 0)
+    cumulative = 0.0
+    peak = 0.0
+    max_drawdown = 0.0
+    for profit in profits:
+        cumulative += profit
+        peak = max(peak, cumulative)
+        max_drawdown = max(max_drawdown, peak - cumulative)
+
+    return {
+        'trades': n,
+        'wins': wins,
+        'losses': n - wins,
+        'win_rate': wins / n * 100,
+        'total_profit': sum(profits),
+        'avg_profit': sum(profits) / n,
+        'best': max(profits),
+        'worst': min(profits),
+        'max_drawdown': max_drawdown,
+        'avg_duration': sum(t.close_time - t.start_time for t in trades) / n,
+        'results': results,
+    }
+
+
+def write_ledger(trades, path):
+    """Writes the trade records as CSV, or as JSON lines for a .jsonl path."""
+    records = [trade.to_record() for trade in trades]
+
+    with open(path, 'w', newline='') as f:
+        if path.endswith('.jsonl'):
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+            return
+
+        writer = csv.DictWriter(f, fieldnames=list(records[0]) if records else ['trade_id'])
+        writer.writeheader()
+        writer.writerows(records)
@@ -0,0 +1,290 @@
+"""
+Parallel parameter sweep over packed market data.
+
+    cd src
+    python -m backtest.sweep pack klines/*.csv --out data/market
+    python -m backtest.sweep run data/market -p threshold=10,15,20 -p time_window=3600,7800 \\
+        -p tp_levels=0.03/0.06/0.09/0.12,0.05/0.10/0.15/0.20 -p sl_levels=0.03/0.04,0.04/0.05
+    python -m backtest.sweep run data/market --random 500 -p threshold=8..30 -p min_volume=0..5e7
+
+Values are comma-separated alternatives, ``/`` separates the items of a
+TP/SL ladder and ``lo..hi`` is a uniform range (``lo..hi:step`` expands to a
+list, so it also works in grid mode).
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, fields
+
+import numpy as np
+
+from backtest.engine import Backtest, BacktestParams
+from backtest.sinks import MemorySink
+from backtest.sources import Frame, load_frames
+from backtest.stats import summarize
+
+COLUMNS = ('times', 'offsets', 'ids', 'closes', 'volumes')
+DTYPES = {'times': np.float64, 'offsets': np.int64, 'ids': np.int32, 'closes': np.float64, 'volumes': np.float64}
+METRICS = ('total_profit', 'avg_profit', 'win_rate', 'max_drawdown')
+
+
+def pack(frames, directory, chunk=1_000_000):
+    """
+    Writes frames as flat .npy columns that workers can memory-map.
+
+    Ticks are stored back to back (``ids``, ``closes``, ``volumes``) and
+    frame i spans ``offsets[i]:offsets[i + 1]``. Columns are streamed to raw
+    files first, so the data never has to fit in memory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    raw = {name: open(os.path.join(directory, f"{name}.raw"), 'wb') for name in COLUMNS}
+    buffers = {name: [] for name in COLUMNS}
+    symbols = {}
+    ticks = 0
+    frames_written = 0
+
+    def flush():
+        for name, values in buffers.items():
+            if values:
+                np.concatenate(values).astype(DTYPES[name]).tofile(raw[name])
+                values.clear()
+
+    buffers['offsets'].append(np.zeros(1))
+    pending = 0
+    for frame in frames:
+        ids = np.fromiter(
+            (symbols.setdefault(s, len(symbols)) for s in frame.symbols), dtype=np.int32, count=len(frame.symbols)
+        )
+        ticks += ids.size
+        frames_written += 1
+        buffers['times'].append(np.array([frame.time]))
+        buffers['offsets'].append(np.array([ticks]))
+        buffers['ids'].append(ids)
+        buffers['closes'].append(np.asarray(frame.closes))
+        buffers['volumes'].append(np.asarray(frame.volumes))
+
+        pending += ids.size
+        if pending >= chunk:
+            flush()
+            pending = 0
+
+    flush()
+    for name, f in raw.items():
+        f.close()
+        raw_path = os.path.join(directory, f"{name}.raw")
+        dtype = np.dtype(DTYPES[name])
+        count = os.path.getsize(raw_path) // dtype.itemsize
+
+        target = np.lib.format.open_memmap(
+            os.path.join(directory, f"{name}.npy"), mode='w+', dtype=dtype, shape=(count,)
+        )
+        if count:
+            source = np.memmap(raw_path, dtype=dtype, mode='r', shape=(count,))
+            for start in range(0, count, chunk):
+                target[start:start + chunk] = source[start:start + chunk]
+            del source
+        target.flush()
+        del target
+        os.remove(raw_path)
+
+    with open(os.path.join(directory, 'symbols.json'), 'w') as f:
+        json.dump(sorted(symbols, key=symbols.get), f)
+
+    return frames_written, ticks
+
+
+class MarketData:
+    """Read-only, memory-mapped view of a directory written by pack()."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'symbols.json')) as f:
+            self.symbols = json.load(f)
+        self._names = np.array(self.symbols, dtype=object)
+        for name in COLUMNS:
+            setattr(self, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r'))
+
+    def __len__(self):
+        return self.times.shape[0]
+
+    def frames(self):
+        """Yields Frames whose ``rows`` match a Backtest preloaded with ``symbols``."""
+        offsets = self.offsets.tolist()
+        times = self.times.tolist()
+        for i, now in enumerate(times):
+            start, end = offsets[i], offsets[i + 1]
+            ids = self.ids[start:end]
+            yield Frame(now, self._names[ids], self.closes[start:end], self.volumes[start:end], ids)
+
+
+# Opened once per worker process by the pool initializer.
+_data = None
+
+
+def _init_worker(directory):
+    global _data
+    _data = MarketData(directory)
+
+
+def evaluate(params, data=None):
+    """Runs one backtest and returns ``(params, summary)``."""
+    if data is None:
+        data = _data
+    engine = Backtest(params, MemorySink(keep=False))
+    engine.preload(data.symbols)
+    summary = summarize(engine.run(data.frames()))
+    summary['signals'] = engine.counters['signals']
+    return params, summary
+
+
+def _parse_value(name, text):
+    if name in ('tp_levels', 'sl_levels'):
+        return tuple(float(v) for v in text.split('/'))
+    if name == 'detector':
+        return text
+    return float(text)
+
+
+def parse_space(specs):
+    """
+    ``["threshold=10,15", "time_window=600..3600"]`` -> {name: list | (lo, hi)}.
+    A ``(lo, hi)`` tuple is a continuous range (random search only).
+    """
+    names = {f.name for f in fields(BacktestParams)}
+    space = {}
+
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        if name not in names:
+            raise ValueError(f"Unknown parameter '{name}'. Options: {', '.join(sorted(names))}")
+
+        if '..' in values:
+            lo, _, hi = values.partition('..')
+            hi, _, step = hi.partition(':')
+            if step:
+                space[name] = np.arange(float(lo), float(hi) + float(step) / 2, float(step)).tolist()
+            else:
+                space[name] = (float(lo), float(hi))
+        else:
+            space[name] = [_parse_value(name, v) for v in values.split(',')]
+
+    return space
+
+
+def grid(space):
+    ranges = [name for name, values in space.items() if isinstance(values, tuple)]
+    if ranges:
+        raise ValueError(f"Ranges without a step need --random: {', '.join(ranges)}")
+
+    names = list(space)
+    for values in itertools.product(*(space[name] for name in names)):
+        yield BacktestParams(**dict(zip(names, values)))
+
+
+def sample(space, n, seed=None):
+    rng = random.Random(seed)
+    for _ in range(n):
+        values = {}
+        for name, choices in space.items():
+            if isinstance(choices, tuple):
+                values[name] = rng.uniform(*choices)
+            else:
+                values[name] = rng.choice(choices)
+        yield BacktestParams(**values)
+
+
+def sweep(directory, candidates, workers=None):
+    """Evaluates every BacktestParams in ``candidates`` across a process pool."""
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(directory,)) as pool:
+        futures = [pool.submit(evaluate, params) for params in candidates]
+        for n, future in enumerate(as_completed(futures), 1):
+            results.append(future.result())
+            if n % 50 == 0 or n == len(futures):
+                print(f"{n}/{len(futures)} runs done")
+    return results
+
+
+def rank(results, metric='total_profit', min_trades=1):
+    """Sorts results best first (lowest first for max_drawdown)."""
+    kept = [(p, s) for p, s in results if s['trades'] >= min_trades]
+    return sorted(kept, key=lambda r: r[1][metric], reverse=metric != 'max_drawdown')
+
+
+def _row(params, summary):
+    row = asdict(params)
+    row.pop('history_capacity')
+    row['tp_levels'] = '/'.join(f"{v:g}" for v in params.tp_levels)
+    row['sl_levels'] = '/'.join(f"{v:g}" for v in params.sl_levels)
+    for key in ('trades', 'signals', 'win_rate', 'total_profit', 'avg_profit', 'max_drawdown'):
+        row[key] = summary.get(key, 0)
+    return row
+
+
+def print_table(ranked, top=20):
+    header = f"{'#':>3} {'thr':>6} {'window':>7} {'tp':>23} {'sl':>10} {'min_vol':>9} {'trades':>7} {'win%':>6} {'total%':>9} {'avg%':>7} {'maxDD':>7}"
+    print(header)
+    print('-' * len(header))
+    for n, (params, summary) in enumerate(ranked[:top], 1):
+        row = _row(params, summary)
+        print(
+            f"{n:>3} {row['threshold']:>6.2f} {row['time_window']:>7.0f} {row['tp_levels']:>23} {row['sl_levels']:>10} "
+            f"{row['min_volume']:>9.3g} {row['trades']:>7} {row['win_rate']:>6.1f} {row['total_profit']:>9.2f} "
+            f"{row['avg_profit']:>7.2f} {row['max_drawdown']:>7.2f}"
+        )
+
+
+def write_results(ranked, path):
+    rows = [_row(params, summary) for params, summary in ranked]
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ['threshold'])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m backtest.sweep', description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    pack_cmd = commands.add_parser('pack', help='convert frames/klines into memory-mappable columns')
+    pack_cmd.add_argument('paths', nargs='+')
+    pack_cmd.add_argument('--out', required=True)
+
+    run_cmd = commands.add_parser('run', help='evaluate a grid or random sample of parameters')
+    run_cmd.add_argument('data', help='directory written by pack')
+    run_cmd.add_argument('-p', '--param', action='append', default=[], help='name=values (see module docs)')
+    run_cmd.add_argument('--random', type=int, help='random search with this many samples instead of a grid')
+    run_cmd.add_argument('--seed', type=int)
+    run_cmd.add_argument('--workers', type=int, help='processes (default: all cores)')
+    run_cmd.add_argument('--metric', choices=METRICS, default='total_profit')
+    run_cmd.add_argument('--min-trades', type=int, default=10)
+    run_cmd.add_argument('--top', type=int, default=20)
+    run_cmd.add_argument('--out', help='write the full ranked table as CSV')
+
+    args = parser.parse_args(argv)
+    started = time.perf_counter()
+
+    if args.command == 'pack':
+        frames, ticks = pack(load_frames(args.paths), args.out)
+        print(f"Packed {frames} frames ({ticks} ticks) into {args.out} in {time.perf_counter() - started:.1f}s")
+        return
+
+    space = parse_space(args.param)
+    candidates = list(sample(space, args.random, args.seed) if args.random else grid(space))
+    print(f"Evaluating {len(candidates)} parameter sets on {len(MarketData(args.data))} frames")
+
+    ranked = rank(sweep(args.data, candidates, args.workers), args.metric, args.min_trades)
+    print_table(ranked, args.top)
+    if args.out:
+        write_results(ranked, args.out)
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,4 @@
+"""
+Benchmarks package
+Micro-benchmarks of the hot paths on recorded or synthetic market frames.
+"""
@@ -0,0 +1,62 @@
+import gzip
+import json
+import random
+
+
+def symbol_names(symbols):
+    return [f"SYM{i:04d}USDT" for i in range(symbols)]
+
+
+def synthetic_frames(symbols=600, count=200, seed=0, spike_every=0):
+    """
+    Yields raw ``!miniTicker@arr`` messages (JSON text) shaped like Binance's:
+    every symbol in every frame, prices on a small random walk, one second
+    apart. With ``spike_every`` one random symbol jumps 30% every that many
+    frames, which is enough to fire the detector.
+    """
+    rng = random.Random(seed)
+    names = symbol_names(symbols)
+    prices = [rng.uniform(0.01, 500.0) for _ in names]
+    volumes = [rng.uniform(1e5, 1e9) for _ in names]
+    event_time = 1_700_000_000_000
+
+    for n in range(count):
+        event_time += 1000
+        if spike_every and n and n % spike_every == 0:
+            prices[rng.randrange(symbols)] *= 1.3
+        data = []
+        for i, symbol in enumerate(names):
+            prices[i] *= 1 + rng.gauss(0, 0.002)
+            price = prices[i]
+            data.append({
+                'e': '24hrMiniTicker',
+                'E': event_time,
+                's': symbol,
+                'c': f"{price:.6f}",
+                'o': f"{price * 0.98:.6f}",
+                'h': f"{price * 1.03:.6f}",
+                'l': f"{price * 0.97:.6f}",
+                'v': f"{volumes[i] / price:.2f}",
+                'q': f"{volumes[i]:.2f}",
+            })
+        yield json.dumps({'stream': '!miniTicker@arr', 'data': data}, separators=(',', ':'))
+
+
+def recorded_frames(path, limit=None):
+    """
+    Raw lines of a JSONL(.gz) file of recorded ``!miniTicker@arr`` messages;
+    bare ticker lists are wrapped into the combined-stream message.
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    frames = []
+    with opener(path, 'rt') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('['):
+                line = f'{{"stream":"!miniTicker@arr","data":{line}}}'
+            frames.append(line)
+            if limit and len(frames) >= limit:
+                break
+    return frames
@@ -0,0 +1,102 @@
+"""
+Compare frame decoding paths on recorded or synthetic miniTicker frames.
+
+    cd src
+    python -m benchmarks.decoder data/frames.jsonl
+    python -m benchmarks.decoder --symbols 600 --frames 300 --rounds 5 --json decoder.json
+
+The baseline is the pre-decoder path (json.loads, then float() per field in
+parse_mini_ticker_frame); every installed FrameDecoder backend is then timed
+decoding into a TickerBatch and extracting the same arrays.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.data import recorded_frames, synthetic_frames
+from utils.decoder import FrameDecoder, available_backends
+from utils.frames import parse_mini_ticker_frame
+
+
+def _symbol_index(frames):
+    symbols = sorted({ticker['s'] for ticker in json.loads(frames[0])['data']})
+    return {symbol: row for row, symbol in enumerate(symbols)}
+
+
+def _baseline(raw, index):
+    return parse_mini_ticker_frame(json.loads(raw)['data'], index)
+
+
+def _decoder_path(decoder):
+    def run(raw, index):
+        return parse_mini_ticker_frame(decoder.decode(raw)['data'], index)
+    return run
+
+
+def time_path(run, frames, index, rounds):
+    samples = []
+    for _ in range(rounds):
+        for raw in frames:
+            started = time.perf_counter()
+            run(raw, index)
+            samples.append(time.perf_counter() - started)
+    samples = np.array(samples)
+    return {
+        'frames_per_second': len(samples) / samples.sum(),
+        'mean_us': samples.mean() * 1e6,
+        'p50_us': np.percentile(samples, 50) * 1e6,
+        'p99_us': np.percentile(samples, 99) * 1e6,
+    }
+
+
+def check_equal(frames, index, paths):
+    """Every path must extract exactly the baseline arrays."""
+    for raw in frames:
+        expected = _baseline(raw, index)
+        for name, run in paths.items():
+            for want, got in zip(expected, run(raw, index)):
+                if not np.array_equal(want, got):
+                    raise AssertionError(f"{name} decoded a frame differently from the baseline")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.decoder', description=__doc__.splitlines()[1])
+    parser.add_argument('path', nargs='?', help='.jsonl[.gz] of recorded miniTicker messages (synthetic frames if omitted)')
+    parser.add_argument('--symbols', type=int, default=600, help='symbols per synthetic frame')
+    parser.add_argument('--frames', type=int, default=300, help='frames to generate or read')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args(argv)
+
+    if args.path:
+        frames = recorded_frames(args.path, args.frames)
+    else:
+        frames = list(synthetic_frames(args.symbols, args.frames))
+    if not frames:
+        parser.error('no frames to decode')
+    index = _symbol_index(frames)
+
+    paths = {'json.loads (current)': _baseline}
+    for backend in available_backends():
+        paths[backend] = _decoder_path(FrameDecoder(backend))
+    check_equal(frames[:20], index, paths)
+
+    results = {name: time_path(run, frames, index, args.rounds) for name, run in paths.items()}
+    base = results['json.loads (current)']['mean_us']
+
+    print(f"{len(frames)} frames x {args.rounds} rounds, {len(index)} symbols per frame")
+    print(f"{'path':<22} {'frames/s':>10} {'mean us':>10} {'p50 us':>10} {'p99 us':>10} {'speedup':>8}")
+    for name, result in results.items():
+        print(f"{name:<22} {result['frames_per_second']:>10.0f} {result['mean_us']:>10.1f} "
+              f"{result['p50_us']:>10.1f} {result['p99_us']:>10.1f} {base / result['mean_us']:>7.2f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'frames': len(frames), 'rounds': args.rounds, 'symbols': len(index), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
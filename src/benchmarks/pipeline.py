@@ -0,0 +1,277 @@
+"""
+Per-frame cost of the market stream, detection and trade hot paths.
+
+    cd src
+    python -m benchmarks.pipeline
+    python -m benchmarks.pipeline --symbols 100 500 2000 --trades 0 100 500 --out bench.json
+    python -m benchmarks.pipeline --frames-file data/frames.jsonl --trades 0 200 --mode ticker
+
+Every frame goes through what _handle_market_stream does with it: decoding,
+then the batch or per-ticker processing, including the TP/SL checks of
+check_trade_conditions. Telegram, the dispatcher, orders, the database and
+log output are replaced by counting stubs. Each case (universe size x open
+trades) runs in a fresh process, so its peak RSS and the module-level state
+of the handlers are its own. Trades that close are reopened between frames
+to keep the open-trade count constant.
+"""
+
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.data import recorded_frames, symbol_names, synthetic_frames
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class NullSink:
+    """Counts the side effects the live handlers would perform."""
+
+    def __init__(self):
+        self.signals = 0
+        self.alerts = 0
+        self.orders = 0
+        self.records = 0
+
+    async def signal(self, event):
+        self.signals += 1
+        return True
+
+    async def alert(self, result, profit, reply_to, symbol=None):
+        self.alerts += 1
+
+    async def insert(self, trade_data):
+        self.records += 1
+
+    def submit(self, signal_data):
+        self.orders += 1
+
+
+def _peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _load_handlers(sink):
+    os.environ.setdefault('BOT_TOKEN', '0:benchmark')
+    log_handler = importlib.import_module('handlers.log_handler')
+    log_handler.pipeline.stdout = False
+    log_handler.pipeline.path = None
+
+    # handlers/__init__ re-exports functions under the module names.
+    price_handler = importlib.import_module('handlers.price_handler')
+    trade_handler = importlib.import_module('handlers.trade_handler')
+    price_handler.dispatcher.submit = sink.signal
+    trade_handler.tp_sl_alert_handler = sink.alert
+    trade_handler.insert_trade = sink.insert
+    trade_handler.op_handler = sink
+    return price_handler, trade_handler
+
+
+def _prices(data):
+    if isinstance(data, list):
+        return {ticker['s']: float(ticker['c']) for ticker in data}
+    return dict(zip(data.symbols, data.closes.tolist()))
+
+
+async def _open_trades(trade_handler, target, symbols, prices, opened):
+    """Opens trades round-robin over ``symbols`` until ``target`` are open."""
+    while trade_handler.get_active_trades_count() < target:
+        symbol = symbols[opened % len(symbols)]
+        change = 25.0 if opened % 2 else -25.0
+        await trade_handler.trade_handler(symbol, change, prices[symbol], opened, 1e6)
+        opened += 1
+    return opened
+
+
+def _summary(values):
+    values = np.asarray(values, dtype=np.float64)
+    return {
+        'mean': float(values.mean()),
+        'p50': float(np.percentile(values, 50)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(values.max()),
+    }
+
+
+async def _run_case(case):
+    from utils.decoder import FrameDecoder
+
+    sink = NullSink()
+    price_handler, trade_handler = _load_handlers(sink)
+    rss_loaded = _peak_rss()
+
+    if case['frames_file']:
+        frames = itertools.cycle(recorded_frames(case['frames_file']))
+    else:
+        frames = synthetic_frames(
+            case['symbols'], case['warmup'] + case['frames'] + case['alloc_frames'] + 1,
+            seed=case['seed'], spike_every=case['spike_every']
+        )
+
+    batches = case['mode'] == 'batch'
+    decoder = FrameDecoder(case['decoder'], batches=batches)
+    detector = price_handler.detector
+
+    async def process(raw, n):
+        msg = decoder.decode(raw)
+        received_at = time.time()
+        if batches:
+            await price_handler._process_frame_batch(detector, msg['data'], received_at)
+        else:
+            await price_handler._process_tickers(detector, msg['data'], n, received_at)
+        return msg['data']
+
+    first = decoder.decode(next(frames))['data']
+    prices = _prices(first)
+    symbols = sorted(prices) if case['frames_file'] else symbol_names(case['symbols'])
+    for symbol in symbols:
+        detector.add(symbol)
+    opened = await _open_trades(trade_handler, case['trades'], symbols, prices, 0)
+
+    n = 0
+    for _ in range(case['warmup']):
+        n += 1
+        data = await process(next(frames), n)
+        if trade_handler.get_active_trades_count() < case['trades']:
+            opened = await _open_trades(trade_handler, case['trades'], symbols, _prices(data), opened)
+
+    latencies = []
+    for _ in range(case['frames']):
+        n += 1
+        raw = next(frames)
+        started = time.perf_counter()
+        data = await process(raw, n)
+        latencies.append(time.perf_counter() - started)
+        if trade_handler.get_active_trades_count() < case['trades']:
+            opened = await _open_trades(trade_handler, case['trades'], symbols, _prices(data), opened)
+
+    # Separate pass: tracing slows every allocation down.
+    peak_bytes = []
+    retained_bytes = []
+    tracemalloc.start()
+    for _ in range(case['alloc_frames']):
+        n += 1
+        raw = next(frames)
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        data = await process(raw, n)
+        current, peak = tracemalloc.get_traced_memory()
+        peak_bytes.append(peak - before)
+        retained_bytes.append(current - before)
+        if trade_handler.get_active_trades_count() < case['trades']:
+            opened = await _open_trades(trade_handler, case['trades'], symbols, _prices(data), opened)
+    tracemalloc.stop()
+
+    latencies = np.array(latencies)
+    return {
+        **case,
+        'symbols': len(symbols),
+        'decoder': decoder.backend,
+        'frames_per_second': len(latencies) / latencies.sum(),
+        'latency_us': {name: value * 1e6 for name, value in _summary(latencies).items()},
+        'alloc_peak_bytes': _summary(peak_bytes) if peak_bytes else None,
+        'alloc_retained_bytes': _summary(retained_bytes) if retained_bytes else None,
+        'peak_rss_bytes': _peak_rss(),
+        'loaded_rss_bytes': rss_loaded,
+        'open_trades': trade_handler.get_active_trades_count(),
+        'trades_opened': opened,
+        'signals': sink.signals,
+        'alerts': sink.alerts,
+        'records': sink.records,
+    }
+
+
+def run_case(case):
+    return asyncio.run(_run_case(case))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.pipeline', description=__doc__.splitlines()[1])
+    parser.add_argument('--symbols', type=int, nargs='+', default=[100, 500, 2000], help='synthetic universe sizes')
+    parser.add_argument('--trades', type=int, nargs='+', default=[0, 100, 500], help='open-trade counts')
+    parser.add_argument('--frames', type=int, default=300, help='timed frames per case')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--alloc-frames', type=int, default=50, help='frames traced with tracemalloc (0 to skip)')
+    parser.add_argument('--frames-file', help='.jsonl[.gz] of recorded miniTicker messages instead of synthetic frames')
+    parser.add_argument('--mode', choices=('batch', 'ticker'), default='batch', help='BATCH_MODE path or per-ticker path')
+    parser.add_argument('--decoder', default='auto', help='FrameDecoder backend')
+    parser.add_argument('--spike-every', type=int, default=50, help='synthetic 30%% jump every N frames (0: none)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--inline', action='store_true', help='run the cases in this process (shared state, shared RSS)')
+    parser.add_argument('--out', help='JSON results file (default: data/benchmarks/pipeline-<time>.json)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    universes = [None] if args.frames_file else args.symbols
+    cases = [
+        {
+            'symbols': symbols,
+            'trades': trades,
+            'frames': args.frames,
+            'warmup': args.warmup,
+            'alloc_frames': args.alloc_frames,
+            'frames_file': args.frames_file,
+            'mode': args.mode,
+            'decoder': args.decoder,
+            'spike_every': args.spike_every,
+            'seed': args.seed,
+        }
+        for symbols in universes
+        for trades in args.trades
+    ]
+
+    results = []
+    print(f"{'symbols':>8} {'trades':>7} {'frames/s':>10} {'p50 us':>10} {'p99 us':>10} "
+          f"{'alloc KB':>9} {'RSS MB':>8} {'signals':>8}")
+    for case in cases:
+        if args.inline:
+            result = run_case(case)
+        else:
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                result = pool.submit(run_case, case).result()
+        results.append(result)
+
+        alloc = result['alloc_peak_bytes']['p50'] / 1024 if result['alloc_peak_bytes'] else float('nan')
+        rss = result['peak_rss_bytes'] / 2 ** 20 if result['peak_rss_bytes'] else float('nan')
+        print(f"{result['symbols']:>8} {result['trades']:>7} {result['frames_per_second']:>10.0f} "
+              f"{result['latency_us']['p50']:>10.1f} {result['latency_us']['p99']:>10.1f} "
+              f"{alloc:>9.1f} {rss:>8.1f} {result['signals']:>8}")
+
+    created = datetime.now(timezone.utc)
+    report = {
+        'created': created.isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'cases': results,
+    }
+    out = args.out or os.path.join('data', 'benchmarks', f"pipeline-{created:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {out}")
+
+
+if __name__ == '__main__':
+    main()
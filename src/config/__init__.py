@@ -6,19 +6,85 @@ Contains all configuration settings and environment variables.
 from .settings import *
 
 __all__ = [
+    'DATA_DIR',
     'API_KEY',
     'API_SECRET', 
     'DEMO_API_KEY',
     'DEMO_API_SECRET',
     'TESTNET',
+    'SYMBOL_FILTERS_TTL',
+    'SYMBOL_FILTERS_PATH',
+    'PREARM_SYMBOLS',
+    'PREARM_CONCURRENCY',
+    'BINANCE_FUTURES_URL',
+    'BINANCE_FUTURES_WS_URL',
+    'REST_WEIGHT_LIMIT',
+    'REST_WEIGHT_SAFETY',
+    'REST_MAX_CONCURRENCY',
+    'REST_RETRIES',
     'BOT_TOKEN',
     'CHANNEL_ID',
+    'GROUP_ID',
+    'TELEGRAM_API_URL',
+    'TELEGRAM_GLOBAL_RATE',
+    'TELEGRAM_CHAT_RATE',
+    'TELEGRAM_CHAT_BURST',
+    'TELEGRAM_RETRIES',
+    'TELEGRAM_CONCURRENCY',
     'SUPABASE_URL',
     'SUPABASE_KEY',
+    'DB_BACKEND',
+    'DB_TABLE',
+    'DB_SPOOL_PATH',
+    'DB_SQLITE_PATH',
+    'DB_BATCH_SIZE',
+    'DB_FLUSH_INTERVAL',
+    'DB_MAX_BACKOFF',
     'MIN_VOLUME',
     'MAX_VOLUME',
+    'UNIVERSE_REFRESH_INTERVAL',
     'THRESHOLD',
     'TIME_WINDOW',
+    'HISTORY_CAPACITY',
+    'DETECTOR',
+    'BATCH_MODE',
+    'SCAN_WORKERS',
+    'SCAN_RING_SIZE',
+    'STREAM_STALE_AFTER',
+    'STREAM_STANDBY',
+    'STREAM_BACKOFF_BASE',
+    'STREAM_BACKOFF_MAX',
+    'STREAM_RESTART_DELAY',
+    'FRAME_DECODER',
+    'FAST_FEED_ENABLED',
+    'FAST_FEED_STREAM',
+    'FAST_FEED_ARM_RATIO',
+    'FAST_FEED_MAX_SYMBOLS',
+    'FAST_FEED_LINGER',
+    'FAST_FEED_BATCH',
+    'RECORDER_ENABLED',
+    'RECORDER_PATH',
+    'RECORDER_SEGMENT_SECONDS',
+    'RECORDER_COMPRESS',
+    'RECORDER_QUEUE_SIZE',
+    'SNAPSHOT_PATH',
+    'SNAPSHOT_INTERVAL',
+    'HISTORY_BACKFILL',
+    'DISPATCH_QUEUE_SIZE',
+    'DISPATCH_WORKERS',
+    'DISPATCH_FULL_POLICY',
+    'HEALTH_MAX_STALENESS',
+    'HEALTH_MAX_QUEUE_DEPTH',
+    'HEALTH_STARTUP_GRACE',
+    'LOG_LEVEL',
+    'LOG_STDOUT',
+    'LOG_PATH',
+    'LOG_MAX_BYTES',
+    'LOG_BACKUPS',
+    'LOG_BUFFER_SIZE',
+    'LOG_RATE_LIMIT',
+    'LOG_RATE_WINDOW',
+    'LOG_FLUSH_INTERVAL',
     'TP_LEVELS',
     'SL_LEVELS'
 ]
\ No newline at end of file
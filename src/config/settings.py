@@ -3,29 +3,117 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# PATHS
+# Runtime state (spool, snapshots, logs...) lives here whatever the working directory.
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"))
+
 # BINANCE
 API_KEY = os.getenv("API_KEY")
 API_SECRET = os.getenv("API_SECRET")
 DEMO_API_KEY = os.getenv("DEMO_API_KEY")
 DEMO_API_SECRET = os.getenv("DEMO_API_SECRET")
 TESTNET = True
+SYMBOL_FILTERS_TTL = 6 * 60 * 60
+SYMBOL_FILTERS_PATH = os.path.join(DATA_DIR, "symbol_filters.json")
+PREARM_SYMBOLS = False  # set isolated margin + leverage for every filtered coin after each refresh
+PREARM_CONCURRENCY = 5
+BINANCE_FUTURES_URL = os.getenv("BINANCE_FUTURES_URL")  # override the futures REST base URL (e.g. a local fake server)
+BINANCE_FUTURES_WS_URL = os.getenv("BINANCE_FUTURES_WS_URL", "wss://fstream.binance.com")
+
+# REST
+REST_WEIGHT_LIMIT = 2400  # futures request weight per minute
+REST_WEIGHT_SAFETY = 0.8  # share of the limit the scheduler lets itself use
+REST_MAX_CONCURRENCY = 20
+REST_RETRIES = 3  # retries after a 429
 
 # TELEGRAM
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 CHANNEL_ID = os.getenv("CHANNEL_ID")
 GROUP_ID = os.getenv("GROUP_ID")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org/bot")  # e.g. a local fake Bot API
+TELEGRAM_GLOBAL_RATE = 30  # messages per second across all chats
+TELEGRAM_CHAT_RATE = 20 / 60  # messages per second per group/channel
+TELEGRAM_CHAT_BURST = 3
+TELEGRAM_RETRIES = 3  # retries after network errors (429s are always retried)
+TELEGRAM_CONCURRENCY = 4
 
 # SUPABASE
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
+# DATABASE
+DB_BACKEND = os.getenv("DB_BACKEND", "supabase")  # "supabase" | "sqlite"
+DB_TABLE = "signals-data-20"
+DB_SPOOL_PATH = os.path.join(DATA_DIR, "trade_spool.db")
+DB_SQLITE_PATH = os.path.join(DATA_DIR, "trades.db")
+DB_BATCH_SIZE = 20
+DB_FLUSH_INTERVAL = 5
+DB_MAX_BACKOFF = 60
+
 # FILTER
 MIN_VOLUME = 0
 MAX_VOLUME = 1_000_000 * 1_000_000
+UNIVERSE_REFRESH_INTERVAL = 15 * 60  # seconds between volume-filter runs (applied without reconnecting)
 
 # SCAN
 THRESHOLD = 20
 TIME_WINDOW = 7800
+HISTORY_CAPACITY = TIME_WINDOW + 60  # !miniTicker@arr pushes at most once per second
+DETECTOR = "minmax"  # "minmax" (window extremes) | "oldest" (oldest sample in window)
+BATCH_MODE = True  # evaluate each !miniTicker@arr frame with vectorized array operations
+
+# SHARDING
+SCAN_WORKERS = 0  # >0: detection and TP/SL trigger checks run in this many processes, sharded by symbol
+SCAN_RING_SIZE = 1 << 16  # ticks per worker shared-memory ring
+
+# STREAM
+STREAM_STALE_AFTER = 10  # seconds without a frame before a connection is recycled
+STREAM_STANDBY = False  # keep a second connection open; frames are deduplicated by event time
+STREAM_BACKOFF_BASE = 1
+STREAM_BACKOFF_MAX = 30
+STREAM_RESTART_DELAY = 60  # seconds before frame processing restarts after an unexpected error
+FRAME_DECODER = os.getenv("FRAME_DECODER", "auto")  # "auto" | "msgspec" | "orjson" | "json" (msgspec/orjson are optional)
+
+# FAST FEED
+FAST_FEED_ENABLED = True  # per-symbol streams for symbols near THRESHOLD or with open trades (needs BATCH_MODE)
+FAST_FEED_STREAM = "aggTrade"  # "aggTrade" (last trade price) | "bookTicker" (mid of best bid/ask)
+FAST_FEED_ARM_RATIO = 0.75  # promote once the window change reaches this share of THRESHOLD
+FAST_FEED_MAX_SYMBOLS = 50  # open trades are promoted first
+FAST_FEED_LINGER = 120  # seconds a symbol stays promoted after it stops being relevant
+FAST_FEED_BATCH = 100  # streams per SUBSCRIBE/UNSUBSCRIBE message
+
+# RECORDER
+RECORDER_ENABLED = False  # record every !miniTicker@arr update for replays and post-mortems
+RECORDER_PATH = os.path.join(DATA_DIR, "recordings")
+RECORDER_SEGMENT_SECONDS = 60 * 60
+RECORDER_COMPRESS = False  # closed segments become .npz: smaller, but no longer memory-mappable
+RECORDER_QUEUE_SIZE = 10_000  # frames waiting for the writer thread before new ones are dropped
+
+# SNAPSHOT
+SNAPSHOT_PATH = os.path.join(DATA_DIR, "snapshot")
+SNAPSHOT_INTERVAL = 60  # seconds between snapshots of the price history and open trades
+HISTORY_BACKFILL = True  # fill history gaps (restart downtime, new coins) from 1m klines
+
+# DISPATCH
+DISPATCH_QUEUE_SIZE = 100
+DISPATCH_WORKERS = 4
+DISPATCH_FULL_POLICY = "drop_oldest"  # "drop_oldest" | "drop_new" | "block"
+
+# HEALTH
+HEALTH_MAX_STALENESS = 30  # seconds without a market frame before /health reports degraded
+HEALTH_MAX_QUEUE_DEPTH = 50  # signals or Telegram messages waiting before /health reports degraded
+HEALTH_STARTUP_GRACE = 120  # seconds after start that /health reports starting (200) while no frame arrived
+
+# LOG
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")  # "debug" | "info" | "warning" | "error"
+LOG_STDOUT = True
+LOG_PATH = os.path.join(DATA_DIR, "logs", "bot.jsonl")  # JSON-lines log file (None to disable)
+LOG_MAX_BYTES = 20 * 1024 * 1024  # rotate the file past this size
+LOG_BACKUPS = 5
+LOG_BUFFER_SIZE = 10_000  # records waiting for the writer thread; the oldest are dropped past this
+LOG_RATE_LIMIT = 20  # records per key (message text by default) per LOG_RATE_WINDOW
+LOG_RATE_WINDOW = 10
+LOG_FLUSH_INTERVAL = 0.2
 
 # TRADE
 TP_LEVELS = [0.05, 0.10, 0.15, 0.20]
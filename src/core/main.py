@@ -1,19 +1,31 @@
 import asyncio
 import threading
+import time
 import os
 
 from datetime import datetime
 from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from binance import AsyncClient
 
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from config.settings import API_KEY, API_SECRET
+from config.settings import (
+    API_KEY, API_SECRET, DEMO_API_KEY, DEMO_API_SECRET, TESTNET, BINANCE_FUTURES_URL,
+    HEALTH_MAX_STALENESS, HEALTH_MAX_QUEUE_DEPTH, HEALTH_STARTUP_GRACE
+)
 from handlers.coin_handler import coin_handler
-from handlers.log_handler import log
+from handlers.db_handler import start_db_writer, stop_db_writer
+from handlers.dispatch_handler import dispatcher
+from handlers.trade_handler import op_handler, get_active_trades_count
+from handlers.price_handler import price_handler, recorder, detector, stream, feed, scanner
+from handlers.snapshot_handler import save_snapshot
+from handlers.rest_handler import rest
+from handlers.alert_handler import sender
+from handlers.log_handler import log, pipeline
+from utils.metrics import metrics
 
 async def binance_client():
     client = await AsyncClient.create(
@@ -21,40 +33,69 @@ async def binance_client():
         api_secret = API_SECRET
     )
 
+    if BINANCE_FUTURES_URL:
+        client.FUTURES_URL = f"{BINANCE_FUTURES_URL.rstrip('/')}/fapi"
+        await log(f"🔧 Futures REST base URL: {client.FUTURES_URL}")
+
     await log("🟢 Binance client created sucessfully.")
     return client
 
+async def order_client(client):
+    """
+    Client used by the order engine: a testnet client with the demo keys while
+    TESTNET is on, otherwise the same market client.
+    """
+    if not TESTNET:
+        return client
+
+    testnet_client = await AsyncClient.create(
+        api_key = DEMO_API_KEY,
+        api_secret = DEMO_API_SECRET,
+        testnet = True
+    )
+
+    await log("🟢 Binance testnet client created sucessfully.")
+    return testnet_client
+
 async def main():
     await log("🟢 Bot started.")
 
     client = None
+    orders = None
     try:
         client = await binance_client()
-
-        while True:
-            try:
-                await log("🔄 Iniciando ciclo de tracking de precios...")
-                
-                wait_seconds = 6 * 60 * 60
-            
-                try:
-                    await asyncio.wait_for(
-                        coin_handler(client, wait_seconds),
-                        timeout=wait_seconds + 60 
-                    )
-                except asyncio.TimeoutError:
-                    await log("⏰ Timeout reached. Restarting price tracking...")
-                
-                await log("🔄 Cycle completed. Updating coin list...")
-                
-            except Exception as e:
-                await log(f"[ERROR] Error in tracking cycle: {e}")
-                await log("[RETRY] Waiting 60 seconds before retrying...")
-                await asyncio.sleep(60)
+        rest.start(client)
+        orders = await order_client(client)
+        await op_handler.start(orders)
+        start_db_writer()
+
+        # The universe refresh and the market stream are independent tasks:
+        # a refresh changes the tracked symbols without touching the socket.
+        tasks = [
+            asyncio.create_task(coin_handler(), name="coin-universe"),
+            asyncio.create_task(price_handler(), name="market-stream"),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
     except Exception as e:
         await log(f"[ERROR] Error in main: {e}")
     finally:
+        if scanner is None:
+            try:
+                await save_snapshot(detector)
+            except Exception as e:
+                await log(f"[ERROR] Error saving snapshot: {e}")
+        await sender.stop()
+        await stop_db_writer()
+        if recorder:
+            await asyncio.to_thread(recorder.close)
+        if orders and orders is not client:
+            await orders.close_connection()
         if client:
             await client.close_connection()
             await log("[CLIENT] Binance client closed.")
@@ -67,6 +108,30 @@ def keep_bot():
     bot_thread.start()
     return bot_thread
 
+def register_gauges():
+    """Gauges read at scrape time from the bot's own state."""
+    history = detector.history
+    metrics.gauge('history_symbols', 'Symbols in the price history', lambda: len(history))
+    metrics.gauge('history_samples', 'Samples held in the price history', lambda: history.memory_usage()['samples'])
+    metrics.gauge('open_trades', 'Open trades', get_active_trades_count)
+    metrics.gauge('stream_staleness_seconds', 'Seconds since the last market frame', stream.staleness)
+    metrics.gauge('stream_queue_depth', 'Market messages waiting to be processed', lambda: stream.metrics()['depth'])
+    metrics.gauge('dispatch_queue_depth', 'Signals waiting for a dispatcher worker', dispatcher.depth)
+    metrics.gauge('telegram_queue_depth', 'Telegram messages waiting to be sent', sender.depth)
+    metrics.gauge('log_dropped', 'Log records dropped because the writer fell behind', lambda: pipeline.stats['dropped'])
+    if scanner:
+        metrics.gauge('scan_workers_alive', 'Scan worker processes alive', lambda: scanner.metrics()['alive'])
+        metrics.gauge('scan_ticks_dropped', 'Ticks dropped on full shard rings', lambda: scanner.stats['dropped'])
+        metrics.gauge(
+            'scan_shards_warming', 'Revived scan workers whose history is shorter than TIME_WINDOW',
+            lambda: len(scanner.warming())
+        )
+    metrics.gauge('fast_feed_symbols', 'Symbols promoted to per-symbol streams', lambda: len(feed.promoted) if feed else 0)
+
+register_gauges()
+
+started_at = time.monotonic()
+
 app = FastAPI(title="Binance/Telegram Bot", description="Binance scalping signals bot with Telegram integration")
 
 @app.get("/")
@@ -79,11 +144,38 @@ async def ping():
 
 @app.get("/health")
 async def health():
-    return {
-        "status": "healthy",
-        "service": "binance-telegram-bot",
-        "timestamp": datetime.now().isoformat()
-    }
+    staleness = stream.staleness()
+    depth = max(dispatcher.depth(), sender.depth())
+
+    # Connecting and warming up takes a while: until the first frame, report
+    # "starting" (still 200) for up to HEALTH_STARTUP_GRACE seconds.
+    starting = staleness == float('inf') and time.monotonic() - started_at < HEALTH_STARTUP_GRACE
+
+    problems = []
+    if staleness == float('inf'):
+        if not starting:
+            problems.append("no market frame received yet")
+    elif staleness > HEALTH_MAX_STALENESS:
+        problems.append(f"market stream stale for {staleness:.0f}s")
+    if depth > HEALTH_MAX_QUEUE_DEPTH:
+        problems.append(f"{depth} messages queued")
+
+    return JSONResponse(
+        {
+            "status": "degraded" if problems else "starting" if starting else "healthy",
+            "service": "binance-telegram-bot",
+            "timestamp": datetime.now().isoformat(),
+            "problems": problems,
+            "stream_staleness": staleness if staleness != float('inf') else None,
+            "queue_depth": depth,
+            "warming_shards": scanner.warming() if scanner else [],
+        },
+        status_code=503 if problems else 200
+    )
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     import uvicorn
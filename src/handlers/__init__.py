@@ -3,21 +3,32 @@ Handlers package
 Contains all the handler modules for different aspects of the bot.
 """
 
-from .alert_handler import alert_handler
+from .alert_handler import alert_handler, TelegramSender
 from .coin_handler import coin_handler
 from .db_handler import insert_trade
+from .dispatch_handler import SignalDispatcher
+from .feed_handler import TieredFeed
 from .log_handler import log
 from .operation_handler import OperationHandler
 from .price_handler import price_handler
+from .rest_handler import RequestScheduler
+from .shard_handler import ShardedScanner
+from .stream_handler import StreamSupervisor
 from .trade_handler import trade_handler, check_trade_conditions, get_active_trades_count
 
 __all__ = [
     'alert_handler',
+    'TelegramSender',
     'coin_handler', 
     'insert_trade',
+    'SignalDispatcher',
+    'TieredFeed',
     'log',
     'OperationHandler',
     'price_handler',
+    'RequestScheduler',
+    'ShardedScanner',
+    'StreamSupervisor',
     'trade_handler',
     'check_trade_conditions',
     'get_active_trades_count'
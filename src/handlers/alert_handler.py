@@ -1,20 +1,307 @@
+import asyncio
+import time
 import telegram
-from telegram import Message
-from config.settings import BOT_TOKEN, CHANNEL_ID, GROUP_ID
+from collections import deque
+from dataclasses import dataclass, field
+from telegram.error import RetryAfter, BadRequest, Forbidden, NetworkError
+from telegram.request import HTTPXRequest
+from handlers.log_handler import log, log_event
+from config.settings import (
+    BOT_TOKEN, CHANNEL_ID, GROUP_ID, TELEGRAM_API_URL, TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE,
+    TELEGRAM_CHAT_BURST, TELEGRAM_RETRIES, TELEGRAM_CONCURRENCY
+)
 
-bot = telegram.Bot(BOT_TOKEN)
+# Lower value goes first: new signals jump ahead of TP/SL replies.
+SIGNAL = 0
+REPLY = 1
+
+MAX_LINES = 10  # signals merged into one message (Telegram caps a text at 4096 chars)
+
+bot = telegram.Bot(
+    BOT_TOKEN, base_url=TELEGRAM_API_URL, request=HTTPXRequest(connection_pool_size=TELEGRAM_CONCURRENCY)
+)
+
+def _seconds(period):
+    return period.total_seconds() if hasattr(period, 'total_seconds') else float(period)
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def wait_time(self, now):
+        """Seconds until one message may be sent (0 when it may go now)."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def block(self, seconds, now):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 0.0
+        self.updated = now
+
+@dataclass(slots=True)
+class OutboundMessage:
+    chat_id: object
+    priority: int
+    lines: list
+    reply_to: int | None
+    seq: int
+    ready_at: float
+    key: tuple | None = None
+    waiters: list = field(default_factory=list)
+    attempts: int = 0
+
+class TelegramSender:
+    """
+    Single outbound path to the Bot API.
+
+    Messages wait in a queue served by priority (signals before replies),
+    then arrival order, and go out as soon as both the chat's token bucket
+    and the global one allow it. Nothing is held back to batch: only
+    messages still waiting on the rate limits are merged with a new one for
+    the same chat, priority and reply target, so a burst of signals goes out
+    as one multi-coin message and TP1 -> TP2 as one reply when the chat is
+    throttled. Merged messages share one message id; submit with
+    ``coalesce=False`` for a message that must keep its own. A
+    429 blocks the chat for ``retry_after`` and the message is queued again;
+    network errors are retried with backoff. Every caller gets a future
+    with the message id.
+    """
+
+    def __init__(self, bot, global_rate=TELEGRAM_GLOBAL_RATE, chat_rate=TELEGRAM_CHAT_RATE,
+                 chat_burst=TELEGRAM_CHAT_BURST, retries=TELEGRAM_RETRIES, concurrency=TELEGRAM_CONCURRENCY):
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.retries = retries
+        self.concurrency = concurrency
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats = {}
+        self._pending = []
+        self._open = {}
+        self._seq = 0
+        self._wakeup = None
+        self._semaphore = None
+        self._task = None
+        self._sends = set()
+        self.latencies = {SIGNAL: deque(maxlen=1000), REPLY: deque(maxlen=1000)}
+        self.stats = {
+            'queued': 0,
+            'merged': 0,
+            'sent': 0,
+            'retried': 0,
+            'rate_limited': 0,
+            'failed': 0,
+        }
+
+    def start(self):
+        if self._task:
+            return
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._task = asyncio.create_task(self._run(), name="telegram-sender")
+
+    async def stop(self, drain=5.0):
+        """Gives queued messages up to ``drain`` seconds, then cancels the rest."""
+        deadline = time.monotonic() + drain
+        while (self._pending or self._sends) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+        tasks = [task for task in (self._task, *self._sends) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    def depth(self):
+        return len(self._pending)
+
+    def _chat(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def submit(self, chat_id, text, priority=SIGNAL, reply_to=None, coalesce=True):
+        """Queues a message; the returned future resolves to its message id."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        now = time.monotonic()
+        self.stats['queued'] += 1
+
+        key = (chat_id, priority, reply_to) if coalesce else None
+        item = self._open.get(key) if key else None
+        if item is not None and len(item.lines) < MAX_LINES:
+            item.lines.append(text)
+            item.waiters.append((future, now))
+            self.stats['merged'] += 1
+            return future
+
+        self._seq += 1
+        item = OutboundMessage(chat_id, priority, [text], reply_to, self._seq, now, key, [(future, now)])
+        self._pending.append(item)
+        if key:
+            self._open[key] = item
+        self._wakeup.set()
+        return future
+
+    def _next(self):
+        """Best sendable message, or (None, seconds until one may be)."""
+        now = time.monotonic()
+        global_wait = self._global.wait_time(now)
+        best = None
+        wait = None
+
+        for item in self._pending:
+            delay = max(item.ready_at - now, self._chat(item.chat_id).wait_time(now), global_wait)
+            if delay > 0:
+                wait = delay if wait is None else min(wait, delay)
+            elif best is None or (item.priority, item.seq) < (best.priority, best.seq):
+                best = item
+
+        if best is None:
+            return None, wait
+
+        self._pending.remove(best)
+        if best.key and self._open.get(best.key) is best:
+            del self._open[best.key]
+        self._chat(best.chat_id).take()
+        self._global.take()
+        return best, 0.0
+
+    async def _run(self):
+        while True:
+            item, wait = self._next()
+            if item is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._semaphore.acquire()
+            task = asyncio.create_task(self._deliver(item))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+
+    def _requeue(self, item: OutboundMessage, ready_at):
+        item.ready_at = ready_at
+        self._pending.append(item)
+        self._wakeup.set()
+
+    async def _fail(self, item: OutboundMessage, error):
+        self.stats['failed'] += 1
+        await log(f"❌ Telegram message to {item.chat_id} failed: {error}")
+        for future, _ in item.waiters:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _deliver(self, item: OutboundMessage):
+        try:
+            text = ('\n\n' if item.priority == SIGNAL else '\n').join(item.lines)
+            try:
+                msg = await self.bot.send_message(
+                    chat_id=item.chat_id, text=text, reply_to_message_id=item.reply_to
+                )
+            except RetryAfter as e:
+                retry_after = _seconds(e.retry_after)
+                self.stats['rate_limited'] += 1
+                now = time.monotonic()
+                self._chat(item.chat_id).block(retry_after, now)
+                await log(f"⚠️ Telegram 429 for {item.chat_id}: retrying in {retry_after:.0f}s")
+                self._requeue(item, now + retry_after)
+                return
+            except (BadRequest, Forbidden) as e:
+                await self._fail(item, e)
+                return
+            except NetworkError as e:
+                item.attempts += 1
+                if item.attempts > self.retries:
+                    await self._fail(item, e)
+                    return
+                self.stats['retried'] += 1
+                self._requeue(item, time.monotonic() + min(30, 2 ** item.attempts))
+                return
+            except Exception as e:
+                await self._fail(item, e)
+                return
+
+            now = time.monotonic()
+            self.stats['sent'] += 1
+            latencies = self.latencies[item.priority]
+            for future, queued_at in item.waiters:
+                latencies.append(now - queued_at)
+                if not future.done():
+                    future.set_result(msg.message_id)
+        finally:
+            self._semaphore.release()
+
+    def metrics(self):
+        def percentiles(values):
+            if not values:
+                return {'count': 0, 'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+            ordered = sorted(values)
+            return {
+                'count': len(ordered),
+                'p50': ordered[len(ordered) // 2],
+                'p99': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+                'max': ordered[-1],
+            }
+
+        return {
+            **self.stats,
+            'depth': self.depth(),
+            'signal_latency': percentiles(self.latencies[SIGNAL]),
+            'reply_latency': percentiles(self.latencies[REPLY]),
+        }
+
+sender = TelegramSender(bot)
+_replies = set()
+
+def _ignore_result(future):
+    if not future.cancelled():
+        future.exception()
 
 async def alert_handler(symbol, percentage_change, price, emoji, volume):
+    """
+    Queues the signal and returns the future of its message id without
+    waiting for delivery. Signals backed up behind the channel's rate limit
+    go out as one multi-coin message and share its id.
+    """
     vol_rnd = round(volume / 1000000, 2)
 
-    msg : Message = await bot.send_message(
-        chat_id = CHANNEL_ID,
-        text=f'{emoji[0]} #{symbol} {emoji[1]} {percentage_change:+.2f}%\n💵 ${price} 💰 ${vol_rnd}M'
+    future = sender.submit(
+        CHANNEL_ID,
+        f'{emoji[0]} #{symbol} {emoji[1]} {percentage_change:+.2f}%\n💵 ${price} 💰 ${vol_rnd}M',
+        priority=SIGNAL
     )
-    print(f"{symbol} alert sended.")
-    return msg.message_id
+    future.add_done_callback(_ignore_result)
+    log_event(f"{symbol} alert queued.", symbol=symbol)
+    return future
 
-async def tp_sl_alert_handler(hit, result, original_message_id):
+async def _reply_when_sent(signal, text):
+    try:
+        message_id = await asyncio.shield(signal)
+    except Exception:
+        message_id = None
+    return await sender.submit(GROUP_ID, text, priority=REPLY, reply_to=message_id)
+
+async def tp_sl_alert_handler(hit, result, original_message_id, symbol=None):
+    """
+    Queues the reply and returns without waiting for delivery.
+    ``original_message_id`` may be the future of a signal still queued: the
+    reply is queued once its id is known.
+    """
     if hit == -1:
         alert = f"❌ SL (-5%)"
     elif hit == 0:
@@ -28,9 +315,14 @@ async def tp_sl_alert_handler(hit, result, original_message_id):
     elif hit == 4:
         alert = f"✅ TP4 (+20%)"
 
-    await bot.send_message(
-        chat_id = GROUP_ID,
+    # A merged signal carries several coins: name the one this reply is for.
+    text = f'{alert} #{symbol}' if symbol else alert
 
-        text=f'{alert}',
-        reply_to_message_id=original_message_id
-    )
+    if isinstance(original_message_id, asyncio.Future):
+        future = asyncio.create_task(_reply_when_sent(original_message_id, text))
+        _replies.add(future)
+        future.add_done_callback(_replies.discard)
+    else:
+        future = sender.submit(GROUP_ID, text, priority=REPLY, reply_to=original_message_id)
+    future.add_done_callback(_ignore_result)
+    return future
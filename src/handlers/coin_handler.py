@@ -1,33 +1,59 @@
+import asyncio
 from handlers.log_handler import log
-from handlers.price_handler import price_handler
-from config.settings import MIN_VOLUME, MAX_VOLUME
+from handlers.price_handler import update_universe
+from handlers.rest_handler import rest
+from handlers.trade_handler import op_handler
+from config.settings import MIN_VOLUME, MAX_VOLUME, PREARM_SYMBOLS, UNIVERSE_REFRESH_INTERVAL
 
-async def coin_handler(client, duration_seconds):
+async def filter_coins():
     """
-    Filter & listener coin function.
+    USDT pairs whose 24h quote volume is within [MIN_VOLUME, MAX_VOLUME].
     """
+    all_tickers = await rest.call('futures_ticker')
+
+    await log(f"[FILTER] Coins listed: {len(all_tickers)}")
+
+    f_coins = []
+    for ticker in all_tickers:
+        if ticker['symbol'].endswith('USDT'):
+            try:
+                volume = float(ticker['quoteVolume'])
+                if MIN_VOLUME <= volume <= MAX_VOLUME:
+                    f_coins.append(ticker['symbol'])
+            except (ValueError, KeyError, TypeError):
+                continue
     
-    try:
-        all_tickers = await client.futures_ticker()
-
-        await log(f"[FILTER] Coins listed: {len(all_tickers)}")
-
-        f_coins = []
-        for ticker in all_tickers:
-            if ticker['symbol'].endswith('USDT'):
-                try:
-                    volume = float(ticker['quoteVolume'])
-                    if MIN_VOLUME <= volume <= MAX_VOLUME:
-                        f_coins.append(ticker['symbol'])
-                except (ValueError, KeyError, TypeError):
-                    continue
-        
-        await log(f"[FILTER] Coins filtered: {len(f_coins)}")
-
-        coins = set(f_coins)
-        
-        await price_handler(client, coins, duration_seconds)
-
-    except Exception as e:
-        await log(f"[FILTER] Error filtering the coins. {e}")
-        raise
\ No newline at end of file
+    await log(f"[FILTER] Coins filtered: {len(f_coins)}")
+
+    return set(f_coins)
+
+async def refresh_universe():
+    coins = await filter_coins()
+    new_coins, _ = await update_universe(coins)
+
+    if new_coins:
+        # New listings bring new filters: rebuild the index now rather than
+        # on the first signal of a new coin.
+        op_handler.symbol_filters.mark_stale()
+        await op_handler.refresh_symbol_filters()
+    elif op_handler.symbol_filters.is_stale():
+        # TTL expired: refresh here, off the order path.
+        await op_handler.refresh_symbol_filters()
+
+        if PREARM_SYMBOLS:
+            op_handler.prearm(new_coins)
+
+async def coin_handler():
+    """
+    Filter coin task: re-runs the volume filter every UNIVERSE_REFRESH_INTERVAL
+    seconds and applies the result to the running market stream.
+    """
+    while True:
+        try:
+            await refresh_universe()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await log(f"[FILTER] Error filtering the coins. {e}")
+
+        await asyncio.sleep(UNIVERSE_REFRESH_INTERVAL)
@@ -1,30 +1,265 @@
-from supabase import create_client, Client
+import asyncio
+import json
+import os
+import sqlite3
+import time
 from handlers.log_handler import log
-from config.settings import SUPABASE_URL, SUPABASE_KEY
+from utils.metrics import metrics
+from config.settings import (
+    SUPABASE_URL, SUPABASE_KEY, DB_BACKEND, DB_TABLE, DB_SPOOL_PATH,
+    DB_SQLITE_PATH, DB_BATCH_SIZE, DB_FLUSH_INTERVAL, DB_MAX_BACKOFF
+)
 
-supabase: Client = None
+TRADE_COLUMNS = (
+    'trade_id', 'created_at', 'closed_at', 'symbol', 'direction', 'volume',
+    'percentage', 'profit', 'msg_id', 'entry_price', 'close_price', 'result'
+)
 
-try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("[DB_HANDLER] Conexión con Supabase creada.")
-except Exception as e:
-    print(f"[DB_HANDLER] ERROR al crear cliente de Supabase: {e}")
+# Códigos de Postgres que indican un esquema incompatible: columna inexistente
+# y ON CONFLICT sin índice único que lo respalde.
+SCHEMA_ERROR_CODES = ('42703', '42P10')
+MIGRATION = 'migrations/001_trade_id_unique.sql'
 
-async def insert_trade(trade_data: dict):
+class SchemaError(Exception):
+    """La tabla no tiene el esquema que necesita el backend; reintentar no sirve."""
+
+class SupabaseBackend:
     """
-    Inserta un trade COMPLETO en la base de datos.
+    Escribe lotes en Supabase. Usa upsert sobre 'trade_id' (columna única en
+    la tabla) para que reenviar un lote tras un reinicio no duplique filas.
     """
-    if supabase is None:
-        await log("[DB_HANDLER] ERROR: Supabase client no está inicializado.")
-        return
 
+    def __init__(self, url, key, table):
+        from supabase import create_client
+        self.client = create_client(url, key)
+        self.table = table
+
+    def _schema_error(self, error):
+        if any(code in str(error) for code in SCHEMA_ERROR_CODES):
+            return SchemaError(
+                f"la tabla '{self.table}' necesita una columna única 'trade_id' (aplicar {MIGRATION}): {error}"
+            )
+        return None
+
+    def check(self):
+        """Comprueba al arrancar que la columna 'trade_id' existe."""
+        try:
+            self.client.table(self.table).select('trade_id').limit(1).execute()
+        except Exception as e:
+            raise self._schema_error(e) or e
+
+    def write(self, records):
+        try:
+            response = self.client.table(self.table).upsert(
+                records, on_conflict='trade_id', ignore_duplicates=True
+            ).execute()
+        except Exception as e:
+            raise self._schema_error(e) or e
+        return len(response.data or [])
+
+class SQLiteBackend:
+    """
+    Backend local equivalente, útil para pruebas y para correr sin Supabase.
+    """
+
+    def __init__(self, path, table='trades'):
+        _ensure_dir(path)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.table = table
+        self.conn.execute(
+            f'CREATE TABLE IF NOT EXISTS "{table}" ('
+            'trade_id TEXT PRIMARY KEY, created_at TEXT, closed_at TEXT, symbol TEXT, '
+            'direction TEXT, volume REAL, percentage REAL, profit REAL, msg_id INTEGER, '
+            'entry_price REAL, close_price REAL, result TEXT)'
+        )
+        self.conn.commit()
+
+    def check(self):
+        pass
+
+    def write(self, records):
+        placeholders = ', '.join('?' for _ in TRADE_COLUMNS)
+        with self.conn:
+            cursor = self.conn.executemany(
+                f'INSERT OR IGNORE INTO "{self.table}" ({", ".join(TRADE_COLUMNS)}) VALUES ({placeholders})',
+                [tuple(r.get(c) for c in TRADE_COLUMNS) for r in records]
+            )
+        return cursor.rowcount
+
+class TradeSpool:
+    """
+    Cola append-only en SQLite (modo WAL). Un trade solo sale del spool cuando
+    el backend confirmó el lote que lo contiene.
+    """
+
+    def __init__(self, path):
+        _ensure_dir(path)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS spool ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, trade_id TEXT UNIQUE, '
+            'payload TEXT NOT NULL, created REAL NOT NULL)'
+        )
+        self.conn.commit()
+
+    def append(self, record):
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR IGNORE INTO spool (trade_id, payload, created) VALUES (?, ?, ?)',
+                (record.get('trade_id'), json.dumps(record), time.time())
+            )
+
+    def peek(self, limit):
+        rows = self.conn.execute(
+            'SELECT id, payload, created FROM spool ORDER BY id LIMIT ?', (limit,)
+        ).fetchall()
+        return [(row_id, json.loads(payload), created) for row_id, payload, created in rows]
+
+    def ack(self, row_ids):
+        with self.conn:
+            self.conn.executemany('DELETE FROM spool WHERE id = ?', [(i,) for i in row_ids])
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM spool').fetchone()[0]
+
+def _ensure_dir(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+def _create_backend():
+    if DB_BACKEND == 'sqlite':
+        return SQLiteBackend(DB_SQLITE_PATH, DB_TABLE)
+    return SupabaseBackend(SUPABASE_URL, SUPABASE_KEY, DB_TABLE)
+
+# Backend y spool se crean al arrancar el writer, no al importar el módulo.
+backend = None
+spool = None
+_pending = asyncio.Event()
+_writer_task = None
+stats = {'spooled': 0, 'written': 0, 'batches': 0, 'failures': 0, 'schema_error': None}
+write_latency = metrics.histogram('db_write_seconds', 'Trade finalized to row written in the database')
+
+async def insert_trade(trade_data: dict):
+    """
+    Guarda un trade COMPLETO en el spool local; el writer lo envía a la base
+    de datos en segundo plano.
+    """
     try:
-        response = supabase.table('signals-data-20').insert(trade_data).execute()
-        
-        if response.data:
-            await log(f"[DB_HANDLER] Trade insertado: {trade_data.get('symbol')} -> {trade_data.get('result')}%")
-        else:
-            await log(f"[DB_HANDLER] WARNING: Respuesta vacía al insertar trade de {trade_data.get('symbol')}")
-        
+        _open_spool().append(trade_data)
+        stats['spooled'] += 1
+        _pending.set()
     except Exception as e:
-        await log(f"[DB_HANDLER] ERROR al insertar trade: {e} | Data: {trade_data}")
\ No newline at end of file
+        await log(f"[DB_HANDLER] ERROR al guardar trade en spool: {e} | Data: {trade_data}")
+
+async def _flush_once():
+    """Envía un lote del spool. Devuelve cuántos trades quedaron confirmados."""
+    batch = spool.peek(DB_BATCH_SIZE)
+    if not batch:
+        return 0
+
+    records = [record for _, record, _ in batch]
+    await asyncio.to_thread(backend.write, records)
+    spool.ack([row_id for row_id, _, _ in batch])
+
+    now = time.time()
+    for _, _, spooled_at in batch:
+        write_latency.record(now - spooled_at)
+
+    stats['written'] += len(batch)
+    stats['batches'] += 1
+    await log(f"[DB_HANDLER] Lote insertado: {len(batch)} trade(s), {len(spool)} pendientes")
+    return len(batch)
+
+def _open_spool():
+    global spool
+    if spool is None:
+        spool = TradeSpool(DB_SPOOL_PATH)
+    return spool
+
+async def _connect():
+    """Crea el backend y comprueba el esquema; reintenta solo errores de conexión."""
+    global backend
+    backoff = 1.0
+
+    while backend is None:
+        try:
+            candidate = await asyncio.to_thread(_create_backend)
+            await asyncio.to_thread(candidate.check)
+            backend = candidate
+            await log(f"[DB_HANDLER] Backend '{DB_BACKEND}' creado.")
+        except SchemaError:
+            raise
+        except Exception as e:
+            await log(f"[DB_HANDLER] ERROR al crear backend '{DB_BACKEND}': {e}. Reintento en {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, DB_MAX_BACKOFF)
+
+async def _spool_writer():
+    global backend
+    try:
+        await _connect()
+    except SchemaError as e:
+        stats['schema_error'] = str(e)
+        await log(f"[DB_HANDLER] ERROR de esquema: {e}. Los trades quedan en el spool hasta reiniciar.")
+        return
+
+    backoff = 1.0
+
+    while True:
+        try:
+            await asyncio.wait_for(_pending.wait(), timeout=DB_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+        # Espera a llenar un lote o a que el más antiguo cumpla DB_FLUSH_INTERVAL.
+        batch = spool.peek(DB_BATCH_SIZE)
+        if not batch:
+            _pending.clear()
+            continue
+        oldest = batch[0][2]
+        if len(batch) < DB_BATCH_SIZE and time.time() - oldest < DB_FLUSH_INTERVAL:
+            _pending.clear()
+            await asyncio.sleep(DB_FLUSH_INTERVAL - (time.time() - oldest))
+
+        try:
+            while await _flush_once() == DB_BATCH_SIZE:
+                pass
+            backoff = 1.0
+        except SchemaError as e:
+            stats['schema_error'] = str(e)
+            backend = None
+            await log(f"[DB_HANDLER] ERROR de esquema: {e}. Los trades quedan en el spool hasta reiniciar.")
+            return
+        except Exception as e:
+            stats['failures'] += 1
+            await log(f"[DB_HANDLER] ERROR al insertar lote ({len(spool)} pendientes): {e}. Reintento en {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, DB_MAX_BACKOFF)
+            _pending.set()
+
+def start_db_writer():
+    """Arranca el writer del spool (los trades pendientes de otra ejecución se envían primero)."""
+    global _writer_task
+    if _writer_task is None or _writer_task.done():
+        _open_spool()
+        _writer_task = asyncio.create_task(_spool_writer(), name="trade-spool-writer")
+        if len(spool):
+            _pending.set()
+
+async def stop_db_writer():
+    """Detiene el writer y hace un último intento de vaciar el spool."""
+    global _writer_task
+    if _writer_task is not None:
+        _writer_task.cancel()
+        await asyncio.gather(_writer_task, return_exceptions=True)
+        _writer_task = None
+
+    if backend is not None and spool is not None:
+        try:
+            while await _flush_once():
+                pass
+        except Exception as e:
+            await log(f"[DB_HANDLER] {len(spool)} trade(s) quedan en el spool: {e}")
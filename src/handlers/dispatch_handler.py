@@ -0,0 +1,140 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from handlers.log_handler import log
+from handlers.alert_handler import alert_handler
+from utils.metrics import metrics
+from config.settings import DISPATCH_QUEUE_SIZE, DISPATCH_WORKERS, DISPATCH_FULL_POLICY
+
+POLICIES = ('drop_oldest', 'drop_new', 'block')
+
+@dataclass(slots=True)
+class SignalEvent:
+    symbol: str
+    percentage_change: float
+    price: float
+    volume: float
+    detected_at: float = field(default_factory=time.time)
+
+class SignalDispatcher:
+    """
+    Bounded signal queue drained by a pool of workers.
+
+    The market stream only enqueues SignalEvents; workers queue the Telegram
+    alert and register the trade (which submits it to the OperationHandler)
+    right away, so neither a slow HTTP round trip nor Telegram throttling
+    delays the socket or the order. The message id is attached to the trade
+    once the alert is sent.
+    """
+
+    def __init__(self, maxsize=DISPATCH_QUEUE_SIZE, workers=DISPATCH_WORKERS, policy=DISPATCH_FULL_POLICY):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown dispatch policy '{policy}'. Options: {', '.join(POLICIES)}")
+
+        self.maxsize = maxsize
+        self.workers = workers
+        self.policy = policy
+        self.queue = None
+        self._tasks = []
+        self._latency = metrics.histogram('signal_telegram_seconds', 'Signal detected to Telegram alert sent')
+        self.stats = {
+            'enqueued': 0,
+            'dropped': 0,
+            'sent': 0,
+            'failed': 0,
+            'max_depth': 0,
+            'latency_last': 0.0,
+            'latency_max': 0.0,
+            'latency_total': 0.0,
+        }
+
+    def start(self):
+        """Starts the worker pool once; later calls are no-ops."""
+        if self._tasks:
+            return
+        self.queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [
+            asyncio.create_task(self._worker(n), name=f"signal-dispatcher-{n}")
+            for n in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def depth(self):
+        return self.queue.qsize() if self.queue else 0
+
+    async def submit(self, event: SignalEvent) -> bool:
+        """
+        Enqueues a signal. Only the 'block' policy can wait; the drop
+        policies return immediately and report whether the event was kept.
+        """
+        queue = self.queue
+
+        if self.policy == 'block':
+            await queue.put(event)
+        elif queue.full() and self.policy == 'drop_new':
+            self.stats['dropped'] += 1
+            await log(f"⚠️ Dispatch queue full, dropped signal {event.symbol}")
+            return False
+        else:
+            if queue.full():
+                dropped = queue.get_nowait()
+                queue.task_done()
+                self.stats['dropped'] += 1
+                await log(f"⚠️ Dispatch queue full, dropped oldest signal {dropped.symbol}")
+            queue.put_nowait(event)
+
+        self.stats['enqueued'] += 1
+        self.stats['max_depth'] = max(self.stats['max_depth'], queue.qsize())
+        return True
+
+    async def _worker(self, n):
+        while True:
+            event = await self.queue.get()
+            try:
+                await self._dispatch(event)
+            except Exception as e:
+                self.stats['failed'] += 1
+                await log(f"[ERROR] Alert/trade failed for {event.symbol}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _dispatch(self, event: SignalEvent):
+        emoji = ("🟢", "📈") if event.percentage_change > 0 else ("🔴", "📉")
+
+        message = await alert_handler(
+            event.symbol, event.percentage_change, event.price, emoji, event.volume
+        )
+        message.add_done_callback(lambda future: self._alert_done(event, future))
+
+        from handlers.trade_handler import trade_handler
+        await trade_handler(
+            event.symbol, event.percentage_change, event.price, message, event.volume,
+            detected_at=event.detected_at
+        )
+
+    def _alert_done(self, event: SignalEvent, future):
+        if future.cancelled() or future.exception() is not None:
+            self.stats['failed'] += 1
+            return
+
+        latency = time.time() - event.detected_at
+        self.stats['sent'] += 1
+        self.stats['latency_last'] = latency
+        self.stats['latency_total'] += latency
+        self.stats['latency_max'] = max(self.stats['latency_max'], latency)
+        self._latency.record(latency)
+
+    def metrics(self):
+        sent = self.stats['sent']
+        return {
+            **self.stats,
+            'depth': self.depth(),
+            'latency_avg': self.stats['latency_total'] / sent if sent else 0.0,
+        }
+
+dispatcher = SignalDispatcher()
@@ -0,0 +1,132 @@
+import time
+from handlers.log_handler import log
+from handlers.stream_handler import StreamSupervisor
+from config.settings import (
+    FAST_FEED_STREAM, FAST_FEED_MAX_SYMBOLS, FAST_FEED_LINGER, FAST_FEED_BATCH
+)
+
+class TieredFeed:
+    """
+    Second tier on top of the all-market miniTicker stream.
+
+    The miniTicker frame (about 1/s) keeps scanning every symbol; symbols
+    that get close to THRESHOLD or have open trades are promoted to their
+    own ``<symbol>@aggTrade`` or ``<symbol>@bookTicker`` stream on the same
+    connection, so their signals and TP/SL checks run on every tick.
+    Promotions are capped, sent in batched SUBSCRIBE messages, and a symbol
+    is demoted once it has not been relevant for ``linger`` seconds. Open
+    trades always get a slot: when the feed is full, lingering and then
+    armed symbols are demoted to make room for them.
+    """
+
+    def __init__(self, stream: StreamSupervisor, kind=FAST_FEED_STREAM, max_symbols=FAST_FEED_MAX_SYMBOLS,
+                 linger=FAST_FEED_LINGER, batch=FAST_FEED_BATCH):
+        if kind not in ('aggTrade', 'bookTicker'):
+            raise ValueError(f"Unknown fast feed stream '{kind}'")
+        self.stream = stream
+        self.kind = kind
+        self.suffix = f"@{kind}"
+        self.max_symbols = max_symbols
+        self.linger = linger
+        self.batch = batch
+        self.promoted = {}
+        self.volumes = {}
+        self.stats = {
+            'promotions': 0,
+            'demotions': 0,
+            'ticks': 0,
+            'signals': 0,
+            'capped': 0,
+        }
+
+    def stream_name(self, symbol):
+        return f"{symbol.lower()}{self.suffix}"
+
+    def handles(self, stream_name):
+        return stream_name.endswith(self.suffix)
+
+    def parse(self, data):
+        """Returns (symbol, price) from an aggTrade/bookTicker event or None."""
+        try:
+            if self.kind == 'aggTrade':
+                return data['s'], float(data['p'])
+            bid = float(data['b'])
+            ask = float(data['a'])
+            if bid <= 0 or ask <= 0:
+                return None
+            return data['s'], (bid + ask) / 2
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    async def _send(self, method, streams):
+        for i in range(0, len(streams), self.batch):
+            await method(streams[i:i + self.batch])
+
+    async def update(self, armed, open_symbols, now=None):
+        """
+        Promotes ``armed`` and ``open_symbols`` and demotes symbols idle for
+        longer than ``linger``. Open trades come first; if the feed is full,
+        lingering symbols (oldest first) and then armed ones (from the end of
+        ``armed``) are demoted to make room for them.
+        """
+        now = time.time() if now is None else now
+        open_symbols = set(open_symbols)
+        relevant = open_symbols | set(armed)
+
+        new = []
+        for symbol in relevant:
+            if symbol in self.promoted:
+                self.promoted[symbol] = now
+            else:
+                new.append(symbol)
+
+        expired = [
+            symbol for symbol, seen in self.promoted.items()
+            if symbol not in relevant and now - seen > self.linger
+        ]
+        for symbol in expired:
+            del self.promoted[symbol]
+            self.volumes.pop(symbol, None)
+
+        new_open = [symbol for symbol in new if symbol in open_symbols]
+        shortfall = len(new_open) - (self.max_symbols - len(self.promoted))
+        if shortfall > 0:
+            order = {symbol: i for i, symbol in enumerate(armed)}
+            evictable = sorted(
+                (symbol for symbol in self.promoted if symbol not in open_symbols),
+                key=lambda symbol: (symbol in relevant, -order.get(symbol, 0), self.promoted[symbol])
+            )
+            for symbol in evictable[:shortfall]:
+                del self.promoted[symbol]
+                self.volumes.pop(symbol, None)
+                expired.append(symbol)
+
+        room = self.max_symbols - len(self.promoted)
+        if len(new) > room:
+            new.sort(key=lambda symbol: symbol not in open_symbols)
+            self.stats['capped'] += len(new) - max(room, 0)
+            new = new[:max(room, 0)]
+        for symbol in new:
+            self.promoted[symbol] = now
+
+        if expired:
+            await self._send(self.stream.unsubscribe, [self.stream_name(symbol) for symbol in expired])
+            self.stats['demotions'] += len(expired)
+        if new:
+            await self._send(self.stream.subscribe, [self.stream_name(symbol) for symbol in new])
+            self.stats['promotions'] += len(new)
+            await log(f"⚡ Fast feed: +{len(new)} ({', '.join(sorted(new))}), -{len(expired)}, {len(self.promoted)} promoted")
+        elif expired:
+            await log(f"⚡ Fast feed: -{len(expired)} ({', '.join(sorted(expired))}), {len(self.promoted)} promoted")
+
+        return new, expired
+
+    async def drop(self, symbols):
+        """Demotes symbols right away (e.g. removed from the universe)."""
+        symbols = [symbol for symbol in symbols if symbol in self.promoted]
+        for symbol in symbols:
+            del self.promoted[symbol]
+            self.volumes.pop(symbol, None)
+        if symbols:
+            await self._send(self.stream.unsubscribe, [self.stream_name(symbol) for symbol in symbols])
+            self.stats['demotions'] += len(symbols)
@@ -1,2 +1,167 @@
-async def log(msg):
-    print(f"{msg}")
\ No newline at end of file
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from config.settings import (
+    LOG_LEVEL, LOG_STDOUT, LOG_PATH, LOG_MAX_BYTES, LOG_BACKUPS, LOG_BUFFER_SIZE,
+    LOG_RATE_LIMIT, LOG_RATE_WINDOW, LOG_FLUSH_INTERVAL
+)
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+
+def _infer_level(msg):
+    """Level implied by the message prefixes the handlers already use."""
+    if msg.startswith(('❌', '[ERROR]')) or 'ERROR' in msg[:20]:
+        return 'error'
+    if msg.startswith('⚠️'):
+        return 'warning'
+    return 'info'
+
+class LogPipeline:
+    """
+    Logging that never blocks the caller.
+
+    emit() only appends a tuple to a bounded deque (the oldest records are
+    dropped and counted if the writer falls behind); a daemon thread drains
+    it every ``flush_interval`` and writes each batch to stdout and/or a
+    size-rotated JSON-lines file. Repeated messages are limited to ``rate_limit``
+    per ``rate_window`` seconds per key; the suppressed count is attached to the
+    next record that gets through.
+    """
+
+    def __init__(self, level=LOG_LEVEL, stdout=LOG_STDOUT, path=LOG_PATH, max_bytes=LOG_MAX_BYTES,
+                 backups=LOG_BACKUPS, buffer_size=LOG_BUFFER_SIZE, rate_limit=LOG_RATE_LIMIT,
+                 rate_window=LOG_RATE_WINDOW, flush_interval=LOG_FLUSH_INTERVAL):
+        self.level = LEVELS[level]
+        self.stdout = stdout
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.flush_interval = flush_interval
+        self.buffer = deque(maxlen=buffer_size)
+        self._keys = {}
+        self._file = None
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.stats = {'records': 0, 'dropped': 0, 'suppressed': 0, 'errors': 0}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def _allow(self, key, now):
+        state = self._keys.get(key)
+        if state is None or now - state[0] >= self.rate_window:
+            suppressed = state[2] if state else 0
+            if len(self._keys) > 10_000:
+                self._keys = {k: v for k, v in self._keys.items() if now - v[0] < self.rate_window}
+            self._keys[key] = [now, 1, 0]
+            return True, suppressed
+        if state[1] < self.rate_limit:
+            state[1] += 1
+            return True, 0
+        state[2] += 1
+        self.stats['suppressed'] += 1
+        return False, 0
+
+    def emit(self, msg, level=None, key=None, **context):
+        """
+        Queues one record. ``key`` groups messages for rate limiting (the
+        message text by default); ``context`` fields (symbol, trade_id...)
+        are written as JSON fields.
+        """
+        msg = str(msg)
+        level = level or _infer_level(msg)
+        if LEVELS[level] < self.level:
+            return
+
+        now = time.time()
+        allowed, suppressed = self._allow(msg if key is None else key, now)
+        if not allowed:
+            return
+        if suppressed:
+            context['suppressed'] = suppressed
+
+        if len(self.buffer) == self.buffer.maxlen:
+            self.stats['dropped'] += 1
+        self.buffer.append((now, level, msg, context))
+        self.stats['records'] += 1
+
+        if self._thread is None:
+            self.start()
+        if len(self.buffer) * 2 >= self.buffer.maxlen:
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Writes everything queued so far (also called at exit)."""
+        with self._write_lock:
+            records = []
+            while self.buffer:
+                records.append(self.buffer.popleft())
+            if not records:
+                return
+            try:
+                self._write(records)
+            except Exception as e:
+                self.stats['errors'] += 1
+                sys.stderr.write(f"[LOG] Error writing {len(records)} records: {e}\n")
+
+    def _write(self, records):
+        if self.stdout:
+            lines = []
+            for _, level, msg, context in records:
+                prefix = '' if level == 'info' else f"[{level.upper()}] "
+                fields = ''.join(f" {name}={value}" for name, value in context.items())
+                lines.append(f"{prefix}{msg}{fields}\n")
+            sys.stdout.write(''.join(lines))
+            sys.stdout.flush()
+
+        if self.path:
+            self._open()
+            self._file.write(''.join(
+                json.dumps({'ts': ts, 'level': level, 'msg': msg, **context}, ensure_ascii=False, default=str) + '\n'
+                for ts, level, msg, context in records
+            ))
+            self._file.flush()
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        for n in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{n}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{n + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+pipeline = LogPipeline()
+atexit.register(pipeline.flush)
+
+def log_event(msg, level=None, key=None, **context):
+    """Synchronous entry point for threads and non-async code."""
+    pipeline.emit(msg, level, key, **context)
+
+async def log(msg, level=None, key=None, **context):
+    pipeline.emit(msg, level, key, **context)
@@ -1,106 +1,224 @@
+import asyncio
 import time
-import math
-import hmac
-import hashlib
-import urllib.parse
-import requests
-from decimal import Decimal, ROUND_FLOOR, ROUND_DOWN
-from binance.client import Client
+from decimal import Decimal, ROUND_DOWN
+from binance import BinanceSocketManager
 from binance.enums import *
 from binance.exceptions import BinanceAPIException
-from config.settings import DEMO_API_KEY, DEMO_API_SECRET
+from handlers.log_handler import log, log_event
+from utils.symbol_filters import SymbolFilters, SymbolFilterIndex
+from utils.metrics import metrics
+from config.settings import SYMBOL_FILTERS_TTL, SYMBOL_FILTERS_PATH, PREARM_CONCURRENCY
+
+ENTRY_FILL_TIMEOUT = 5.0
+LEVERAGE = 10
+
+order_latency = metrics.histogram('order_ack_seconds', 'Signal detected to entry order acknowledged')
 
 class OperationHandler:
     def __init__(self):
         """
-        Inicializa el gestor de operaciones.
+        Inicializa el gestor de operaciones. El cliente se conecta con start().
         """
-        self.api_key = DEMO_API_KEY
-        self.secret_key = DEMO_API_SECRET
-        self.hedge_mode = False 
-        self.base_url = "https://testnet.binancefuture.com" # URL Base Testnet explícita para fallback
-        
+        self.client = None
+        self.hedge_mode = False
+        self.symbol_filters = SymbolFilterIndex(SYMBOL_FILTERS_TTL, SYMBOL_FILTERS_PATH)
+        self.latencies = []
+        # Estado conocido por símbolo: {'margin_type': 'ISOLATED'|'CROSSED', 'leverage': int}
+        self.symbol_state = {}
+        self._tasks = set()
+        self._user_stream_task = None
+        self._prearm_task = None
+        self._filters_task = None
+
+        try:
+            if self.symbol_filters.load():
+                log_event(f"📦 Filtros cargados desde disco: {len(self.symbol_filters)} símbolos.")
+        except Exception as e:
+            log_event(f"⚠️ No se pudieron cargar los filtros guardados: {e}")
+
+    async def start(self, client):
+        """
+        Usa el AsyncClient compartido (su sesión HTTP con pool de conexiones)
+        para todas las llamadas de órdenes.
+        """
+        self.client = client
+        network = "TESTNET" if getattr(client, 'testnet', False) else "MAINNET"
+        await log(f"🤖 OperationHandler: Conectado a Binance Futures {network}.")
+
+        await asyncio.gather(self._check_position_mode(), self.warm_symbol_state())
+        if self.symbol_filters.is_stale():
+            await self.refresh_symbol_filters()
+
+        if self._user_stream_task is None or self._user_stream_task.done():
+            self._user_stream_task = asyncio.create_task(self._user_stream_loop(), name="user-data-stream")
+
+    async def warm_symbol_state(self):
+        """Carga en bloque margen y apalancamiento de todos los símbolos."""
         try:
-            self.client = Client(self.api_key, self.secret_key, testnet=True)
-            print("🤖 OperationHandler: Conectado a Binance Futures TESTNET.")
-            self._check_position_mode()
+            configs = await self.client.futures_symbol_config()
+            for c in configs:
+                self.symbol_state[c['symbol']] = {
+                    'margin_type': c['marginType'].upper(),
+                    'leverage': int(c['leverage']),
+                }
         except Exception as e:
-            print(f"⚠️ OperationHandler: Error conectando a Binance: {e}")
+            await log(f"⚠️ symbolConfig no disponible ({e}), usando positionRisk.")
+            try:
+                positions = await self.client.futures_position_information()
+                for p in positions:
+                    if 'marginType' not in p or 'leverage' not in p:
+                        continue
+                    self.symbol_state[p['symbol']] = {
+                        'margin_type': 'ISOLATED' if p['marginType'].lower() == 'isolated' else 'CROSSED',
+                        'leverage': int(p['leverage']),
+                    }
+            except Exception as e:
+                await log(f"⚠️ Error cargando estado de símbolos: {e}")
+                return
+
+        await log(f"📦 Estado de margen/apalancamiento cargado: {len(self.symbol_state)} símbolos.")
 
-    def _check_position_mode(self):
+    def _handle_user_event(self, event):
+        """Mantiene el caché al día con los eventos del user-data stream."""
+        event_type = event.get('e')
+
+        if event_type == 'ACCOUNT_CONFIG_UPDATE' and 'ac' in event:
+            config = event['ac']
+            self.symbol_state.setdefault(config['s'], {})['leverage'] = int(config['l'])
+
+        elif event_type == 'ACCOUNT_UPDATE':
+            for position in event.get('a', {}).get('P', []):
+                if 'mt' in position:
+                    margin_type = 'ISOLATED' if position['mt'].lower() == 'isolated' else 'CROSSED'
+                    self.symbol_state.setdefault(position['s'], {})['margin_type'] = margin_type
+
+    async def _user_stream_loop(self):
+        while True:
+            try:
+                bm = BinanceSocketManager(self.client)
+                async with bm.futures_user_socket() as stream:
+                    await log("🔗 User-data stream conectado.")
+                    while True:
+                        event = await stream.recv()
+                        if isinstance(event, dict):
+                            self._handle_user_event(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await log(f"⚠️ User-data stream caído: {e}. Reintentando en 5s...")
+                await asyncio.sleep(5)
+
+    def prearm(self, symbols):
+        """
+        Configura en segundo plano margen aislado y apalancamiento de todos los
+        símbolos filtrados, así la señal no paga esas llamadas.
+        """
+        if self._prearm_task is not None and not self._prearm_task.done():
+            self._prearm_task.cancel()
+        self._prearm_task = asyncio.create_task(self._prearm(list(symbols)), name="prearm-symbols")
+
+    async def _prearm(self, symbols):
+        pending = [s for s in symbols if self.symbol_state.get(s) != {'margin_type': 'ISOLATED', 'leverage': LEVERAGE}]
+        if not pending:
+            return
+
+        await log(f"🛠️ Pre-armando {len(pending)} símbolos...")
+        semaphore = asyncio.Semaphore(PREARM_CONCURRENCY)
+
+        async def arm(symbol):
+            async with semaphore:
+                await self._ensure_isolated_margin(symbol)
+                await self._set_leverage(symbol, LEVERAGE)
+
+        await asyncio.gather(*(arm(s) for s in pending))
+        await log(f"🛠️ Pre-armado completo ({len(pending)} símbolos).")
+
+    async def _check_position_mode(self):
         """Detecta si estamos en Hedge Mode o One-Way."""
         try:
-            info = self.client.futures_get_position_mode()
+            info = await self.client.futures_get_position_mode()
             if info['dualSidePosition']:
                 self.hedge_mode = True
-                print("ℹ️ Modo detectado: HEDGE MODE")
+                await log("ℹ️ Modo detectado: HEDGE MODE")
             else:
                 self.hedge_mode = False
-                print("ℹ️ Modo detectado: ONE-WAY MODE")
+                await log("ℹ️ Modo detectado: ONE-WAY MODE")
         except Exception as e:
-            print(f"⚠️ Error obteniendo modo: {e}. Asumiendo One-Way.")
+            await log(f"⚠️ Error obteniendo modo: {e}. Asumiendo One-Way.")
 
-    def _ensure_isolated_margin(self, symbol):
+    async def _ensure_isolated_margin(self, symbol):
         """
         Fuerza el modo de margen a AISLADO (ISOLATED).
-        Si ya está en aislado, ignora el error.
+        Si ya está en aislado (según el caché o el error), no hace nada.
         """
+        if self.symbol_state.get(symbol, {}).get('margin_type') == 'ISOLATED':
+            return
+
         try:
-            self.client.futures_change_margin_type(symbol=symbol, marginType='ISOLATED')
-            print(f"✅ {symbol}: Modo ISOLATED activado.")
+            await self.client.futures_change_margin_type(symbol=symbol, marginType='ISOLATED')
+            self.symbol_state.setdefault(symbol, {})['margin_type'] = 'ISOLATED'
+            await log(f"✅ {symbol}: Modo ISOLATED activado.")
         except BinanceAPIException as e:
             # Error -4046 significa "No need to change margin type" (Ya está en Isolated)
             if e.code == -4046:
-                pass 
+                self.symbol_state.setdefault(symbol, {})['margin_type'] = 'ISOLATED'
             else:
-                print(f"⚠️ Aviso Margen {symbol}: {e.message}")
+                await log(f"⚠️ Aviso Margen {symbol}: {e.message}")
         except Exception as e:
-            print(f"⚠️ Error genérico configurando margen: {e}")
+            await log(f"⚠️ Error genérico configurando margen: {e}")
 
-    def _set_leverage(self, symbol, leverage):
+    async def _set_leverage(self, symbol, leverage):
         """
         Configura el apalancamiento para un símbolo específico.
-        Si ya está configurado, ignora el error.
+        Si ya está configurado (según el caché o el error), no hace nada.
         """
+        if self.symbol_state.get(symbol, {}).get('leverage') == leverage:
+            return
+
         try:
-            self.client.futures_change_leverage(symbol=symbol, leverage=leverage)
-            print(f"⚙️ {symbol}: Apalancamiento {leverage}x configurado.")
+            await self.client.futures_change_leverage(symbol=symbol, leverage=leverage)
+            self.symbol_state.setdefault(symbol, {})['leverage'] = leverage
+            await log(f"⚙️ {symbol}: Apalancamiento {leverage}x configurado.")
         except BinanceAPIException as e:
             # Error -4046 significa "No need to change leverage" (Ya está configurado)
             if e.code == -4046:
-                pass
+                self.symbol_state.setdefault(symbol, {})['leverage'] = leverage
             else:
-                print(f"⚠️ Aviso Apalancamiento {symbol}: {e.message}")
+                await log(f"⚠️ Aviso Apalancamiento {symbol}: {e.message}")
         except Exception as e:
-            print(f"⚠️ Error configurando apalancamiento: {e}")
+            await log(f"⚠️ Error configurando apalancamiento: {e}")
 
-    def _get_symbol_filters(self, symbol):
-        """Obtiene tickSize y stepSize exactos para precisión."""
+    async def refresh_symbol_filters(self):
+        """Descarga exchangeInfo una sola vez y reconstruye el índice de filtros."""
         try:
-            info = self.client.futures_exchange_info()
-            tick_size = None
-            step_size = None
-            price_precision = 2
-            qty_precision = 3
-
-            for s in info['symbols']:
-                if s['symbol'] == symbol:
-                    price_precision = s['pricePrecision']
-                    qty_precision = s['quantityPrecision']
-                    for f in s['filters']:
-                        if f['filterType'] == 'PRICE_FILTER':
-                            tick_size = float(f['tickSize'])
-                        if f['filterType'] == 'LOT_SIZE':
-                            step_size = float(f['stepSize'])
-                    break
-            
-            if tick_size is None: tick_size = 1 / (10**price_precision)
-            if step_size is None: step_size = 1 / (10**qty_precision)
-
-            return price_precision, qty_precision, tick_size, step_size
+            self.symbol_filters.update(await self.client.futures_exchange_info())
+            await log(f"📦 Filtros actualizados: {len(self.symbol_filters)} símbolos.")
         except Exception as e:
-            print(f"⚠️ Error filtros {symbol}: {e}")
-            return 2, 3, 0.01, 0.001
+            await log(f"⚠️ Error actualizando filtros: {e}")
+
+    def _refresh_filters_task(self):
+        """Una sola descarga de exchangeInfo en curso, compartida por quien la pida."""
+        if self._filters_task is None or self._filters_task.done():
+            self._filters_task = asyncio.create_task(self.refresh_symbol_filters(), name="symbol-filters")
+        return self._filters_task
+
+    async def _get_symbol_filters(self, symbol):
+        """
+        Obtiene tickSize, stepSize y mínimos desde el índice en memoria. Con
+        el índice vencido se usa la entrada en caché y se refresca en segundo
+        plano; solo un símbolo ausente del índice espera la descarga.
+        """
+        filters = self.symbol_filters.get(symbol)
+        if filters is None:
+            await asyncio.shield(self._refresh_filters_task())
+            filters = self.symbol_filters.get(symbol)
+        elif self.symbol_filters.is_stale():
+            self._refresh_filters_task()
+
+        if filters is None:
+            await log(f"⚠️ Sin filtros para {symbol}, usando valores por defecto.")
+            return SymbolFilters(2, 3, 0.01, 0.001, 0.0, 0.0)
+        return filters
 
     def _round_to_step(self, value, step, precision):
         """Redondeo estricto para evitar errores de precisión."""
@@ -110,79 +228,59 @@ class OperationHandler:
         fmt = "{:." + str(precision) + "f}"
         return fmt.format(rounded)
 
-    def _place_algo_order_manual(self, **params):
+    async def _place_algo_order(self, **params):
         """
-        Realiza una petición POST manual firmada al endpoint '/fapi/v1/algoOrder'.
-        Se usa cuando la librería python-binance no tiene el método o falla.
+        Coloca una orden condicional en '/fapi/v1/algoOrder'. Si la librería no
+        tiene el método, firma la petición con el mismo cliente (misma sesión).
         """
-        endpoint = "/fapi/v1/algoOrder"
-        
-        # 1. Preparar Parámetros
-        params['timestamp'] = int(time.time() * 1000)
-        # Eliminar Nones
+        params['algoType'] = 'CONDITIONAL'
+
+        # Opción A: Librería actualizada
+        if hasattr(self.client, 'futures_create_algo_order'):
+            return await self.client.futures_create_algo_order(**params)
+
+        # Opción B: Fallback sobre la sesión compartida del cliente
         clean_params = {k: v for k, v in params.items() if v is not None}
-        
-        # 2. Generar Query String y Firma
-        query_string = urllib.parse.urlencode(clean_params)
-        signature = hmac.new(
-            self.secret_key.encode('utf-8'), 
-            query_string.encode('utf-8'), 
-            hashlib.sha256
-        ).hexdigest()
-        
-        # 3. Headers
-        headers = {
-            'X-MBX-APIKEY': self.api_key
-        }
-        
-        # 4. URL Completa (query string + signature va en params de requests, o en data)
-        # Para POST en Binance, se envía como data-encoded o params. Requests lo maneja bien en 'data' si no es json.
-        # Pero Binance suele preferir query params en el body para POST.
-        
-        full_params = clean_params.copy()
-        full_params['signature'] = signature
-        
-        url = f"{self.base_url}{endpoint}"
-        
-        response = requests.post(url, headers=headers, params=full_params)
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise BinanceAPIException(
-                response.status_code, 
-                response.status_code, 
-                response.text
-            )
+        return await self.client._request_futures_api('post', 'algoOrder', True, data=clean_params)
 
-    def _place_algo_order(self, **params):
+    async def _wait_for_fill(self, symbol, order):
         """
-        Intenta usar la librería, si falla, usa el método manual.
+        Confirma la entrada consultando la orden (sin sleep fijo): devuelve la
+        orden en estado FILLED o None si no se llenó a tiempo.
         """
-        params['algoType'] = 'CONDITIONAL'
-        
-        # Opción A: Librería actualizada
-        if hasattr(self.client, 'futures_create_algo_order'):
-            return self.client.futures_create_algo_order(**params)
-        
-        # Opción B: Fallback manual
-        return self._place_algo_order_manual(**params)
+        delay = 0.05
+        deadline = time.monotonic() + ENTRY_FILL_TIMEOUT
+
+        while order.get('status') != 'FILLED':
+            if order.get('status') in ('CANCELED', 'EXPIRED', 'REJECTED') or time.monotonic() > deadline:
+                return None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+            order = await self.client.futures_get_order(symbol=symbol, orderId=order['orderId'])
 
-    def process_new_signal(self, signal_data):
+        return order
+
+    def submit(self, signal_data):
+        """Lanza process_new_signal como tarea del event loop (sin hilos)."""
+        task = asyncio.create_task(self.process_new_signal(signal_data), name=f"order-{signal_data.get('symbol')}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def process_new_signal(self, signal_data):
         symbol = signal_data.get('symbol')
-        signal_direction = signal_data.get('direction') 
+        signal_direction = signal_data.get('direction')
         ref_price = float(signal_data.get('price', 0))
+        t_signal = signal_data.get('signal_time', time.time())
 
         if not symbol or ref_price == 0:
             return
 
-        print(f"⚡ PROCESANDO SEÑAL: {symbol} | Dir: {signal_direction}")
+        if self.client is None:
+            await log(f"⚠️ OperationHandler sin cliente, señal ignorada: {symbol}")
+            return
 
-        # 0. Configurar Margen Aislado (Requerimiento Usuario)
-        self._ensure_isolated_margin(symbol)
-        
-        # 0.1 Configurar Apalancamiento
-        self._set_leverage(symbol, 10)  
+        await log(f"⚡ PROCESANDO SEÑAL: {symbol} | Dir: {signal_direction}")
 
         # 1. Definir Lados (Estrategia Contrarian)
         if signal_direction == "LONG":
@@ -203,16 +301,27 @@ class OperationHandler:
             raw_sl = ref_price * (1 + sl_pct)
 
         try:
+            # 0. Margen Aislado, Apalancamiento y Filtros en paralelo
+            _, _, filters = await asyncio.gather(
+                self._ensure_isolated_margin(symbol),
+                self._set_leverage(symbol, LEVERAGE),
+                self._get_symbol_filters(symbol),
+            )
+            t_setup = time.time()
+
             # 2. Cálculos de Precisión
-            p_prec, q_prec, tick_size, step_size = self._get_symbol_filters(symbol)
             position_size_usdt = 100.0
             raw_qty = position_size_usdt / ref_price
-            
-            qty_str = self._round_to_step(raw_qty, step_size, q_prec)
-            tp_str = self._round_to_step(raw_tp, tick_size, p_prec)
-            sl_str = self._round_to_step(raw_sl, tick_size, p_prec)
 
-            print(f"📝 PLAN ({user_msg}): Qty:{qty_str} | TP:{tp_str} | SL:{sl_str}")
+            qty_str = self._round_to_step(raw_qty, filters.step_size, filters.qty_precision)
+            tp_str = self._round_to_step(raw_tp, filters.tick_size, filters.price_precision)
+            sl_str = self._round_to_step(raw_sl, filters.tick_size, filters.price_precision)
+
+            if float(qty_str) < filters.min_qty or float(qty_str) * ref_price < filters.min_notional:
+                await log(f"⚠️ {symbol}: Qty {qty_str} por debajo del mínimo (minQty {filters.min_qty}, minNotional {filters.min_notional}).")
+                return
+
+            await log(f"📝 PLAN ({user_msg}): Qty:{qty_str} | TP:{tp_str} | SL:{sl_str}")
 
             # 3. ENTRADA (Usa endpoint estándar de orden)
             entry_params = {
@@ -220,19 +329,26 @@ class OperationHandler:
                 'side': side_entry,
                 'type': ORDER_TYPE_MARKET,
                 'quantity': qty_str,
+                'newOrderRespType': 'RESULT',
             }
             if position_side:
                 entry_params['positionSide'] = position_side
 
-            print(f"🚀 Enviando ENTRADA...")
-            entry_order = self.client.futures_create_order(**entry_params)
-            avg_price = float(entry_order.get('avgPrice', ref_price))
-            print(f"✅ ENTRADA EJECUTADA @ {avg_price}")
+            await log(f"🚀 Enviando ENTRADA...")
+            entry_order = await self.client.futures_create_order(**entry_params)
+            t_ack = time.time()
+            order_latency.record(t_ack - signal_data.get('detected_at', t_signal))
 
-            time.sleep(1.5)
+            filled = await self._wait_for_fill(symbol, entry_order)
+            if filled is None:
+                await log(f"❌ ENTRADA no confirmada para {symbol}, no se colocan SL/TP.")
+                return
+            t_fill = time.time()
+            avg_price = float(filled.get('avgPrice') or ref_price)
+            await log(f"✅ ENTRADA EJECUTADA @ {avg_price}")
+
+            # 4. SALIDAS (TP / SL) -> USANDO ALGO ORDER (Nuevo Endpoint), en paralelo
 
-            # 4. SALIDAS (TP / SL) -> USANDO ALGO ORDER (Nuevo Endpoint)
-            
             common_algo_params = {
                 'symbol': symbol,
                 'side': side_exit,
@@ -243,31 +359,45 @@ class OperationHandler:
             if position_side:
                 common_algo_params['positionSide'] = position_side
 
+            sl_params = {**common_algo_params, 'type': 'STOP_MARKET', 'triggerPrice': sl_str}
+            tp_params = {**common_algo_params, 'type': 'TAKE_PROFIT_MARKET', 'triggerPrice': tp_str}
+
+            sl_result, tp_result = await asyncio.gather(
+                self._place_algo_order(**sl_params),
+                self._place_algo_order(**tp_params),
+                return_exceptions=True
+            )
+
             # -- STOP LOSS --
-            try:
-                sl_params = common_algo_params.copy()
-                sl_params['type'] = 'STOP_MARKET'
-                sl_params['triggerPrice'] = sl_str # Endpoint nuevo requiere 'triggerPrice'
-                
-                self._place_algo_order(**sl_params)
-                print(f"   🛡️ SL (Algo) colocado en {sl_str}")
-            except Exception as e:
-                print(f"   ❌ ERROR SL: {e}")
+            if isinstance(sl_result, Exception):
+                await log(f"   ❌ ERROR SL: {sl_result}")
+            else:
+                await log(f"   🛡️ SL (Algo) colocado en {sl_str}")
 
             # -- TAKE PROFIT --
-            try:
-                tp_params = common_algo_params.copy()
-                tp_params['type'] = 'TAKE_PROFIT_MARKET'
-                tp_params['triggerPrice'] = tp_str # Endpoint nuevo requiere 'triggerPrice'
-                
-                self._place_algo_order(**tp_params)
-                print(f"   💰 TP (Algo) colocado en {tp_str}")
-            except Exception as e:
-                print(f"   ❌ ERROR TP: {e}")
+            if isinstance(tp_result, Exception):
+                await log(f"   ❌ ERROR TP: {tp_result}")
+            else:
+                await log(f"   💰 TP (Algo) colocado en {tp_str}")
 
-            print(f"🏁 Finalizado {symbol}")
+            t_exits = time.time()
+            latency = {
+                'symbol': symbol,
+                'setup': t_setup - t_signal,
+                'entry_ack': t_ack - t_signal,
+                'entry_fill': t_fill - t_signal,
+                'exits_placed': t_exits - t_signal,
+            }
+            self.latencies.append(latency)
+            del self.latencies[:-100]
+
+            await log(
+                f"🏁 Finalizado {symbol} | ⏱️ setup {latency['setup'] * 1000:.0f}ms, "
+                f"ack {latency['entry_ack'] * 1000:.0f}ms, fill {latency['entry_fill'] * 1000:.0f}ms, "
+                f"SL/TP {latency['exits_placed'] * 1000:.0f}ms"
+            )
 
         except BinanceAPIException as e:
-            print(f"❌ ERROR CRÍTICO API ({symbol}): {e.message} Code:{e.code}")
+            await log(f"❌ ERROR CRÍTICO API ({symbol}): {e.message} Code:{e.code}")
         except Exception as e:
-            print(f"❌ ERROR GENÉRICO ({symbol}): {e}")
\ No newline at end of file
+            await log(f"❌ ERROR GENÉRICO ({symbol}): {e}")
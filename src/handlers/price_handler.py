@@ -1,158 +1,388 @@
 import time
 import asyncio
-from collections import deque
-from binance import BinanceSocketManager
-from handlers.log_handler import log
-from handlers.alert_handler import alert_handler
-from handlers.trade_handler import check_trade_conditions, get_active_trades_count
-from config.settings import THRESHOLD, TIME_WINDOW
+from handlers.log_handler import log, log_event
+from handlers.dispatch_handler import SignalEvent, dispatcher
+from handlers.alert_handler import sender
+from handlers.snapshot_handler import restore_state, start_snapshots
+from handlers.rest_handler import rest
+from handlers.stream_handler import StreamSupervisor
+from handlers.feed_handler import TieredFeed
+from handlers.shard_handler import ShardedScanner
+from handlers.trade_handler import (
+    check_trade_conditions, trade_tick, note_price, trigger_bands, start_timeout_scheduler,
+    get_active_trades_count, get_active_symbols
+)
+from utils.price_history import PriceHistory
+from utils.detector import SpikeDetector, create_detector
+from utils.frames import parse_mini_ticker_frame
+from utils.decoder import FrameDecoder, TickerBatch
+from utils.recorder import TickRecorder
+from utils.metrics import metrics
+from config.settings import (
+    THRESHOLD, TIME_WINDOW, HISTORY_CAPACITY, DETECTOR, BATCH_MODE, FAST_FEED_ENABLED, FAST_FEED_ARM_RATIO, SCAN_WORKERS,
+    RECORDER_ENABLED, RECORDER_PATH, RECORDER_SEGMENT_SECONDS, RECORDER_COMPRESS, RECORDER_QUEUE_SIZE, FRAME_DECODER,
+    STREAM_RESTART_DELAY
+)
 
-global_price_history = {}
+global_price_history = PriceHistory(TIME_WINDOW, HISTORY_CAPACITY)
+detector = create_detector(DETECTOR, global_price_history, THRESHOLD)
 
-async def _handle_market_stream(client, price_history: dict):
-    await log("🌐 Creating all market mini tickers stream (!miniTicker@arr)")
-    
-    bm = BinanceSocketManager(client)
-    ts = bm.futures_multiplex_socket(['!miniTicker@arr'])
+recorder = TickRecorder(
+    RECORDER_PATH, RECORDER_SEGMENT_SECONDS, RECORDER_COMPRESS, RECORDER_QUEUE_SIZE, log=log_event
+) if RECORDER_ENABLED else None
 
-    try:
-        await log("🔗 Connecting to Binance all market mini tickers stream...")
-        async with ts as tscm:
-            await log("✅ Successfully connected to all market mini tickers stream!")
-            await log(f"📊 Monitoring {len(price_history)} symbols")
+# The per-ticker path reads ticker dicts; batch and sharded paths take columns.
+stream = StreamSupervisor(['!miniTicker@arr'], decoder=FrameDecoder(FRAME_DECODER, batches=BATCH_MODE or bool(SCAN_WORKERS)))
+feed = TieredFeed(stream) if FAST_FEED_ENABLED and (BATCH_MODE or SCAN_WORKERS) else None
+scanner = ShardedScanner(SCAN_WORKERS) if SCAN_WORKERS else None
+
+detection_latency = metrics.histogram('signal_detection_seconds', 'Frame received to signal detected')
+frame_latency = metrics.histogram('frame_processing_seconds', 'Time spent processing one stream message')
+frames_meter = metrics.meter('stream_frames', 'Market stream messages processed')
+tickers_meter = metrics.meter('stream_tickers', 'Tickers processed')
+frame_errors = metrics.counter('stream_frame_errors', 'Market stream messages that failed processing')
+
+async def _submit_signal(symbol, percentage_change, price, volume, received_at=None):
+    event = SignalEvent(symbol, percentage_change, price, volume)
+    if received_at:
+        detection_latency.record(event.detected_at - received_at)
+    await log(f"📊 COIN FOUND: {symbol} ({percentage_change:+.2f}%)", symbol=symbol)
+    await dispatcher.submit(event)
+
+async def _emit_signal(detector: SpikeDetector, symbol, percentage_change, price, volume, received_at=None):
+    await _submit_signal(symbol, percentage_change, price, volume, received_at)
+    detector.reset(symbol)
+
+async def _process_tickers(detector: SpikeDetector, tickers, message_count, received_at=None):
+    """
+    Per-ticker path: one detector update and trade check per ticker.
+    """
+    price_history = detector.history
+    alerts_found = 0
+
+    for ticker_data in tickers:
+        if not isinstance(ticker_data, dict):
+            continue
+        
+        if ticker_data.get('e') != '24hrMiniTicker':
+            continue
+        
+        symbol = ticker_data.get('s')
+        if symbol not in price_history:
+            continue
+        
+        try:
+            price_str = ticker_data.get('c')
+            volume_str = ticker_data.get('q')
             
-            last_cleanup_time = time.time()
-            message_count = 0
-            alerts_found = 0
+            if price_str is None:
+                if message_count <= 5:
+                    await log(f"⚠️ Missing price field for {symbol}: c={price_str}")
+                continue
             
-            while True:
-                try:
-                    msg = await asyncio.wait_for(tscm.recv(), timeout=1.0)
-                    message_count += 1
-                    
-                    if message_count % 500 == 0:
-                        await log(f"📈 Processed {message_count} messages, found {alerts_found} alerts")
-                    
-                except asyncio.TimeoutError:
-                    continue
-
-                if not isinstance(msg, dict):
-                    continue
-                
-                if 'data' not in msg or not isinstance(msg['data'], list):
-                    continue
-                
-                for ticker_data in msg['data']:
-                    if not isinstance(ticker_data, dict):
-                        continue
-                    
-                    if ticker_data.get('e') != '24hrMiniTicker':
-                        continue
-                    
-                    symbol = ticker_data.get('s')
-                    if symbol not in price_history:
-                        continue
-                    
-                    try:
-                        price_str = ticker_data.get('c')
-                        volume_str = ticker_data.get('q')
-                        
-                        if price_str is None:
-                            if message_count <= 5:
-                                await log(f"⚠️ Missing price field for {symbol}: c={price_str}")
-                            continue
-                        
-                        price = float(price_str)
-                        volume = float(volume_str) if volume_str else 0.0
-                        now = time.time()
-                        
-                        history = price_history[symbol]
-                        history.append((now, price))
-                        
-                        await check_trade_conditions(symbol, price)
-                        
-                        if now - last_cleanup_time > 60:
-                            await log(f"🧹 Running batch cleanup for {len(price_history)} symbols...")
-                            await log(f"📊 Active trades: {get_active_trades_count()}")
-                            for hist in price_history.values():
-                                while hist and (now - hist[0][0]) > TIME_WINDOW:
-                                    hist.popleft()
-                            last_cleanup_time = now
-                        
-                        if len(history) >= 2:
-                            old_price = history[0][1]
-                            percentage_change = ((price - old_price) / old_price) * 100
-                            
-                            if abs(percentage_change) >= THRESHOLD:
-                                alerts_found += 1
-                                emoji = ("🟢", "📈") if percentage_change > 0 else ("🔴", "📉")
-                                
-                                await log(f"📊 COIN FOUND: {symbol} ({percentage_change:+.2f}%)")
-                                
-                                try:
-                                    original_msg_id = await alert_handler(
-                                        symbol, percentage_change, price, emoji, volume
-                                    )
-
-                                    from handlers.trade_handler import trade_handler
-                                    await trade_handler(
-                                        bm, symbol, percentage_change, price, original_msg_id, volume
-                                    )
-
-                                except Exception as e:
-                                    await log(f"[ERROR] Alert/trade failed for {symbol}: {e}")
-
-                                price_history[symbol] = deque()
-                    
-                    except (ValueError, KeyError, TypeError) as e:
-                        await log(f"Data processing error for {symbol}: {e}")
-                        continue
-
-    except asyncio.CancelledError:
-        await log("Market stream canceled.")
+            price = float(price_str)
+            volume = float(volume_str) if volume_str else 0.0
+            now = time.time()
+            
+            percentage_change = detector.update(symbol, now, price)
+            
+            if trade_tick(symbol, price):
+                await check_trade_conditions(symbol, price)
+            
+            if percentage_change is not None:
+                alerts_found += 1
+                await _emit_signal(detector, symbol, percentage_change, price, volume, received_at)
         
-    except Exception as e:
-        await log(f"Critical market stream error: {e}")
+        except (ValueError, KeyError, TypeError) as e:
+            await log(f"Data processing error for {symbol}: {e}", level='warning', key=('ticker-error', symbol), symbol=symbol)
+            continue
+
+    return alerts_found
+
+async def _process_frame_batch(detector: SpikeDetector, tickers, received_at=None):
+    """
+    Batch path: the whole frame is parsed into arrays, every history row is
+    updated at once and only symbols that crossed THRESHOLD or have open
+    trades reach Python-level code.
+    """
+    price_history = detector.history
+    rows, closes, volumes = parse_mini_ticker_frame(tickers, price_history.index)
+    if not rows.size:
+        return 0
+
+    now = time.time()
+    positions, changes = detector.update_batch(rows, now, closes)
+
+    active_symbols = get_active_symbols()
+    if active_symbols:
+        frame_position = dict(zip(rows.tolist(), range(rows.size)))
+        for symbol in list(active_symbols):
+            i = frame_position.get(price_history.index.get(symbol))
+            if i is None:
+                continue
+            price = float(closes[i])
+            if trade_tick(symbol, price):
+                await check_trade_conditions(symbol, price)
+
+    for i, percentage_change in zip(positions.tolist(), changes.tolist()):
+        symbol = price_history.symbol_at(int(rows[i]))
+        await _emit_signal(detector, symbol, percentage_change, float(closes[i]), float(volumes[i]), received_at)
+
+    if feed:
+        armed = []
+        for i in detector.near_threshold(rows, closes, FAST_FEED_ARM_RATIO).tolist():
+            symbol = price_history.symbol_at(int(rows[i]))
+            armed.append(symbol)
+            feed.volumes[symbol] = float(volumes[i])
+        await feed.update(armed, active_symbols, now)
+
+    return len(positions)
+
+async def _process_fast_tick(detector: SpikeDetector, data, received_at=None):
+    """
+    Fast path for promoted symbols: TP/SL check and a detector peek on every
+    aggTrade/bookTicker event. Ticks are not stored in the history, which
+    keeps its one-sample-per-frame cadence.
+    """
+    tick = feed.parse(data)
+    if tick is None:
+        return 0
+    symbol, price = tick
+
+    if scanner:
+        scanner.publish_tick(received_at or time.time(), symbol, price)
+        note_price(symbol, price)
+        return 0
+
+    if symbol not in detector.history:
+        return 0
+
+    feed.stats['ticks'] += 1
+    if trade_tick(symbol, price):
+        await check_trade_conditions(symbol, price)
+
+    percentage_change = detector.peek(symbol, price)
+    if percentage_change is None:
+        return 0
+    feed.stats['signals'] += 1
+    await _emit_signal(detector, symbol, percentage_change, price, feed.volumes.get(symbol, 0.0), received_at)
+    return 1
+
+async def _process_frame_sharded(tickers):
+    """
+    Sharded path: the frame is parsed here and fanned out to the scan
+    workers; their signals and trigger crossings come back through
+    _handle_scanner_events(). Only the last price of open-trade symbols is
+    kept here, for timeouts.
+    """
+    for shard in scanner.revive():
+        await log(f"⚠️ Scan worker {shard} died, restarted (its history starts empty, warming up for {TIME_WINDOW}s)")
+
+    rows, closes, volumes = parse_mini_ticker_frame(tickers, scanner.index)
+    if not rows.size:
+        return 0
+
+    now = time.time()
+    scanner.publish(now, rows, closes, volumes)
+
+    active_symbols = get_active_symbols()
+    if active_symbols:
+        frame_position = dict(zip(rows.tolist(), range(rows.size)))
+        for symbol in list(active_symbols):
+            i = frame_position.get(scanner.index.get(symbol))
+            if i is not None:
+                note_price(symbol, float(closes[i]))
+    scanner.sync_bands(trigger_bands)
+
+    if feed:
+        await feed.update(scanner.armed_symbols(), active_symbols, now)
+    return 0
+
+async def _handle_scanner_events():
+    async for event in scanner.events():
+        try:
+            if event[0] == 'signal':
+                _, symbol, percentage_change, price, volume, sampled_at = event
+                await _submit_signal(symbol, percentage_change, price, volume, sampled_at)
+            elif event[0] == 'trade':
+                _, symbol, price = event
+                await check_trade_conditions(symbol, price)
+                scanner.sync_bands(trigger_bands)
+            elif event[0] == 'error':
+                await log(f"❌ Scan worker {event[1]} error: {event[2]}")
+        except Exception as e:
+            await log(f"❌ Error handling scan event {event[0]}: {e}")
+
+async def _handle_market_stream(detector: SpikeDetector):
+    price_history = detector.history
+    if scanner:
+        await log(f"📊 Monitoring {len(scanner)} symbols on {scanner.workers} scan workers")
+    else:
+        await log(f"📊 Monitoring {len(price_history)} symbols")
+        await log(f"⚙️ Frame processing: {'batch' if BATCH_MODE else 'per ticker'} (decoder: {stream.decoder.backend})")
+    
+    last_stats_time = time.time()
+    message_count = 0
+    alerts_found = 0
+    
+    async for msg in stream.frames():
+        message_count += 1
         
-    finally:
-        await log("Market stream closed.")
+        if message_count % 500 == 0:
+            await log(f"📈 Processed {message_count} messages, found {alerts_found} alerts")
+
+        if not isinstance(msg, dict):
+            continue
+
+        started = time.perf_counter()
+        received_at = msg.get('received_at')
+
+        # One bad frame (or a failed subscribe, trade check...) must not end
+        # the stream: log it and go on with the next one.
+        try:
+            if feed and feed.handles(msg.get('stream', '')) and isinstance(msg.get('data'), dict):
+                alerts_found += await _process_fast_tick(detector, msg['data'], received_at)
+                tickers_meter.inc()
+                frame_latency.record(time.perf_counter() - started)
+                continue
+
+            if 'data' not in msg or not isinstance(msg['data'], (list, TickerBatch)):
+                continue
+
+            if recorder:
+                recorder.record(time.time(), msg['data'])
+
+            if scanner:
+                await _process_frame_sharded(msg['data'])
+            elif BATCH_MODE:
+                alerts_found += await _process_frame_batch(detector, msg['data'], received_at)
+            else:
+                alerts_found += await _process_tickers(detector, msg['data'], message_count, received_at)
+        except Exception as e:
+            frame_errors.inc()
+            await log(f"❌ Error processing {msg.get('stream')} message: {e!r}", key='frame-error')
+            continue
 
+        frames_meter.inc()
+        tickers_meter.inc(len(msg['data']))
+        frame_latency.record(time.perf_counter() - started)
 
-async def price_handler(client, coins, duration_seconds):
+        now = time.time()
+        if now - last_stats_time > 60:
+            await log(f"📊 Active trades: {get_active_trades_count()}")
+            if scanner:
+                shards = scanner.metrics()
+                await log(
+                    f"🧩 Scan workers: {shards['alive']}/{shards['workers']} alive, {shards['published']} ticks published, "
+                    f"{shards['dropped']} dropped, {shards['restarts']} restarts, warming {shards['warming']}"
+                )
+            else:
+                usage = price_history.memory_usage()
+                await log(f"💾 History: {usage['samples']} samples, {usage['bytes_allocated'] / 1e6:.1f} MB allocated")
+            stats = dispatcher.metrics()
+            await log(f"📬 Dispatch: depth {stats['depth']}, dropped {stats['dropped']}, avg latency {stats['latency_avg']:.2f}s")
+            telegram = sender.metrics()
+            await log(
+                f"📨 Telegram: {telegram['sent']} sent, {telegram['merged']} merged, {telegram['rate_limited']} rate limited, "
+                f"depth {telegram['depth']}, signal p50/p99 {telegram['signal_latency']['p50']:.2f}/{telegram['signal_latency']['p99']:.2f}s"
+            )
+            await log(f"🌐 REST: used weight {rest.stats['used_weight']}, {rest.stats['requests']} requests, {rest.stats['rate_limited']} rate limited")
+            for conn in stream.metrics()['connections']:
+                await log(
+                    f"🔌 Stream {conn['name']}: {'up' if conn['connected'] else 'down'}, {conn['delivered']} delivered, "
+                    f"{conn['duplicates']} dup, {conn['late']} late, {conn['stalls']} stalls, skew {conn['skew_avg']:.2f}s"
+                )
+            if feed:
+                await log(
+                    f"⚡ Fast feed: {len(feed.promoted)} promoted, {feed.stats['ticks']} ticks, "
+                    f"{feed.stats['signals']} signals, {feed.stats['capped']} capped"
+                )
+            if recorder:
+                await log(f"🎞️ Recorder: {recorder.stats['ticks']} ticks, {recorder.stats['dropped']} frames dropped")
+            last_stats_time = now
+
+async def update_universe(coins):
+    """
+    Swaps the tracked symbols for ``coins`` incrementally. Adds and removes
+    run between two frames, so the stream never sees a half-applied set;
+    symbols with open trades stay tracked until their trades close. New
+    symbols are then backfilled while the stream keeps running.
+    """
+    if scanner:
+        scanner.start()
+        current_coins = set(scanner.index)
+    else:
+        current_coins = set(global_price_history.symbols())
+    open_symbols = set(get_active_symbols())
+
+    new_coins = coins - current_coins
+    removed_coins = current_coins - coins - open_symbols
+
+    if scanner:
+        scanner.remove(removed_coins)
+        scanner.add(new_coins)
+    else:
+        for coin in removed_coins:
+            detector.remove(coin)
+        for coin in new_coins:
+            detector.add(coin)
+
+    if feed:
+        await feed.drop(removed_coins)
+
+    if new_coins:
+        await log(f"➕ Added {len(new_coins)} coins to history: {', '.join(sorted(new_coins))}")
+    if removed_coins:
+        await log(f"➖ Removed {len(removed_coins)} coins from history: {', '.join(sorted(removed_coins))}")
+
+    if scanner:
+        # The history lives in the workers: no snapshot or kline backfill.
+        await log(f"📈 Scanning {len(scanner)} coins on {scanner.workers} workers")
+    else:
+        await restore_state(detector, coins)
+        await log(f"📈 Price history size: {len(global_price_history)} coins")
+    return new_coins, removed_coins
+
+async def price_handler():
+    """
+    Long-lived market stream. The tracked symbols are changed underneath it
+    by update_universe(); reconnects and failover happen inside the
+    StreamSupervisor; frame processing is restarted after
+    STREAM_RESTART_DELAY if it ever fails outside a single frame.
+    """
     await log("🤖 PRICE TRACKER ACTIVATED")
-    await log(f"📊 Monitoring {len(coins)} filtered coins")
-    await log(f"⏰ Cycle duration: {duration_seconds/3600:.1f} hours")
     await log(f"🎯 Threshold: {THRESHOLD}%")
+    await log("🌐 Opening all market mini tickers stream (!miniTicker@arr)")
 
-    global global_price_history
-    
-    current_coins = set(coins)
-    existing_coins = set(global_price_history.keys())
-    
-    new_coins = current_coins - existing_coins
-    for coin in new_coins:
-        global_price_history[coin] = deque()
-        await log(f"➕ Added new coin to history: {coin}")
-    
-    removed_coins = existing_coins - current_coins
-    for coin in removed_coins:
-        del global_price_history[coin]
-        await log(f"➖ Removed coin from history: {coin}")
-    
-    await log(f"📈 Price history size: {len(global_price_history)} coins")
+    dispatcher.start()
+    start_timeout_scheduler()
+    stream.start()
+    if recorder:
+        recorder.start()
+
+    events_task = None
+    if scanner:
+        scanner.start()
+        events_task = asyncio.create_task(_handle_scanner_events(), name="scan-events")
+    else:
+        start_snapshots(detector)
 
     try:
-        await asyncio.wait_for(
-            _handle_market_stream(client, global_price_history),
-            timeout=duration_seconds + 60
-        )
-    except asyncio.TimeoutError:
-        await log("⏰ Cycle timeout reached. Restarting...")
+        while True:
+            try:
+                await _handle_market_stream(detector)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await log(f"[ERROR] Market stream processing failed: {e!r}. Restarting in {STREAM_RESTART_DELAY}s")
+                await asyncio.sleep(STREAM_RESTART_DELAY)
     except asyncio.CancelledError:
         await log("🔄 Price handler canceled externally.")
         raise
-    except Exception as e:
-        await log(f"[ERROR] Price handler error: {e}")
-        raise
     finally:
-        await log("✅ Price handler finished.")
\ No newline at end of file
+        await stream.stop()
+        if events_task:
+            events_task.cancel()
+            await asyncio.gather(events_task, return_exceptions=True)
+            await scanner.stop()
+        await log("Market stream closed.")
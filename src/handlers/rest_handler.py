@@ -0,0 +1,173 @@
+import asyncio
+import time
+from binance.exceptions import BinanceAPIException
+from handlers.log_handler import log
+from config.settings import REST_WEIGHT_LIMIT, REST_WEIGHT_SAFETY, REST_MAX_CONCURRENCY, REST_RETRIES
+
+WEIGHT_HEADERS = ('X-MBX-USED-WEIGHT-1M', 'X-MBX-USED-WEIGHT')
+
+def kline_weight(limit):
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+# Request weight of the futures endpoints we call (anything else counts as 1).
+WEIGHTS = {
+    'futures_klines': lambda kwargs: kline_weight(kwargs.get('limit', 500)),
+    'futures_ticker': lambda kwargs: 1 if 'symbol' in kwargs else 40,
+    'futures_exchange_info': lambda kwargs: 1,
+    'futures_symbol_config': lambda kwargs: 5,
+    'futures_position_information': lambda kwargs: 5,
+}
+
+def request_weight(method, kwargs):
+    weight = WEIGHTS.get(method)
+    return weight(kwargs) if weight else 1
+
+class RequestScheduler:
+    """
+    Shared gate for REST calls on the AsyncClient.
+
+    A token bucket sized to a share of the per-minute weight limit decides
+    when a request may start; it is pulled down to whatever the server
+    reports in X-MBX-USED-WEIGHT-1M after every response. That reading is
+    approximate: python-binance only keeps the last response on the client,
+    so with concurrent calls it may come from another call that finished at
+    the same moment. The header is the IP-wide counter either way, and it
+    can only lower the bucket, so the error is a slightly older or newer
+    reading, never a lost one. Any number of
+    requests run concurrently while the budget allows, a 429 pauses the
+    whole scheduler for Retry-After, and identical read requests in flight
+    at the same time share one HTTP call.
+    """
+
+    def __init__(self, limit=REST_WEIGHT_LIMIT, safety=REST_WEIGHT_SAFETY, max_concurrency=REST_MAX_CONCURRENCY,
+                 retries=REST_RETRIES, interval=60.0):
+        self.client = None
+        self.interval = interval
+        self.capacity = limit * safety
+        self.rate = self.capacity / interval
+        self.retries = retries
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._max_concurrency = max_concurrency
+        self._semaphore = None
+        self._lock = None
+        self._inflight = {}
+        self.stats = {
+            'requests': 0,
+            'coalesced': 0,
+            'throttled': 0,
+            'rate_limited': 0,
+            'used_weight': 0,
+        }
+
+    def start(self, client):
+        self.client = client
+        self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _observe(self, headers):
+        """Syncs the bucket with the weight the server says we already used."""
+        if headers is None:
+            return
+        for name in WEIGHT_HEADERS:
+            used = headers.get(name)
+            if used is not None:
+                used = int(used)
+                self.stats['used_weight'] = used
+                self._refill()
+                self.tokens = min(self.tokens, self.capacity - used)
+                return
+
+    def _block(self, seconds):
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self.tokens = min(self.tokens, 0.0)
+        self._updated = time.monotonic()
+
+    async def _acquire(self, weight):
+        weight = min(weight, self.capacity)
+
+        # Waiters queue on the lock, so requests start in arrival order.
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+
+                self._refill()
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+
+                self.stats['throttled'] += 1
+                await asyncio.sleep((weight - self.tokens) / self.rate)
+
+    async def _call(self, method, args, kwargs, weight):
+        func = getattr(self.client, method)
+
+        for attempt in range(self.retries + 1):
+            await self._acquire(weight)
+
+            async with self._semaphore:
+                self.stats['requests'] += 1
+                try:
+                    result = await func(*args, **kwargs)
+                except BinanceAPIException as e:
+                    headers = getattr(e.response, 'headers', None)
+                    self._observe(headers)
+                    if e.status_code not in (418, 429):
+                        raise
+
+                    retry_after = float((headers or {}).get('Retry-After') or self.interval)
+                    self._block(retry_after)
+                    self.stats['rate_limited'] += 1
+                    await log(f"⚠️ REST {e.status_code} on {method}: pausing requests for {retry_after:.0f}s")
+                    if e.status_code == 418 or attempt == self.retries:
+                        raise
+                    continue
+
+            # Shared client attribute: possibly another call's response (see above).
+            self._observe(getattr(getattr(self.client, 'response', None), 'headers', None))
+            return result
+
+    async def call(self, method, *args, weight=None, coalesce=True, **kwargs):
+        """
+        Runs ``client.<method>(*args, **kwargs)`` within the weight budget.
+
+        Pass ``coalesce=False`` for calls that must never be shared (orders).
+        """
+        if weight is None:
+            weight = request_weight(method, kwargs)
+
+        key = (method, args, tuple(sorted(kwargs.items()))) if coalesce else None
+        try:
+            hash(key)
+        except TypeError:
+            key = None
+
+        if key is None:
+            return await self._call(method, args, kwargs, weight)
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+        else:
+            future = asyncio.ensure_future(self._call(method, args, kwargs, weight))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        return await asyncio.shield(future)
+
+rest = RequestScheduler()
@@ -0,0 +1,265 @@
+import asyncio
+import multiprocessing
+import queue
+import threading
+import time
+import numpy as np
+from utils.shard_worker import run_worker, shard_of
+from utils.shm_ring import ShmRing, RECORD, FRAME, TICK
+from config.settings import (
+    SCAN_WORKERS, SCAN_RING_SIZE, THRESHOLD, TIME_WINDOW, HISTORY_CAPACITY, DETECTOR, FAST_FEED_ARM_RATIO
+)
+
+class ShardedScanner:
+    """
+    Coordinator of the multi-process scan.
+
+    The main process stays the ingest (socket, frame parsing) and owns
+    Telegram, orders and the database. Each parsed frame is split by
+    crc32(symbol) % workers and copied into that worker's shared-memory ring
+    as fixed-size records; a multiprocessing Event wakes the worker. Workers
+    run detection and the TP/SL trigger-band checks and send the few events
+    they produce (signals, band crossings, armed symbols) back on their own
+    result queue, read by a thread per worker and handed to the event loop.
+    Symbol adds/removes and band changes travel on small per-worker control
+    queues. A revived worker gets all-new queues and reader, and counts as
+    warming up until its fresh history spans TIME_WINDOW again.
+    """
+
+    def __init__(self, workers=SCAN_WORKERS, ring_size=SCAN_RING_SIZE):
+        self.workers = workers
+        self.ring_size = ring_size
+        self.index = {}
+        self.symbols = {}
+        self._next_id = 0
+        self._shard = np.zeros(0, dtype=np.int64)
+        self._rings = []
+        self._ready = []
+        self._control = []
+        self._processes = []
+        self._events = []
+        self._readers = []
+        self._revived_at = {}
+        self._loop = None
+        self._queue = None
+        self._bands = {}
+        self._armed = {}
+        self.stats = {
+            'published': 0,
+            'dropped': 0,
+            'events': 0,
+            'restarts': 0,
+        }
+
+    def _spawn(self, shard):
+        # spawn: a worker never inherits the event loop, sockets or locks of
+        # the bot thread.
+        ctx = multiprocessing.get_context('spawn')
+        process = ctx.Process(
+            target=run_worker,
+            args=(
+                shard, self._rings[shard].name, self.ring_size, self._ready[shard], self._control[shard],
+                self._events[shard], TIME_WINDOW, HISTORY_CAPACITY, DETECTOR, THRESHOLD, FAST_FEED_ARM_RATIO
+            ),
+            name=f"scan-worker-{shard}",
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def start(self):
+        if self._processes:
+            return
+        ctx = multiprocessing.get_context('spawn')
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        for shard in range(self.workers):
+            self._rings.append(ShmRing.create(self.ring_size))
+            self._ready.append(ctx.Event())
+            self._control.append(ctx.Queue())
+            self._events.append(ctx.Queue())
+            self._readers.append(self._read(shard))
+        self._processes = [self._spawn(shard) for shard in range(self.workers)]
+
+    def _read(self, shard):
+        reader = threading.Thread(
+            target=self._read_events, args=(shard, self._events[shard]), name=f"scan-events-{shard}", daemon=True
+        )
+        reader.start()
+        return reader
+
+    def _read_events(self, shard, events):
+        while True:
+            try:
+                event = events.get(timeout=0.5)
+            except queue.Empty:
+                # Replaced on revive (or stopped): what the dead worker left
+                # has been read.
+                if events not in self._events:
+                    return
+                continue
+            if event is None:
+                return
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+
+    async def stop(self):
+        for shard, control in enumerate(self._control):
+            control.put(('stop',))
+            self._ready[shard].set()
+        for process in self._processes:
+            await asyncio.to_thread(process.join, 5)
+            if process.is_alive():
+                process.terminate()
+        for events in self._events:
+            events.put(None)
+        for ring in self._rings:
+            ring.close()
+        self._processes = []
+        self._rings = []
+        self._events = []
+        self._readers = []
+
+    def _send(self, shard, message):
+        self._control[shard].put(message)
+        self._ready[shard].set()
+
+    def _by_shard(self, symbols):
+        shards = {}
+        for symbol in symbols:
+            shards.setdefault(shard_of(symbol, self.workers), []).append(symbol)
+        return shards
+
+    def add(self, symbols):
+        """Assigns ids to new symbols and hands them to their shard."""
+        new_shards = []
+        for shard, group in self._by_shard(s for s in symbols if s not in self.index).items():
+            entries = []
+            for symbol in group:
+                symbol_id = self._next_id
+                self._next_id += 1
+                self.index[symbol] = symbol_id
+                self.symbols[symbol_id] = symbol
+                entries.append((symbol_id, symbol))
+                new_shards.append(shard)
+            self._send(shard, ('add', entries))
+
+        # Ids are never reused, so id -> shard only grows.
+        if new_shards:
+            self._shard = np.concatenate((self._shard, np.array(new_shards, dtype=np.int64)))
+
+    def remove(self, symbols):
+        for shard, group in self._by_shard(s for s in symbols if s in self.index).items():
+            ids = [self.index.pop(symbol) for symbol in group]
+            for symbol_id in ids:
+                self.symbols.pop(symbol_id, None)
+                self._bands.pop(symbol_id, None)
+            self._send(shard, ('remove', ids))
+
+    def __contains__(self, symbol):
+        return symbol in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def publish(self, now, ids, prices, volumes, kind=FRAME):
+        """Fans one frame (or one tick) out to the shard rings."""
+        if not ids.size:
+            return
+        batch = np.empty(ids.size, dtype=RECORD)
+        batch['time'] = now
+        batch['id'] = ids
+        batch['kind'] = kind
+        batch['price'] = prices
+        batch['volume'] = volumes
+
+        shards = self._shard[ids]
+        for shard in range(self.workers):
+            part = batch[shards == shard]
+            if not len(part):
+                continue
+            if self._rings[shard].push(part):
+                self.stats['published'] += len(part)
+                self._ready[shard].set()
+            else:
+                self.stats['dropped'] += len(part)
+
+    def publish_tick(self, now, symbol, price):
+        symbol_id = self.index.get(symbol)
+        if symbol_id is not None:
+            self.publish(now, np.array([symbol_id]), np.array([price]), np.zeros(1), kind=TICK)
+
+    def sync_bands(self, trigger_bands):
+        """Sends changed TP/SL trigger bands (symbol -> (low, high)) to their shards."""
+        bands = {}
+        for symbol, band in trigger_bands.items():
+            symbol_id = self.index.get(symbol)
+            if symbol_id is not None:
+                bands[symbol_id] = band
+        if bands == self._bands:
+            return
+
+        changes = {}
+        for symbol_id in self._bands.keys() - bands.keys():
+            changes.setdefault(int(self._shard[symbol_id]), {})[symbol_id] = None
+        for symbol_id, band in bands.items():
+            if self._bands.get(symbol_id) != band:
+                changes.setdefault(int(self._shard[symbol_id]), {})[symbol_id] = band
+        for shard, shard_changes in changes.items():
+            self._send(shard, ('bands', shard_changes))
+        self._bands = bands
+
+    async def events(self):
+        """Yields worker events; ('armed', ...) ones are folded in armed_symbols()."""
+        while True:
+            event = await self._queue.get()
+            self.stats['events'] += 1
+            if event[0] == 'armed':
+                self._armed[event[1]] = event[2]
+                continue
+            yield event
+
+    def armed_symbols(self):
+        return [symbol for symbols in self._armed.values() for symbol in symbols]
+
+    def revive(self):
+        """Restarts dead workers with their symbols and bands; returns their shards."""
+        revived = []
+        for shard, process in enumerate(self._processes):
+            if process.is_alive():
+                continue
+            # The dead worker may have held the locks inside its Event and
+            # queues, or died halfway through a write: the new one gets fresh
+            # ones, and a new reader.
+            ctx = multiprocessing.get_context('spawn')
+            self._ready[shard] = ctx.Event()
+            self._control[shard] = ctx.Queue()
+            self._events[shard] = ctx.Queue()
+            self._readers[shard] = self._read(shard)
+            self._rings[shard].pop()
+            self._processes[shard] = self._spawn(shard)
+            entries = [(i, s) for i, s in self.symbols.items() if self._shard[i] == shard]
+            self._send(shard, ('add', entries))
+            self._send(shard, ('bands', {i: b for i, b in self._bands.items() if self._shard[i] == shard}))
+            self._armed.pop(shard, None)
+            self._revived_at[shard] = time.time()
+            self.stats['restarts'] += 1
+            revived.append(shard)
+        return revived
+
+    def warming(self):
+        """Revived shards whose history does not span TIME_WINDOW yet."""
+        now = time.time()
+        for shard, revived_at in list(self._revived_at.items()):
+            if now - revived_at >= TIME_WINDOW:
+                del self._revived_at[shard]
+        return sorted(self._revived_at)
+
+    def metrics(self):
+        return {
+            **self.stats,
+            'workers': self.workers,
+            'alive': sum(process.is_alive() for process in self._processes),
+            'warming': self.warming(),
+            'depth': [len(ring) for ring in self._rings],
+            'symbols': len(self.index),
+        }
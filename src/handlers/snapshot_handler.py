@@ -0,0 +1,157 @@
+import asyncio
+import time
+import numpy as np
+from handlers.log_handler import log
+from handlers.rest_handler import rest
+from handlers.trade_handler import active_trades, restore_trades
+from models.trade import Trade
+from utils.detector import SpikeDetector
+from utils.price_history import export_rings
+from utils.snapshot import write_snapshot, read_snapshot
+from config.settings import (
+    SNAPSHOT_PATH, SNAPSHOT_INTERVAL, HISTORY_BACKFILL, TIME_WINDOW
+)
+
+KLINE_SECONDS = 60
+MAX_KLINES = 1500
+
+_snapshot_task = None
+_restored = False
+
+def _write_snapshot(rings, trades, saved_at):
+    symbols, counts, times, prices = export_rings(rings)
+    write_snapshot(SNAPSHOT_PATH, symbols, counts, times, prices, trades, saved_at)
+
+async def save_snapshot(detector: SpikeDetector):
+    """
+    Copies the raw history rings and the open trades on the event loop (two
+    contiguous copies); putting the samples in order and writing them happen
+    in a worker thread.
+    """
+    rings = detector.history.rings()
+    trades = [trade.to_state() for trade in active_trades.values()]
+    await asyncio.to_thread(_write_snapshot, rings, trades, time.time())
+
+async def _snapshot_loop(detector: SpikeDetector):
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        try:
+            await save_snapshot(detector)
+        except Exception as e:
+            await log(f"❌ Error saving snapshot: {e}")
+
+def start_snapshots(detector: SpikeDetector):
+    """Starts the periodic snapshot task once."""
+    global _snapshot_task
+    if _snapshot_task is None or _snapshot_task.done():
+        _snapshot_task = asyncio.create_task(_snapshot_loop(detector), name="history-snapshots")
+
+async def _fetch_klines(symbol, start, end):
+    """Closed 1m klines between start and end as (close times, close prices)."""
+    limit = min(MAX_KLINES, int((end - start) // KLINE_SECONDS) + 1)
+    klines = await rest.call(
+        'futures_klines', symbol=symbol, interval='1m', startTime=int(start * 1000), limit=limit
+    )
+
+    times = []
+    prices = []
+    for kline in klines:
+        close_time = (kline[6] + 1) / 1000
+        if start < close_time <= end:
+            times.append(close_time)
+            prices.append(float(kline[4]))
+    return times, prices
+
+async def backfill(detector: SpikeDetector, symbols):
+    """
+    Fills each symbol's window from 1m klines, from its latest sample (or the
+    start of the window) up to now. All symbols are requested at once and the
+    REST scheduler paces them to the weight budget; gaps under two klines are
+    skipped.
+    """
+    history = detector.history
+    now = time.time()
+    gaps = {}
+
+    for symbol in symbols:
+        if symbol not in history:
+            continue
+        latest = history.latest(symbol)
+        start = max(latest[0] if latest else 0.0, now - TIME_WINDOW)
+        if now - start >= 2 * KLINE_SECONDS:
+            gaps[symbol] = start
+
+    if not gaps:
+        return 0
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(_fetch_klines(symbol, start, now) for symbol, start in gaps.items()),
+        return_exceptions=True
+    )
+
+    filled = 0
+    failed = 0
+    for symbol, result in zip(gaps, results):
+        if isinstance(result, Exception):
+            failed += 1
+            continue
+        times, prices = result
+        if not times or symbol not in history:
+            continue
+
+        # The stream keeps running while klines are fetched, so live samples
+        # may already follow them: merge both in time order.
+        old_times, old_prices = history.window_samples(symbol)
+        merged_times = np.concatenate((old_times, times))
+        order = np.argsort(merged_times, kind='stable')
+        detector.restore(symbol, merged_times[order], np.concatenate((old_prices, prices))[order])
+        filled += 1
+
+    await log(f"⏪ Backfilled {filled}/{len(gaps)} symbols from 1m klines in {time.perf_counter() - started:.1f}s ({failed} failed)")
+    return filled
+
+async def restore_state(detector: SpikeDetector, coins):
+    """
+    Warm start: on the first call reloads the last snapshot (history and open
+    trades); on every call backfills the gaps of the monitored coins, so new
+    coins from a refresh start with a full window too.
+    """
+    global _restored
+
+    trades = []
+    if not _restored:
+        _restored = True
+        try:
+            series, states, saved_at = await asyncio.to_thread(
+                read_snapshot, SNAPSHOT_PATH, time.time(), TIME_WINDOW
+            )
+        except Exception as e:
+            await log(f"❌ Error loading snapshot: {e}")
+            series, states, saved_at = {}, [], None
+
+        if saved_at:
+            history = detector.history
+            restored = 0
+            for symbol, (times, prices) in series.items():
+                if symbol in history:
+                    detector.restore(symbol, times, prices)
+                    restored += 1
+            trades = [Trade.from_state(state) for state in states]
+            await log(f"💾 Snapshot from {time.time() - saved_at:.0f}s ago: {restored} symbols, {len(trades)} open trades")
+
+    if HISTORY_BACKFILL:
+        try:
+            await backfill(detector, coins)
+        except Exception as e:
+            await log(f"❌ Error backfilling history: {e}")
+
+    if trades:
+        history = detector.history
+        prices = {}
+        for trade in trades:
+            latest = history.latest(trade.symbol) if trade.symbol in history else None
+            if latest:
+                prices[trade.symbol] = latest[1]
+        restored = restore_trades(trades, prices)
+        await log(f"📊 Restored {restored} open trades")
@@ -0,0 +1,269 @@
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from websockets.asyncio.client import connect
+from handlers.log_handler import log
+from utils.decoder import FrameDecoder, TickerBatch
+from utils.metrics import metrics
+from config.settings import (
+    BINANCE_FUTURES_WS_URL, STREAM_STALE_AFTER, STREAM_STANDBY, STREAM_BACKOFF_BASE, STREAM_BACKOFF_MAX, FRAME_DECODER
+)
+
+@dataclass(slots=True)
+class StreamConnection:
+    """Per-connection state and counters."""
+    name: str
+    connected: bool = False
+    connects: int = 0
+    frames: int = 0
+    delivered: int = 0
+    duplicates: int = 0
+    late: int = 0
+    stalls: int = 0
+    errors: int = 0
+    last_error: str = ''
+    connected_at: float = 0.0
+    last_frame_at: float = 0.0
+    stream_seen: dict = field(default_factory=dict)
+    last_event_time: float = 0.0
+    skew_last: float = 0.0
+    skew_avg: float = 0.0
+    skew_max: float = 0.0
+
+class StreamSupervisor:
+    """
+    Owns the market websocket(s) and hands frames to one consumer.
+
+    Every connection is watched on its own: no frame of one of the base
+    ``streams`` for ``stale_after`` seconds counts as a stall and the socket
+    is recycled, with jittered exponential backoff between attempts. Traffic
+    on streams added with subscribe() does not keep a connection alive. With ``standby`` a second
+    connection stays open on the same streams and frames are deduplicated
+    by event time (``E``, or the trade/update id on per-symbol streams) per
+    stream, so losing either socket loses no data; a frame older than the
+    last one delivered is dropped as late.
+    Extra streams added with subscribe() are sent again after a reconnect.
+    Raw frames are decoded by ``decoder`` (a FrameDecoder), so miniTicker
+    payloads may arrive as a TickerBatch instead of a list of dicts.
+    """
+
+    def __init__(self, streams, url=BINANCE_FUTURES_WS_URL, stale_after=STREAM_STALE_AFTER, standby=STREAM_STANDBY,
+                 backoff_base=STREAM_BACKOFF_BASE, backoff_max=STREAM_BACKOFF_MAX, queue_size=256, decoder=None):
+        self.streams = list(streams)
+        self.url = f"{url.rstrip('/')}/stream?streams={'/'.join(streams)}"
+        self.stale_after = stale_after
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.connections = [StreamConnection('primary')]
+        if standby:
+            self.connections.append(StreamConnection('standby'))
+        self.decoder = decoder or FrameDecoder(FRAME_DECODER, batches=False)
+        self.queue_size = queue_size
+        self.queue = None
+        self.overflow = 0
+        self._subscriptions = set()
+        self._sockets = {}
+        self._last_event = {}
+        self._request_id = 0
+        self._tasks = []
+        self._event_lag = metrics.histogram('stream_event_lag_seconds', 'Exchange event time to frame received')
+
+    def start(self):
+        if self._tasks:
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [
+            asyncio.create_task(self._run(conn), name=f"stream-{conn.name}")
+            for conn in self.connections
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def frames(self):
+        """Yields deduplicated combined-stream messages ({"stream", "data"})."""
+        while True:
+            yield await self.queue.get()
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.5)
+
+    async def _run(self, conn: StreamConnection):
+        attempt = 0
+
+        while True:
+            try:
+                async with connect(self.url, max_size=None, ping_interval=20, ping_timeout=20) as ws:
+                    conn.connected = True
+                    conn.connects += 1
+                    conn.connected_at = time.time()
+                    self._sockets[conn.name] = ws
+                    await log(f"✅ Stream {conn.name} connected (#{conn.connects})")
+                    if self._subscriptions:
+                        await self._send(ws, 'SUBSCRIBE', sorted(self._subscriptions))
+
+                    while True:
+                        stream, idle = self._stalest(conn)
+                        if idle >= self.stale_after:
+                            conn.stalls += 1
+                            await log(f"⚠️ Stream {conn.name} stalled: no {stream} frame for {idle:.0f}s, reconnecting")
+                            break
+                        try:
+                            raw = await asyncio.wait_for(ws.recv(), timeout=self.stale_after - idle)
+                        except asyncio.TimeoutError:
+                            continue
+
+                        attempt = 0
+                        self._receive(conn, raw)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                conn.errors += 1
+                conn.last_error = str(e)
+                await log(f"❌ Stream {conn.name} error: {e}")
+            finally:
+                conn.connected = False
+                self._sockets.pop(conn.name, None)
+
+            delay = self._backoff(attempt)
+            attempt += 1
+            await log(f"🔄 Stream {conn.name} reconnecting in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    def _stalest(self, conn: StreamConnection):
+        """Base stream that has gone quiet the longest, and for how long."""
+        # A reconnect restarts the clock; stream_seen keeps the real last
+        # frame times for staleness().
+        seen = {name: max(conn.stream_seen.get(name, 0.0), conn.connected_at) for name in self.streams}
+        stream = min(seen, key=seen.get)
+        return stream, time.time() - seen[stream]
+
+    def _base_seen(self, conn: StreamConnection):
+        """Time of the last frame of the stalest base stream (0 if one never arrived)."""
+        return min((conn.stream_seen.get(name, 0.0) for name in self.streams), default=0.0)
+
+    def _receive(self, conn: StreamConnection, raw):
+        now = time.time()
+        conn.frames += 1
+        conn.last_frame_at = now
+
+        try:
+            msg = self.decoder.decode(raw)
+        except ValueError:
+            conn.errors += 1
+            return
+        data = msg.get('data') if isinstance(msg, dict) else None
+        if data is None:
+            return
+        conn.stream_seen[msg.get('stream')] = now
+
+        if isinstance(data, TickerBatch):
+            event_time = sequence = data.event_time
+        elif isinstance(data, list):
+            event_time = data[0].get('E', 0) if data and isinstance(data[0], dict) else 0
+            sequence = event_time
+        else:
+            event_time = data.get('E', 0)
+            # Several trades/book updates can share one event time: order
+            # per-symbol streams by their own ids. 'u' first: in bookTicker
+            # 'a' is the best ask price, not an id.
+            sequence = data.get('u') or data.get('a') or event_time
+        event_time /= 1000
+
+        if event_time:
+            conn.last_event_time = event_time
+            skew = now - event_time
+            conn.skew_last = skew
+            conn.skew_avg = skew if conn.frames == 1 else conn.skew_avg * 0.99 + skew * 0.01
+            conn.skew_max = max(conn.skew_max, skew)
+            self._event_lag.record(skew)
+
+            stream = msg.get('stream')
+            last = self._last_event.get(stream, 0)
+            if sequence == last:
+                conn.duplicates += 1
+                return
+            if sequence < last:
+                conn.late += 1
+                return
+            self._last_event[stream] = sequence
+
+        conn.delivered += 1
+        msg['received_at'] = now
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.overflow += 1
+        self.queue.put_nowait(msg)
+
+    async def _send(self, ws, method, params):
+        self._request_id += 1
+        await ws.send(json.dumps({'method': method, 'params': params, 'id': self._request_id}))
+
+    async def _send_all(self, method, streams):
+        # A socket that is closing fails the send; its reconnect sends the
+        # current subscriptions again anyway.
+        for name, ws in list(self._sockets.items()):
+            try:
+                await self._send(ws, method, streams)
+            except Exception as e:
+                await log(f"⚠️ Stream {name}: {method} not sent ({e}), applied on reconnect", key=('stream-send', name))
+
+    async def subscribe(self, streams):
+        """Adds streams on every open connection (and on future reconnects)."""
+        streams = set(streams) - self._subscriptions
+        if not streams:
+            return
+        self._subscriptions |= streams
+        await self._send_all('SUBSCRIBE', sorted(streams))
+
+    async def unsubscribe(self, streams):
+        streams = set(streams) & self._subscriptions
+        if not streams:
+            return
+        self._subscriptions -= streams
+        for stream in streams:
+            self._last_event.pop(stream, None)
+        await self._send_all('UNSUBSCRIBE', sorted(streams))
+
+    def staleness(self):
+        """
+        Seconds the stalest base stream of the freshest connection has been
+        quiet. Frames of subscribe()d streams do not count.
+        """
+        last = max((self._base_seen(conn) for conn in self.connections), default=0.0)
+        return time.time() - last if last else float('inf')
+
+    def metrics(self):
+        now = time.time()
+        return {
+            'staleness': self.staleness(),
+            'decoder': self.decoder.backend,
+            'depth': self.queue.qsize() if self.queue else 0,
+            'overflow': self.overflow,
+            'connections': [
+                {
+                    'name': conn.name,
+                    'connected': conn.connected,
+                    'connects': conn.connects,
+                    'frames': conn.frames,
+                    'delivered': conn.delivered,
+                    'duplicates': conn.duplicates,
+                    'late': conn.late,
+                    'stalls': conn.stalls,
+                    'errors': conn.errors,
+                    'last_error': conn.last_error,
+                    'staleness': now - self._base_seen(conn) if self._base_seen(conn) else None,
+                    'skew_last': conn.skew_last,
+                    'skew_avg': conn.skew_avg,
+                    'skew_max': conn.skew_max,
+                }
+                for conn in self.connections
+            ],
+        }
@@ -1,88 +1,196 @@
 import asyncio
 import time
-import pytz
-from datetime import datetime
 from handlers.log_handler import log
 from handlers.alert_handler import tp_sl_alert_handler 
 from handlers.db_handler import insert_trade
 from handlers.operation_handler import OperationHandler
+from models.trade import Trade, Direction, TradeResult
+from utils.timer_wheel import TimerWheel
 from config.settings import TP_LEVELS, SL_LEVELS, TIME_WINDOW
 
 op_handler = OperationHandler()
 
 active_trades = {}
 
-async def trade_handler(bm, symbol, percentage_change, price, original_message_id, volume):
-    entry_price = float(price)
-    start_time = time.time()
-    
-    if percentage_change > 0:
-        tp_prices = [entry_price * (1 - tp) for tp in TP_LEVELS]
-        sl_prices = [entry_price * (1 + sl) for sl in SL_LEVELS]
-        direction = "SHORT"
-        side = -1
-    else:
-        tp_prices = [entry_price * (1 + tp) for tp in TP_LEVELS]
-        sl_prices = [entry_price * (1 - sl) for sl in SL_LEVELS]
-        direction = "LONG"
-        side = 1
+# Per-symbol index of open trades and the nearest trigger prices across them:
+# symbol -> (low, high). A tick needs the full check only when it leaves the
+# band. Deadlines are owned by the timer wheel, not by the tick path.
+trades_by_symbol = {}
+trigger_bands = {}
+last_prices = {}
+
+# trade_id -> future of the signal message while it waits for Telegram.
+pending_messages = {}
+
+timeouts = TimerWheel(tick=1.0)
+_timeout_task = None
+
+def _refresh_band(symbol):
+    trades = trades_by_symbol.get(symbol)
+    if not trades:
+        trades_by_symbol.pop(symbol, None)
+        trigger_bands.pop(symbol, None)
+        last_prices.pop(symbol, None)
+        return
+
+    low = float('-inf')
+    high = float('inf')
+
+    for trade in trades.values():
+        if not trade.active:
+            continue
+
+        hit_count = trade.hit_count
+        next_tp = trade.tp_prices[hit_count] if hit_count < len(trade.tp_prices) else None
+        sl = trade.sl_prices[1] if hit_count == 0 else None
+
+        if trade.direction == Direction.SHORT:
+            if next_tp is not None:
+                low = max(low, next_tp)
+            if sl is not None:
+                high = min(high, sl)
+        else:
+            if next_tp is not None:
+                high = min(high, next_tp)
+            if sl is not None:
+                low = max(low, sl)
+
+    trigger_bands[symbol] = (low, high)
+
+def trade_tick(symbol, current_price):
+    """
+    Hot-path check: records the last price of symbols with open trades and
+    returns True when it crossed one of their TP/SL triggers.
+    """
+    band = trigger_bands.get(symbol)
+    if band is None:
+        return False
+    last_prices[symbol] = current_price
+    return current_price <= band[0] or current_price >= band[1]
+
+def note_price(symbol, current_price):
+    """
+    Records the last price of a symbol with open trades without checking its
+    triggers (sharded scan: the workers check them). Timeouts close at it.
+    """
+    if symbol in trigger_bands:
+        last_prices[symbol] = current_price
+
+async def _timeout_scheduler():
+    while True:
+        await asyncio.sleep(timeouts.tick)
+
+        for trade_id in timeouts.advance(time.time()):
+            trade = active_trades.get(trade_id)
+            if trade is None:
+                continue
+
+            try:
+                await close_trade_timeout(trade_id, last_prices.get(trade.symbol, trade.entry_price))
+                await finalize_trade(trade_id)
+            except Exception as e:
+                await log(f"❌ Error closing trade {trade_id} on timeout: {e}")
+
+def start_timeout_scheduler():
+    """Starts the task that closes trades once TIME_WINDOW has elapsed."""
+    global _timeout_task
+    if _timeout_task is None or _timeout_task.done():
+        _timeout_task = asyncio.create_task(_timeout_scheduler(), name="trade-timeouts")
+
+def restore_trades(trades, prices=None):
+    """
+    Re-registers open trades loaded from a snapshot: symbol index, trigger
+    band and timeout (a deadline that already passed fires on the next tick).
+    They are not submitted to the OperationHandler again.
+    """
+    prices = prices or {}
+    restored = 0
+
+    for trade in trades:
+        if not trade.active or trade.trade_id in active_trades:
+            continue
+        active_trades[trade.trade_id] = trade
+        trades_by_symbol.setdefault(trade.symbol, {})[trade.trade_id] = trade
+        last_prices[trade.symbol] = prices.get(trade.symbol, trade.entry_price)
+        timeouts.schedule(trade.trade_id, trade.start_time + TIME_WINDOW)
+        restored += 1
+
+    for symbol in {trade.symbol for trade in trades}:
+        _refresh_band(symbol)
+
+    return restored
+
+def _attach_message(trade: Trade, message):
+    """Sets the trade's message id now, or once its queued signal is sent."""
+    if not isinstance(message, asyncio.Future):
+        trade.original_message_id = message
+        return
+
+    def attach(future):
+        pending_messages.pop(trade.trade_id, None)
+        if not future.cancelled() and future.exception() is None:
+            trade.original_message_id = future.result()
+
+    pending_messages[trade.trade_id] = message
+    message.add_done_callback(attach)
+
+def _reply_target(trade: Trade):
+    """Message id to reply to, or the future of the signal still queued."""
+    if trade.original_message_id is None:
+        return pending_messages.get(trade.trade_id)
+    return trade.original_message_id
+
+async def trade_handler(symbol, percentage_change, price, original_message_id, volume, detected_at=None):
+    """
+    Opens the trade and submits its order. ``original_message_id`` may be
+    the future of the signal message: the trade does not wait for Telegram.
+    Returns the trade.
+    """
+    trade = Trade.open(
+        symbol, percentage_change, price, None, volume,
+        time.time(), TP_LEVELS, SL_LEVELS
+    )
+    _attach_message(trade, original_message_id)
+    direction = trade.direction.name
+    entry_price = trade.entry_price
 
     try:
         signal_data = {
             "symbol": symbol,
             "direction": direction,
             "volume": volume,
-            "price": entry_price
+            "price": entry_price,
+            "signal_time": trade.start_time,
+            "detected_at": detected_at or trade.start_time
         }
-        asyncio.get_running_loop().run_in_executor(None, op_handler.process_new_signal, signal_data)
+        op_handler.submit(signal_data)
         await log(f"📡 Signal sent to OperationHandler: {symbol} {direction}")
     except Exception as e:
         await log(f"❌ Failed to send signal to OperationHandler: {e}")
 
-    trade_id = f"{symbol}_{int(start_time * 1000)}"
-    active_trades[trade_id] = {
-        'symbol': symbol,
-        'direction': direction,
-        'entry_price': entry_price,
-        'tp_prices': tp_prices,
-        'sl_prices': sl_prices,
-        'original_message_id': original_message_id,
-        'volume': volume,
-        'percentage_change': percentage_change,
-        'start_time': start_time,
-        'hit_count': 0,
-        'active': True,
-        'close_price': None,
-        'close_time': None,
-        'result': None,
-        'profit': 0.0
-    }
+    trade_id = trade.trade_id
+    active_trades[trade_id] = trade
+    trades_by_symbol.setdefault(symbol, {})[trade_id] = trade
+    last_prices[symbol] = entry_price
+    _refresh_band(symbol)
+    timeouts.schedule(trade_id, trade.start_time + TIME_WINDOW)
     
     await log(f"📊 Added {symbol} {direction} to monitoring pool ({len(active_trades)} active trades)")
+    return trade
 
 async def check_trade_conditions(symbol, current_price):
-    current_time = time.time()
     trades_to_remove = []
     
-    for trade_id, trade in list(active_trades.items()):
-        if trade['symbol'] != symbol:
-            continue
-        
-        if not trade['active']:
+    for trade_id, trade in list(trades_by_symbol.get(symbol, {}).items()):
+        if not trade.active:
             continue
         
         try:
-            if current_time - trade['start_time'] > TIME_WINDOW:
-                if trade['result'] is None:
-                    await close_trade_timeout(trade_id, current_price)
-                trades_to_remove.append(trade_id)
-                continue
-            
             should_close = await check_tp_sl_hit(trade, current_price)
             if should_close:
                 trades_to_remove.append(trade_id)
         except Exception as e:
-            await log(f"❌ Error checking trade {trade_id}: {e}")
+            await log(f"❌ Error checking trade {trade_id}: {e}", symbol=symbol, trade_id=trade_id)
     
     for trade_id in trades_to_remove:
         try:
@@ -90,108 +198,45 @@ async def check_trade_conditions(symbol, current_price):
         except Exception as e:
             await log(f"❌ Error finalizing trade {trade_id}: {e}")
 
-async def check_tp_sl_hit(trade, current_price) -> bool:
-    direction = trade['direction']
-    tp_prices = trade['tp_prices']
-    sl_prices = trade['sl_prices']
-    hit_count = trade['hit_count']
-    
-    if direction == "SHORT":
-        if current_price >= sl_prices[1] and hit_count == 0:
-            await hit_stop_loss(trade, current_price, sl_prices[1])
-            return True
-        
-        for i in range(hit_count, len(tp_prices)):
-            if current_price <= tp_prices[i]:
-                await hit_take_profit(trade, current_price, tp_prices[i], i)
-                trade['hit_count'] = i + 1
-                
-                if trade['hit_count'] >= len(tp_prices):
-                    return True
-                break
-    
-    else:
-        if current_price <= sl_prices[1] and hit_count == 0:
-            await hit_stop_loss(trade, current_price, sl_prices[1])
-            return True
-        
-        for i in range(hit_count, len(tp_prices)):
-            if current_price >= tp_prices[i]:
-                await hit_take_profit(trade, current_price, tp_prices[i], i)
-                trade['hit_count'] = i + 1
-                
-                if trade['hit_count'] >= len(tp_prices):
-                    return True
-                break
-    
-    return False
+    _refresh_band(symbol)
 
-async def hit_take_profit(trade, current_price, tp_price, level_index):
-    tp_level = TP_LEVELS[level_index]
-    profit_percentage = tp_level * 100
-    
-    if level_index == 0:
-        result = 'TP1'
-        profit_value = 5.0
-    elif level_index == 1:
-        result = 'TP2'
-        profit_value = 10.0
-    elif level_index == 2:
-        result = 'TP3'
-        profit_value = 15.0
-    else:
-        result = 'TP4'
-        profit_value = 20.0
-    
-    trade['profit'] = profit_value
-    trade['result'] = result
-    trade['close_price'] = tp_price
-    trade['close_time'] = datetime.now(pytz.timezone('America/Caracas')).isoformat()
+async def check_tp_sl_hit(trade: Trade, current_price) -> bool:
+    result = trade.check(current_price, time.time())
+
+    if result == TradeResult.SL:
+        await hit_stop_loss(trade, current_price)
+    elif result is not None:
+        await hit_take_profit(trade, current_price)
     
-    if level_index == 3:
-        trade['active'] = False
+    return not trade.active
+
+async def hit_take_profit(trade: Trade, current_price):
+    profit_percentage = TP_LEVELS[trade.hit_count - 1] * 100
     
     try:
-        await tp_sl_alert_handler(level_index + 1, profit_percentage, trade['original_message_id'])
-        await log(f"🎯 {result}: {trade['symbol']} at ${current_price} ({profit_value:+.1f}%)")
+        await tp_sl_alert_handler(trade.result, profit_percentage, _reply_target(trade), trade.symbol)
+        await log(f"🎯 {trade.result.name}: {trade.symbol} at ${current_price} ({trade.profit:+.1f}%)", symbol=trade.symbol, trade_id=trade.trade_id)
     except Exception as e:
-        await log(f"❌ Error sending TP alert for {trade['symbol']}: {e}")
+        await log(f"❌ Error sending TP alert for {trade.symbol}: {e}")
 
-async def hit_stop_loss(trade, current_price, sl_price):
-    side = -1 if trade['direction'] == "SHORT" else 1
-    profit_percentage = round(((sl_price - trade['entry_price']) / trade['entry_price']) * side * 100, 2)
-    
-    trade['active'] = False
-    trade['close_price'] = sl_price
-    trade['close_time'] = datetime.now(pytz.timezone('America/Caracas')).isoformat()
-    trade['profit'] = -5.0
-    trade['result'] = 'SL'
-    
+async def hit_stop_loss(trade: Trade, current_price):
     try:
-        await tp_sl_alert_handler(-1, profit_percentage, trade['original_message_id'])
-        await log(f"🛑 SL: {trade['symbol']} at ${current_price} (profit: -5.0%)")
+        await tp_sl_alert_handler(TradeResult.SL, trade.profit, _reply_target(trade), trade.symbol)
+        await log(f"🛑 SL: {trade.symbol} at ${current_price} (profit: {trade.profit:+.1f}%)", symbol=trade.symbol, trade_id=trade.trade_id)
     except Exception as e:
-        await log(f"❌ Error sending SL alert for {trade['symbol']}: {e}")
+        await log(f"❌ Error sending SL alert for {trade.symbol}: {e}")
 
 async def close_trade_timeout(trade_id, current_price):
     trade = active_trades[trade_id]
     
-    if trade['result'] is None:
-        side = -1 if trade['direction'] == "SHORT" else 1
-        profit_percentage = round(((current_price - trade['entry_price']) / trade['entry_price']) * side * 100, 2)
-        
-        trade['close_price'] = current_price
-        trade['close_time'] = datetime.now(pytz.timezone('America/Caracas')).isoformat()
-        trade['profit'] = profit_percentage
-        trade['result'] = 'TIME'
+    if trade.expire(current_price, time.time()) == TradeResult.TIME:
+        profit_percentage = trade.profit
         
         try:
-            await tp_sl_alert_handler(0, profit_percentage, trade['original_message_id'])
-            await log(f"⏰ TIME: {trade['symbol']} at ${current_price} ({profit_percentage:+.1f}%)")
+            await tp_sl_alert_handler(TradeResult.TIME, profit_percentage, _reply_target(trade), trade.symbol)
+            await log(f"⏰ TIME: {trade.symbol} at ${current_price} ({profit_percentage:+.1f}%)", symbol=trade.symbol, trade_id=trade.trade_id)
         except Exception as e:
-            await log(f"❌ Error sending TIME alert for {trade['symbol']}: {e}")
-    
-    trade['active'] = False
+            await log(f"❌ Error sending TIME alert for {trade.symbol}: {e}")
 
 async def finalize_trade(trade_id):
     if trade_id not in active_trades:
@@ -200,25 +245,17 @@ async def finalize_trade(trade_id):
     
     trade = active_trades[trade_id]
     
-    if trade['close_time'] and trade['close_price']:
-        trade_data = {
-            "created_at": datetime.fromtimestamp(trade['start_time'], tz=pytz.timezone('America/Caracas')).isoformat(),
-            "closed_at": trade['close_time'],
-            "symbol": trade['symbol'],
-            "direction": trade['direction'],
-            "volume": round(trade['volume'], 2),
-            "percentage": round(trade['percentage_change'], 2),
-            "profit": trade['profit'],
-            "msg_id": trade['original_message_id'],
-            "entry_price": trade['entry_price'],
-            "close_price": trade['close_price'],
-            "result": trade['result'],
-        }
-        
-        await insert_trade(trade_data)
-        await log(f"💾 Trade finalized: {trade['symbol']} result: {trade['result']} profit: {trade['profit']:+.2f}%")
+    if trade.close_time and trade.close_price:
+        await insert_trade(trade.to_record())
+        await log(f"💾 Trade finalized: {trade.symbol} result: {trade.result.name} profit: {trade.profit:+.2f}%", symbol=trade.symbol, trade_id=trade_id)
     
     del active_trades[trade_id]
+    timeouts.cancel(trade_id)
+    trades_by_symbol.get(trade.symbol, {}).pop(trade_id, None)
+    _refresh_band(trade.symbol)
 
 def get_active_trades_count():
-    return len(active_trades)
\ No newline at end of file
+    return len(active_trades)
+
+def get_active_symbols():
+    return trigger_bands.keys()
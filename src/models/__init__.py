@@ -0,0 +1,8 @@
+"""
+Models package
+Contains the typed records shared by the handlers.
+"""
+
+from .trade import Trade, Direction, TradeResult
+
+__all__ = ['Trade', 'Direction', 'TradeResult']
@@ -0,0 +1,156 @@
+from dataclasses import dataclass, fields
+from datetime import datetime
+from enum import IntEnum
+import pytz
+
+TIMEZONE = pytz.timezone('America/Caracas')
+
+class Direction(IntEnum):
+    SHORT = -1
+    LONG = 1
+
+class TradeResult(IntEnum):
+    """Values match the hit codes used by tp_sl_alert_handler."""
+    SL = -1
+    TIME = 0
+    TP1 = 1
+    TP2 = 2
+    TP3 = 3
+    TP4 = 4
+
+@dataclass(slots=True, eq=False)
+class Trade:
+    """
+    State of one simulated trade.
+
+    Times are float epoch seconds; they are only formatted when the trade is
+    serialized with to_record().
+    """
+    trade_id: str
+    symbol: str
+    direction: Direction
+    entry_price: float
+    tp_prices: tuple
+    sl_prices: tuple
+    original_message_id: int | None
+    volume: float
+    percentage_change: float
+    start_time: float
+    hit_count: int = 0
+    active: bool = True
+    close_price: float | None = None
+    close_time: float | None = None
+    result: TradeResult | None = None
+    profit: float = 0.0
+
+    @classmethod
+    def open(cls, symbol, percentage_change, price, original_message_id, volume, start_time, tp_levels, sl_levels):
+        """Opens a contrarian trade: a pump is shorted, a dump is bought."""
+        entry_price = float(price)
+
+        if percentage_change > 0:
+            direction = Direction.SHORT
+            tp_prices = tuple(entry_price * (1 - tp) for tp in tp_levels)
+            sl_prices = tuple(entry_price * (1 + sl) for sl in sl_levels)
+        else:
+            direction = Direction.LONG
+            tp_prices = tuple(entry_price * (1 + tp) for tp in tp_levels)
+            sl_prices = tuple(entry_price * (1 - sl) for sl in sl_levels)
+
+        return cls(
+            trade_id=f"{symbol}_{int(start_time * 1000)}",
+            symbol=symbol,
+            direction=direction,
+            entry_price=entry_price,
+            tp_prices=tp_prices,
+            sl_prices=sl_prices,
+            original_message_id=original_message_id,
+            volume=volume,
+            percentage_change=percentage_change,
+            start_time=start_time,
+        )
+
+    def pnl(self, price):
+        """Signed percentage result of closing the trade at ``price``."""
+        return round(((price - self.entry_price) / self.entry_price) * self.direction * 100, 2)
+
+    def check(self, price, now):
+        """
+        Applies one price to the SL/TP ladder and returns the TradeResult it
+        reached, or None. At most one level is taken per price; the trade is
+        done once ``active`` is False.
+        """
+        if not self.active:
+            return None
+
+        # Signed distance: positive means the price moved in the trade's favour.
+        direction = self.direction
+        hit_count = self.hit_count
+
+        sl_price = self.sl_prices[1]
+        if hit_count == 0 and (price - sl_price) * direction <= 0:
+            self.active = False
+            self._close(TradeResult.SL, sl_price, now)
+            return TradeResult.SL
+
+        if hit_count < len(self.tp_prices):
+            tp_price = self.tp_prices[hit_count]
+            if (price - tp_price) * direction >= 0:
+                self.hit_count = hit_count + 1
+                result = TradeResult(min(hit_count, 3) + 1)
+                if self.hit_count >= len(self.tp_prices):
+                    self.active = False
+                self._close(result, tp_price, now)
+                return result
+
+        return None
+
+    def expire(self, price, now):
+        """
+        Closes the trade when its time window is over. Returns TradeResult.TIME,
+        or None if a TP had already been recorded (the trade keeps that result).
+        """
+        self.active = False
+        if self.result is not None:
+            return None
+        self._close(TradeResult.TIME, price, now)
+        return TradeResult.TIME
+
+    def _close(self, result, price, now):
+        self.result = result
+        self.close_price = price
+        self.close_time = now
+        self.profit = self.pnl(price)
+
+    def to_state(self):
+        """JSON-friendly copy of every field (for snapshots)."""
+        state = {f.name: getattr(self, f.name) for f in fields(self)}
+        state['direction'] = int(self.direction)
+        state['result'] = None if self.result is None else int(self.result)
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        state = dict(state)
+        state['direction'] = Direction(state['direction'])
+        state['result'] = None if state['result'] is None else TradeResult(state['result'])
+        state['tp_prices'] = tuple(state['tp_prices'])
+        state['sl_prices'] = tuple(state['sl_prices'])
+        return cls(**state)
+
+    def to_record(self):
+        """Row for insert_trade."""
+        return {
+            "trade_id": self.trade_id,
+            "created_at": datetime.fromtimestamp(self.start_time, tz=TIMEZONE).isoformat(),
+            "closed_at": datetime.fromtimestamp(self.close_time, tz=TIMEZONE).isoformat(),
+            "symbol": self.symbol,
+            "direction": self.direction.name,
+            "volume": round(self.volume, 2),
+            "percentage": round(self.percentage_change, 2),
+            "profit": self.profit,
+            "msg_id": self.original_message_id,
+            "entry_price": self.entry_price,
+            "close_price": self.close_price,
+            "result": self.result.name,
+        }
@@ -0,0 +1,5 @@
+"""
+Tests package
+Focused tests of the handlers against local fakes (no Binance, Telegram or
+network access).
+"""
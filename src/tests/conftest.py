@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# alert_handler builds its Bot at import; no request is ever sent with it.
+os.environ.setdefault('BOT_TOKEN', '0:test')
+# Logs and any other runtime state go to a scratch directory.
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='signals-bot-tests-'))
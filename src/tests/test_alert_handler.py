@@ -0,0 +1,175 @@
+import asyncio
+import datetime as dt
+import importlib
+import time
+
+import pytest
+from telegram.error import BadRequest, RetryAfter
+
+# handlers/__init__ re-exports functions under the module names.
+alert_handler = importlib.import_module('handlers.alert_handler')
+TelegramSender = alert_handler.TelegramSender
+SIGNAL = alert_handler.SIGNAL
+REPLY = alert_handler.REPLY
+
+CHAT = -100
+
+
+class FakeMessage:
+    def __init__(self, message_id):
+        self.message_id = message_id
+
+
+class FakeBot:
+    """telegram.Bot stand-in: records every send and raises scripted errors first."""
+
+    def __init__(self, script=None):
+        self.script = list(script or [])
+        self.sent = []
+        self.attempts = 0
+
+    async def send_message(self, chat_id, text, reply_to_message_id=None):
+        self.attempts += 1
+        if self.script:
+            raise self.script.pop(0)
+        self.sent.append((chat_id, text, reply_to_message_id, time.monotonic()))
+        return FakeMessage(len(self.sent))
+
+
+def sender(bot, **kwargs):
+    return TelegramSender(bot, **{'global_rate': 100, 'chat_rate': 100, 'chat_burst': 10, 'retries': 1, **kwargs})
+
+
+def throttled(bot):
+    """One message per chat every 0.2 s, so whatever follows the first one waits."""
+    return sender(bot, chat_rate=5, chat_burst=1)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_a_single_signal_goes_out_immediately():
+    async def main():
+        tg = sender(FakeBot())
+        started = time.monotonic()
+        message_id = await tg.submit(CHAT, 'BTC')
+        elapsed = time.monotonic() - started
+        await tg.stop()
+        return tg, message_id, elapsed
+
+    tg, message_id, elapsed = run(main())
+    assert message_id == 1
+    assert elapsed < 0.1
+    assert tg.bot.sent[0][:3] == (CHAT, 'BTC', None)
+
+
+def test_signals_keep_their_own_message_id_while_throttled():
+    async def main():
+        tg = throttled(FakeBot())
+        first = await tg.submit(CHAT, 'BTC', coalesce=False)
+        ids = await asyncio.gather(tg.submit(CHAT, 'ETH', coalesce=False), tg.submit(CHAT, 'SOL', coalesce=False))
+        await tg.stop()
+        return tg, [first, *ids]
+
+    tg, ids = run(main())
+    assert ids == [1, 2, 3]
+    assert [text for _, text, _, _ in tg.bot.sent] == ['BTC', 'ETH', 'SOL']
+    assert tg.stats['merged'] == 0
+
+
+def test_replies_to_one_message_merge_only_when_backlogged():
+    async def main():
+        tg = throttled(FakeBot())
+        first = await tg.submit(CHAT, 'TP1', priority=REPLY, reply_to=7)
+        ids = await asyncio.gather(
+            tg.submit(CHAT, 'TP2', priority=REPLY, reply_to=7),
+            tg.submit(CHAT, 'TP3', priority=REPLY, reply_to=7),
+            tg.submit(CHAT, 'SL', priority=REPLY, reply_to=8),
+        )
+        await tg.stop()
+        return tg, [first, *ids]
+
+    tg, ids = run(main())
+    assert [(text, reply_to) for _, text, reply_to, _ in tg.bot.sent] == [
+        ('TP1', 7), ('TP2\nTP3', 7), ('SL', 8)
+    ]
+    assert ids == [1, 2, 2, 3]
+    assert tg.stats['merged'] == 1
+
+
+def test_waiting_signals_go_before_waiting_replies():
+    async def main():
+        tg = throttled(FakeBot())
+        await tg.submit(CHAT, 'BTC', coalesce=False)
+        reply = tg.submit(CHAT, 'TP1', priority=REPLY, reply_to=1)
+        signal = tg.submit(CHAT, 'ETH', coalesce=False)
+        await asyncio.gather(reply, signal)
+        await tg.stop()
+        return tg
+
+    tg = run(main())
+    assert [text for _, text, _, _ in tg.bot.sent] == ['BTC', 'ETH', 'TP1']
+
+
+def test_retry_after_blocks_the_chat_and_requeues():
+    async def main():
+        tg = sender(FakeBot([RetryAfter(dt.timedelta(seconds=0.2))]))
+        started = time.monotonic()
+        message_id = await tg.submit(CHAT, 'BTC')
+        elapsed = time.monotonic() - started
+        await tg.stop()
+        return tg, message_id, elapsed
+
+    tg, message_id, elapsed = run(main())
+    assert message_id == 1
+    assert elapsed >= 0.2
+    assert tg.bot.attempts == 2
+    assert tg.stats['rate_limited'] == 1
+    assert tg.stats['sent'] == 1
+
+
+def test_bad_request_fails_every_waiter_without_retrying():
+    async def main():
+        tg = sender(FakeBot([BadRequest('Message to reply not found')]))
+        future = tg.submit(CHAT, 'TP1', priority=REPLY, reply_to=99)
+        with pytest.raises(BadRequest):
+            await future
+        await tg.stop()
+        return tg
+
+    tg = run(main())
+    assert tg.bot.attempts == 1
+    assert tg.stats['failed'] == 1
+    assert tg.stats['retried'] == 0
+
+
+def test_a_burst_of_waiting_signals_goes_out_as_one_message():
+    async def main():
+        tg = throttled(FakeBot())
+        first = await tg.submit(CHAT, 'BTC')
+        ids = await asyncio.gather(tg.submit(CHAT, 'ETH'), tg.submit(CHAT, 'SOL'), tg.submit(CHAT, 'XRP'))
+        await tg.stop()
+        return tg, [first, *ids]
+
+    tg, ids = run(main())
+    assert [text for _, text, _, _ in tg.bot.sent] == ['BTC', 'ETH\n\nSOL\n\nXRP']
+    assert ids == [1, 2, 2, 2]
+
+
+def test_a_reply_to_a_queued_signal_waits_for_its_message_id(monkeypatch):
+    async def main():
+        tg = throttled(FakeBot())
+        monkeypatch.setattr(alert_handler, 'sender', tg)
+        await tg.submit(alert_handler.CHANNEL_ID, 'BTC')
+        signal = await alert_handler.alert_handler('ETHUSDT', 25.0, 1.0, ('🟢', '📈'), 1e6)
+        reply = await alert_handler.tp_sl_alert_handler(1, 5.0, signal, 'ETHUSDT')
+        assert not signal.done()
+        message_id = await signal
+        await reply
+        await tg.stop()
+        return tg, message_id
+
+    tg, message_id = run(main())
+    assert message_id == 2
+    assert tg.bot.sent[2][1:3] == ('✅ TP1 (+5%) #ETHUSDT', 2)
@@ -0,0 +1,47 @@
+import asyncio
+import importlib
+
+from tests.test_alert_handler import FakeBot, throttled
+
+# handlers/__init__ re-exports functions under the module names.
+alert_handler = importlib.import_module('handlers.alert_handler')
+dispatch_handler = importlib.import_module('handlers.dispatch_handler')
+trade_handler = importlib.import_module('handlers.trade_handler')
+
+
+class FakeOrders:
+    def __init__(self):
+        self.signals = []
+
+    def submit(self, signal_data):
+        self.signals.append(signal_data)
+
+
+def test_orders_do_not_wait_for_a_throttled_telegram_alert(monkeypatch):
+    async def main():
+        tg = throttled(FakeBot())
+        orders = FakeOrders()
+        monkeypatch.setattr(alert_handler, 'sender', tg)
+        monkeypatch.setattr(trade_handler, 'op_handler', orders)
+        monkeypatch.setattr(trade_handler, 'active_trades', {})
+        monkeypatch.setattr(trade_handler, 'trades_by_symbol', {})
+
+        # The channel's only token goes to an earlier message.
+        await tg.submit(alert_handler.CHANNEL_ID, 'BTC')
+        dispatcher = dispatch_handler.SignalDispatcher(workers=1)
+        event = dispatch_handler.SignalEvent('ETHUSDT', 25.0, 2000.0, 1e6)
+        await asyncio.wait_for(dispatcher._dispatch(event), timeout=0.1)
+
+        trade = next(iter(trade_handler.active_trades.values()))
+        registered = (len(orders.signals), trade.original_message_id)
+        await tg.stop()
+        return registered, trade, dispatcher
+
+    registered, trade, dispatcher = run(main())
+    assert registered == (1, None)
+    assert trade.original_message_id == 2
+    assert dispatcher.stats['sent'] == 1
+
+
+def run(coro):
+    return asyncio.run(coro)
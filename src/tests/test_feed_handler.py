@@ -0,0 +1,67 @@
+import asyncio
+import importlib
+
+# handlers/__init__ re-exports functions under the module names.
+feed_handler = importlib.import_module('handlers.feed_handler')
+TieredFeed = feed_handler.TieredFeed
+
+
+class FakeStream:
+    """StreamSupervisor stand-in recording SUBSCRIBE/UNSUBSCRIBE batches."""
+
+    def __init__(self):
+        self.subscribed = []
+        self.unsubscribed = []
+
+    async def subscribe(self, streams):
+        self.subscribed += streams
+
+    async def unsubscribe(self, streams):
+        self.unsubscribed += streams
+
+
+def feed(max_symbols=3):
+    return TieredFeed(FakeStream(), kind='aggTrade', max_symbols=max_symbols, linger=60, batch=10)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_open_trades_take_slots_from_armed_symbols_on_a_full_feed():
+    async def main():
+        tiered = feed()
+        await tiered.update(['AUSDT', 'BUSDT', 'CUSDT'], [], now=0)
+        new, demoted = await tiered.update(['AUSDT', 'BUSDT', 'CUSDT'], ['XUSDT'], now=1)
+        return tiered, new, demoted
+
+    tiered, new, demoted = run(main())
+    assert new == ['XUSDT']
+    assert demoted == ['CUSDT']
+    assert set(tiered.promoted) == {'AUSDT', 'BUSDT', 'XUSDT'}
+    assert tiered.stream.unsubscribed == ['cusdt@aggTrade']
+    assert tiered.stream.subscribed[-1] == 'xusdt@aggTrade'
+
+
+def test_lingering_symbols_are_demoted_before_armed_ones():
+    async def main():
+        tiered = feed()
+        await tiered.update(['AUSDT', 'BUSDT', 'CUSDT'], [], now=0)
+        # AUSDT is no longer armed but still inside its linger period.
+        return await tiered.update(['BUSDT', 'CUSDT'], ['XUSDT'], now=1)
+
+    new, demoted = run(main())
+    assert new == ['XUSDT']
+    assert demoted == ['AUSDT']
+
+
+def test_armed_symbols_are_capped_without_demotions():
+    async def main():
+        tiered = feed()
+        await tiered.update(['AUSDT', 'BUSDT', 'CUSDT'], [], now=0)
+        new, demoted = await tiered.update(['AUSDT', 'BUSDT', 'CUSDT', 'DUSDT'], [], now=1)
+        return tiered, new, demoted
+
+    tiered, new, demoted = run(main())
+    assert (new, demoted) == ([], [])
+    assert tiered.stats['capped'] == 1
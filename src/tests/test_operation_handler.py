@@ -0,0 +1,74 @@
+import asyncio
+import importlib
+
+# handlers/__init__ re-exports functions under the module names.
+operation_handler = importlib.import_module('handlers.operation_handler')
+
+
+def exchange_info(*symbols):
+    return {'symbols': [
+        {
+            'symbol': symbol, 'pricePrecision': 2, 'quantityPrecision': 3,
+            'filters': [
+                {'filterType': 'PRICE_FILTER', 'tickSize': '0.01'},
+                {'filterType': 'LOT_SIZE', 'stepSize': '0.001', 'minQty': '0.001'},
+            ],
+        }
+        for symbol in symbols
+    ]}
+
+
+class FakeClient:
+    """futures_exchange_info() that takes ``delay`` seconds and counts its calls."""
+
+    def __init__(self, info, delay=0.1):
+        self.info = info
+        self.delay = delay
+        self.calls = 0
+
+    async def futures_exchange_info(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.info
+
+
+def handler(client, cached=()):
+    ops = operation_handler.OperationHandler()
+    ops.symbol_filters.path = None
+    ops.symbol_filters.update(exchange_info(*cached))
+    ops.client = client
+    return ops
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_stale_filters_are_served_from_cache_and_refreshed_in_background():
+    async def main():
+        client = FakeClient(exchange_info('BTCUSDT', 'ETHUSDT'))
+        ops = handler(client, cached=['BTCUSDT'])
+        ops.symbol_filters.mark_stale()
+
+        filters = await asyncio.wait_for(ops._get_symbol_filters('BTCUSDT'), timeout=0.05)
+        still_stale = ops.symbol_filters.is_stale()
+        await ops._filters_task
+        return ops, client, filters, still_stale
+
+    ops, client, filters, still_stale = run(main())
+    assert filters.tick_size == 0.01
+    assert still_stale
+    assert client.calls == 1
+    assert ops.symbol_filters.get('ETHUSDT') is not None
+
+
+def test_missing_symbols_share_one_inline_download():
+    async def main():
+        client = FakeClient(exchange_info('BTCUSDT', 'NEWUSDT'))
+        ops = handler(client, cached=['BTCUSDT'])
+        results = await asyncio.gather(*(ops._get_symbol_filters('NEWUSDT') for _ in range(3)))
+        return client, results
+
+    client, results = run(main())
+    assert client.calls == 1
+    assert all(filters.step_size == 0.001 for filters in results)
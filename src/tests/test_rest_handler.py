@@ -0,0 +1,155 @@
+import asyncio
+import importlib
+import time
+
+import pytest
+from binance.exceptions import BinanceAPIException
+
+# handlers/__init__ re-exports functions under the module names.
+rest_handler = importlib.import_module('handlers.rest_handler')
+RequestScheduler = rest_handler.RequestScheduler
+
+
+class FakeResponse:
+    def __init__(self, headers=None, text='{"code": -1003, "msg": "Too many requests"}'):
+        self.headers = headers or {}
+        self.text = text
+
+
+class FakeClient:
+    """AsyncClient stand-in: replays scripted results and exposes ``response`` like python-binance."""
+
+    def __init__(self, script=None, headers=None, delay=0.0):
+        self.script = list(script or [])
+        self.headers = headers or {}
+        self.delay = delay
+        self.calls = []
+        self.response = None
+
+    async def futures_klines(self, **kwargs):
+        self.calls.append(kwargs)
+        await asyncio.sleep(self.delay)
+        result = self.script.pop(0) if self.script else [[0, '1.0']]
+        if isinstance(result, Exception):
+            raise result
+        self.response = FakeResponse(self.headers)
+        return result
+
+
+def rate_limited(status, retry_after):
+    return BinanceAPIException(FakeResponse({'Retry-After': str(retry_after)}), status, FakeResponse().text)
+
+
+def scheduler(client, **kwargs):
+    sched = RequestScheduler(**{'limit': 100, 'safety': 1.0, 'retries': 2, 'interval': 1.0, **kwargs})
+    sched.start(client)
+    return sched
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_used_weight_header_pulls_the_bucket_down():
+    async def main():
+        sched = scheduler(FakeClient(headers={'X-MBX-USED-WEIGHT-1M': '90'}))
+        await sched.call('futures_klines', symbol='BTCUSDT', limit=10)
+        return sched
+
+    sched = run(main())
+    assert sched.stats['used_weight'] == 90
+    assert sched.tokens <= 100 - 90 + 0.1
+
+
+def test_spent_budget_throttles_the_next_request():
+    async def main():
+        # 10 weight per 0.5 s: the second weight-10 request must wait for a refill.
+        sched = scheduler(FakeClient(), limit=10, interval=0.5)
+        started = time.monotonic()
+        await sched.call('futures_klines', symbol='A', weight=10)
+        await sched.call('futures_klines', symbol='B', weight=10)
+        return sched, time.monotonic() - started
+
+    sched, elapsed = run(main())
+    assert sched.stats['throttled'] >= 1
+    assert elapsed >= 0.4
+
+
+def test_429_pauses_for_retry_after_then_retries():
+    async def main():
+        client = FakeClient(script=[rate_limited(429, 0.3), [[1, '2.0']]])
+        sched = scheduler(client)
+        started = time.monotonic()
+        result = await sched.call('futures_klines', symbol='BTCUSDT')
+        return sched, client, result, time.monotonic() - started
+
+    sched, client, result, elapsed = run(main())
+    assert result == [[1, '2.0']]
+    assert len(client.calls) == 2
+    assert sched.stats['rate_limited'] == 1
+    assert elapsed >= 0.3
+
+
+def test_429_gives_up_after_the_retries():
+    async def main():
+        client = FakeClient(script=[rate_limited(429, 0.05)] * 3)
+        sched = scheduler(client, retries=2)
+        with pytest.raises(BinanceAPIException):
+            await sched.call('futures_klines', symbol='BTCUSDT')
+        return client
+
+    assert len(run(main()).calls) == 3
+
+
+def test_418_is_not_retried_and_blocks_every_request():
+    async def main():
+        client = FakeClient(script=[rate_limited(418, 0.3)])
+        sched = scheduler(client)
+        started = time.monotonic()
+        with pytest.raises(BinanceAPIException):
+            await sched.call('futures_klines', symbol='BTCUSDT')
+        # A different request still has to wait for the ban to end.
+        await sched.call('futures_klines', symbol='ETHUSDT')
+        return client, time.monotonic() - started
+
+    client, elapsed = run(main())
+    assert len(client.calls) == 2
+    assert elapsed >= 0.3
+
+
+def test_other_api_errors_are_raised_without_blocking():
+    async def main():
+        error = BinanceAPIException(FakeResponse(), 400, '{"code": -1121, "msg": "Invalid symbol."}')
+        sched = scheduler(FakeClient(script=[error]))
+        with pytest.raises(BinanceAPIException):
+            await sched.call('futures_klines', symbol='NOPE')
+        return sched
+
+    sched = run(main())
+    assert sched.stats['rate_limited'] == 0
+    assert sched._blocked_until == 0.0
+
+
+def test_identical_reads_in_flight_share_one_call():
+    async def main():
+        client = FakeClient(delay=0.05)
+        sched = scheduler(client)
+        shared = await asyncio.gather(*(sched.call('futures_klines', symbol='BTCUSDT', limit=10) for _ in range(3)))
+        separate = await asyncio.gather(*(
+            sched.call('futures_klines', symbol='BTCUSDT', limit=10, coalesce=False) for _ in range(2)
+        ))
+        return sched, client, shared, separate
+
+    sched, client, shared, separate = run(main())
+    assert shared == [[[0, '1.0']]] * 3
+    assert len(separate) == 2
+    assert len(client.calls) == 1 + 2
+    assert sched.stats['coalesced'] == 2
+
+
+def test_request_weight_table():
+    assert rest_handler.request_weight('futures_klines', {'limit': 1500}) == 10
+    assert rest_handler.request_weight('futures_klines', {}) == 5
+    assert rest_handler.request_weight('futures_ticker', {}) == 40
+    assert rest_handler.request_weight('futures_ticker', {'symbol': 'BTCUSDT'}) == 1
+    assert rest_handler.request_weight('futures_account', {}) == 1
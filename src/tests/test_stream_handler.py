@@ -0,0 +1,252 @@
+import asyncio
+import importlib
+import json
+import time
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosedOK
+
+from utils.decoder import FrameDecoder
+
+# handlers/__init__ re-exports functions under the module names.
+stream_handler = importlib.import_module('handlers.stream_handler')
+StreamSupervisor = stream_handler.StreamSupervisor
+
+MINI = '!miniTicker@arr'
+
+
+def mini(event_time):
+    data = [{'e': '24hrMiniTicker', 'E': event_time, 's': 'BTCUSDT', 'c': '1.0', 'q': '10'}]
+    return json.dumps({'stream': MINI, 'data': data})
+
+
+def agg(event_time, trade_id):
+    data = {'e': 'aggTrade', 'E': event_time, 'a': trade_id, 's': 'BTCUSDT', 'p': '1.0'}
+    return json.dumps({'stream': 'btcusdt@aggTrade', 'data': data})
+
+
+def book(event_time, update_id):
+    data = {'e': 'bookTicker', 'E': event_time, 'u': update_id, 's': 'BTCUSDT', 'b': '1.0', 'a': '1.1'}
+    return json.dumps({'stream': 'btcusdt@bookTicker', 'data': data})
+
+
+class FakeExchange:
+    """
+    Local websockets server standing in for the Binance combined stream.
+    ``script(n, ws)`` drives the n-th accepted connection (1-based); the
+    socket then stays open, silent, until the client closes it.
+    """
+
+    def __init__(self, script):
+        self.script = script
+        self.connections = 0
+        self.received = []
+        self.url = None
+        self._server = None
+
+    async def __aenter__(self):
+        self._server = await serve(self._handler, '127.0.0.1', 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"ws://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handler(self, ws):
+        self.connections += 1
+        reader = asyncio.create_task(self._read(ws))
+        try:
+            await self.script(self.connections, ws)
+            await ws.wait_closed()
+        finally:
+            reader.cancel()
+
+    async def _read(self, ws):
+        async for message in ws:
+            self.received.append(json.loads(message))
+
+
+def supervisor(url, **kwargs):
+    options = {
+        'stale_after': 5.0, 'standby': False, 'backoff_base': 0.05, 'backoff_max': 0.1,
+        'decoder': FrameDecoder('json', batches=False), **kwargs
+    }
+    return StreamSupervisor([MINI], url=url, **options)
+
+
+async def until(predicate, timeout=5.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "condition not reached in time"
+        await asyncio.sleep(0.02)
+
+
+def drain(sup):
+    messages = []
+    while not sup.queue.empty():
+        messages.append(sup.queue.get_nowait())
+    return messages
+
+
+def sequence(msg):
+    data = msg['data']
+    if isinstance(data, list):
+        return data[0]['E']
+    return data.get('u') or data.get('a')
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_base_stream_stall_reconnects_even_with_other_traffic():
+    async def script(n, ws):
+        if n == 1:
+            # miniTicker goes quiet while per-symbol ticks keep flowing.
+            await ws.send(mini(1))
+            for trade_id in range(1, 40):
+                await ws.send(agg(1, trade_id))
+                await asyncio.sleep(0.05)
+        else:
+            await ws.send(mini(2))
+
+    async def main():
+        async with FakeExchange(script) as exchange:
+            sup = supervisor(exchange.url, stale_after=0.4)
+            sup.start()
+            try:
+                await until(lambda: sup.connections[0].connects >= 2 and sup.connections[0].delivered >= 3)
+            finally:
+                await sup.stop()
+            return sup
+
+    sup = run(main())
+    conn = sup.connections[0]
+    assert conn.stalls >= 1
+    assert [m['data'][0]['E'] for m in drain(sup) if m['stream'] == MINI] == [1, 2]
+
+
+def test_staleness_follows_the_base_stream_not_fast_feed_ticks():
+    async def script(n, ws):
+        await ws.send(mini(1))
+        for trade_id in range(1, 100):
+            await ws.send(agg(1, trade_id))
+            await asyncio.sleep(0.02)
+
+    async def main():
+        async with FakeExchange(script) as exchange:
+            sup = supervisor(exchange.url)
+            sup.start()
+            try:
+                await until(lambda: sup.connections[0].frames >= 30)
+                return sup.staleness(), time.time() - sup.connections[0].last_frame_at
+            finally:
+                await sup.stop()
+
+    staleness, since_last_frame = run(main())
+    assert since_last_frame < 0.2
+    assert staleness >= 0.5
+
+
+def test_standby_failover_delivers_every_frame_once():
+    async def script(n, ws):
+        frames = range(1, 4) if n == 1 else range(1, 9)
+        for event_time in frames:
+            await ws.send(mini(event_time))
+            await asyncio.sleep(0.15 if event_time > 3 else 0.0)
+
+    async def main():
+        async with FakeExchange(script) as exchange:
+            sup = supervisor(exchange.url, stale_after=0.4, standby=True)
+            sup.start()
+            delivered = []
+            try:
+                while 8 not in delivered:
+                    msg = await asyncio.wait_for(sup.queue.get(), timeout=5)
+                    delivered.append(sequence(msg))
+                await asyncio.sleep(0.1)
+                delivered += [sequence(msg) for msg in drain(sup)]
+            finally:
+                await sup.stop()
+            return sup, delivered
+
+    sup, delivered = run(main())
+    assert delivered == list(range(1, 9))
+    assert sum(conn.duplicates + conn.late for conn in sup.connections) >= 3
+    assert sum(conn.stalls for conn in sup.connections) >= 1
+
+
+def test_per_symbol_streams_dedupe_by_trade_and_update_id():
+    async def script(n, ws):
+        # Same event time throughout: order comes from the a/u ids.
+        for raw in (agg(5, 1), agg(5, 2), agg(5, 2), agg(5, 1), book(5, 10), book(5, 10), book(5, 11)):
+            await ws.send(raw)
+
+    async def main():
+        async with FakeExchange(script) as exchange:
+            sup = supervisor(exchange.url)
+            sup.start()
+            try:
+                await until(lambda: sup.connections[0].frames >= 7)
+            finally:
+                await sup.stop()
+            return sup
+
+    sup = run(main())
+    conn = sup.connections[0]
+    assert [(m['stream'], sequence(m)) for m in drain(sup)] == [
+        ('btcusdt@aggTrade', 1), ('btcusdt@aggTrade', 2), ('btcusdt@bookTicker', 10), ('btcusdt@bookTicker', 11)
+    ]
+    assert conn.duplicates == 2
+    assert conn.late == 1
+
+
+def test_full_queue_drops_the_oldest_frames():
+    async def script(n, ws):
+        for event_time in range(1, 11):
+            await ws.send(mini(event_time))
+
+    async def main():
+        async with FakeExchange(script) as exchange:
+            sup = supervisor(exchange.url, queue_size=3)
+            sup.start()
+            try:
+                await until(lambda: sup.connections[0].delivered >= 10)
+            finally:
+                await sup.stop()
+            return sup
+
+    sup = run(main())
+    assert [sequence(msg) for msg in drain(sup)] == [8, 9, 10]
+    assert sup.overflow == 7
+
+
+def test_subscriptions_survive_a_closing_socket_and_are_resent_on_connect():
+    class ClosingSocket:
+        async def send(self, message):
+            raise ConnectionClosedOK(None, None)
+
+    async def script(n, ws):
+        await ws.send(mini(1))
+
+    async def main():
+        async with FakeExchange(script) as exchange:
+            sup = supervisor(exchange.url)
+            sup._sockets = {'primary': ClosingSocket()}
+            await sup.subscribe(['btcusdt@aggTrade'])
+            sup._sockets = {}
+
+            sup.start()
+            try:
+                await until(lambda: exchange.received)
+            finally:
+                await sup.stop()
+            return sup, exchange
+
+    sup, exchange = run(main())
+    assert sup._subscriptions == {'btcusdt@aggTrade'}
+    assert exchange.received[0]['method'] == 'SUBSCRIBE'
+    assert exchange.received[0]['params'] == ['btcusdt@aggTrade']
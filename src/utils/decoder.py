@@ -0,0 +1,152 @@
+import json
+from dataclasses import dataclass
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+MINI_TICKER_STREAM = '!miniTicker@arr'
+MINI_TICKER_EVENT = '24hrMiniTicker'
+_MINI_TICKER_BYTES = MINI_TICKER_STREAM.encode()
+
+
+@dataclass(slots=True)
+class TickerBatch:
+    """A decoded ``!miniTicker@arr`` payload reduced to s, c, q and E, as columns."""
+    symbols: list
+    closes: np.ndarray
+    volumes: np.ndarray
+    event_time: int = 0
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+if msgspec is not None:
+    class MiniTicker(msgspec.Struct):
+        s: str
+        c: float
+        q: float = 0.0
+        E: int = 0
+        e: str = ''
+
+    class MiniTickerMessage(msgspec.Struct):
+        stream: str
+        data: list[MiniTicker]
+
+
+def batch_from_dicts(tickers):
+    """TickerBatch from decoded ticker dicts; malformed entries are skipped."""
+    symbols = []
+    closes = []
+    volumes = []
+    event_time = 0
+
+    for ticker in tickers:
+        try:
+            if ticker['e'] != MINI_TICKER_EVENT:
+                continue
+            close = float(ticker['c'])
+            volume = float(ticker.get('q') or 0.0)
+            symbols.append(ticker['s'])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+        closes.append(close)
+        volumes.append(volume)
+        event_time = max(event_time, ticker.get('E', 0))
+
+    return TickerBatch(symbols, np.array(closes, dtype=np.float64), np.array(volumes, dtype=np.float64), event_time)
+
+
+def _batch_from_structs(tickers):
+    if any(t.e != MINI_TICKER_EVENT for t in tickers):
+        tickers = [t for t in tickers if t.e == MINI_TICKER_EVENT]
+    n = len(tickers)
+    return TickerBatch(
+        [t.s for t in tickers],
+        np.fromiter((t.c for t in tickers), dtype=np.float64, count=n),
+        np.fromiter((t.q for t in tickers), dtype=np.float64, count=n),
+        max((t.E for t in tickers), default=0),
+    )
+
+
+def available_backends():
+    backends = []
+    if msgspec is not None:
+        backends.append('msgspec')
+    if orjson is not None:
+        backends.append('orjson')
+    backends.append('json')
+    return backends
+
+
+class FrameDecoder:
+    """
+    Turns raw websocket text into the ``{"stream", "data"}`` message.
+
+    With ``batches`` on, ``!miniTicker@arr`` payloads come back as a
+    TickerBatch instead of a list of dicts: msgspec decodes them straight
+    into typed structs (numeric strings read as floats, other fields never
+    materialized), orjson and json decode to dicts that are then reduced.
+    Any other message is decoded generically. Only 24hrMiniTicker entries
+    make it into a batch. ``raw`` may be str or bytes. The backend can be
+    switched at any time with set_backend(); "auto" picks the fastest one
+    installed.
+    """
+
+    def __init__(self, backend='auto', batches=True):
+        self.batches = batches
+        self.stats = {'frames': 0, 'fallbacks': 0}
+        self.backend = None
+        self._loads = None
+        self._mini = None
+        self.set_backend(backend)
+
+    def set_backend(self, backend):
+        backends = available_backends()
+        if backend == 'auto':
+            backend = backends[0]
+        if backend not in backends:
+            raise ValueError(f"Decoder backend '{backend}' not available. Options: auto, {', '.join(backends)}")
+
+        if backend == 'msgspec':
+            loads = msgspec.json.Decoder().decode
+            mini = msgspec.json.Decoder(MiniTickerMessage, strict=False).decode
+        elif backend == 'orjson':
+            loads = orjson.loads
+            mini = None
+        else:
+            loads = json.loads
+            mini = None
+
+        self._loads = loads
+        self._mini = mini
+        self.backend = backend
+
+    def decode(self, raw):
+        marker = _MINI_TICKER_BYTES if isinstance(raw, (bytes, bytearray)) else MINI_TICKER_STREAM
+        if not self.batches or marker not in raw[:48]:
+            return self._loads(raw)
+
+        self.stats['frames'] += 1
+        mini = self._mini
+        if mini is not None:
+            try:
+                msg = mini(raw)
+                return {'stream': msg.stream, 'data': _batch_from_structs(msg.data)}
+            except msgspec.ValidationError:
+                # A malformed ticker fails the typed decode of the whole frame.
+                self.stats['fallbacks'] += 1
+
+        msg = self._loads(raw)
+        if isinstance(msg, dict) and isinstance(msg.get('data'), list):
+            msg['data'] = batch_from_dicts(msg['data'])
+        return msg
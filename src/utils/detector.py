@@ -0,0 +1,355 @@
+from collections import deque
+
+import numpy as np
+
+
+class SpikeDetector:
+    """
+    Base spike detector.
+
+    A detector owns the append path into a PriceHistory: every update stores
+    the sample, evicts whatever fell out of the window and returns the signed
+    percentage change when it crosses the threshold (None otherwise).
+    """
+
+    def __init__(self, history, threshold):
+        self.history = history
+        self.threshold = threshold
+
+    def add(self, symbol):
+        self.history.add(symbol)
+
+    def remove(self, symbol):
+        self.history.remove(symbol)
+
+    def reset(self, symbol):
+        self.history.reset(symbol)
+
+    def restore(self, symbol, times, prices):
+        """Loads saved or backfilled samples (oldest first) as the symbol's window."""
+        self.add(symbol)
+        self.history.restore(symbol, times, prices)
+
+    def update(self, symbol, now, price):
+        raise NotImplementedError
+
+    def peek(self, symbol, price):
+        """
+        Change a sample at ``price`` would produce right now, without storing
+        it (for sub-second ticks between two frames). None below threshold.
+        """
+        raise NotImplementedError
+
+    def near_threshold(self, rows, prices, ratio):
+        """Positions in the batch whose change reaches ``ratio`` * threshold."""
+        raise NotImplementedError
+
+    def update_batch(self, rows, now, prices):
+        """
+        Vectorized update for one frame (one sample per history row).
+
+        Returns ``(positions, changes)``: the positions in the batch whose
+        change crossed the threshold and the signed changes themselves.
+        """
+        positions = []
+        changes = []
+        for i, (row, price) in enumerate(zip(rows.tolist(), prices.tolist())):
+            change = self.update(self.history.symbol_at(row), now, price)
+            if change is not None:
+                positions.append(i)
+                changes.append(change)
+        return np.array(positions, dtype=np.int64), np.array(changes, dtype=np.float64)
+
+
+class OldestPriceDetector(SpikeDetector):
+    """Measures the change against the oldest sample still in the window."""
+
+    def update(self, symbol, now, price):
+        history = self.history
+        history.append(symbol, now, price)
+        history.evict(symbol, now)
+
+        if history.count(symbol) < 2:
+            return None
+
+        old_price = history.oldest(symbol)[1]
+        percentage_change = ((price - old_price) / old_price) * 100
+        if abs(percentage_change) >= self.threshold:
+            return percentage_change
+        return None
+
+    def update_batch(self, rows, now, prices):
+        history = self.history
+        history.append_batch(rows, now, prices)
+        history.evict_rows(rows, now)
+
+        head = history.head[rows]
+        count = history.tail[rows] - head
+        old_prices = history.prices[rows, head % history.capacity]
+        changes = ((prices - old_prices) / old_prices) * 100
+
+        positions = np.flatnonzero((count >= 2) & (np.abs(changes) >= self.threshold))
+        return positions, changes[positions]
+
+    def peek(self, symbol, price):
+        oldest = self.history.oldest(symbol)
+        if oldest is None:
+            return None
+        percentage_change = ((price - oldest[1]) / oldest[1]) * 100
+        if abs(percentage_change) >= self.threshold:
+            return percentage_change
+        return None
+
+    def near_threshold(self, rows, prices, ratio):
+        history = self.history
+        head = history.head[rows]
+        old_prices = history.prices[rows, head % history.capacity]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            changes = ((prices - old_prices) / old_prices) * 100
+        present = history.tail[rows] > head
+        return np.flatnonzero(present & (np.abs(changes) >= self.threshold * ratio))
+
+
+class MinMaxDetector(SpikeDetector):
+    """
+    Measures the change against the true window extreme.
+
+    Keeps two monotonic deques of sample sequence numbers per symbol: the
+    front of ``min`` is always the cheapest sample in the window and the
+    front of ``max`` the most expensive one, so both are amortized O(1).
+
+    The batch path does not touch the deques. It keeps per-row lower/upper
+    bounds of the window (they only widen, so they can include evicted
+    samples) as a cheap vectorized pre-filter, recomputes the exact extremes
+    for the few rows that pass it and marks the deques of every updated row
+    as stale; the per-tick path rebuilds stale deques on demand.
+    """
+
+    def __init__(self, history, threshold):
+        super().__init__(history, threshold)
+        self._min_q = {}
+        self._max_q = {}
+        self._lo = np.empty(0)
+        self._hi = np.empty(0)
+        self._stale = np.empty(0, dtype=bool)
+
+    def _ensure_rows(self):
+        rows = self.history.rows_allocated
+        if self._lo.shape[0] < rows:
+            extra = rows - self._lo.shape[0]
+            self._lo = np.concatenate([self._lo, np.full(extra, np.inf)])
+            self._hi = np.concatenate([self._hi, np.full(extra, -np.inf)])
+            self._stale = np.concatenate([self._stale, np.zeros(extra, dtype=bool)])
+
+    def _clear_bounds(self, row):
+        self._lo[row] = np.inf
+        self._hi[row] = -np.inf
+        self._stale[row] = False
+
+    def add(self, symbol):
+        super().add(symbol)
+        self._ensure_rows()
+        self._clear_bounds(self.history.row(symbol))
+        self._min_q.setdefault(symbol, deque())
+        self._max_q.setdefault(symbol, deque())
+
+    def remove(self, symbol):
+        super().remove(symbol)
+        self._min_q.pop(symbol, None)
+        self._max_q.pop(symbol, None)
+
+    def reset(self, symbol):
+        super().reset(symbol)
+        self._clear_bounds(self.history.row(symbol))
+        self._min_q[symbol].clear()
+        self._max_q[symbol].clear()
+
+    def restore(self, symbol, times, prices):
+        super().restore(symbol, times, prices)
+        row = self.history.row(symbol)
+        self._clear_bounds(row)
+        window = self.history.window_prices(symbol)
+        if window.size:
+            self._lo[row] = window.min()
+            self._hi[row] = window.max()
+        self._stale[row] = True
+
+    def _rebuild(self, symbol, row):
+        """Rebuilds both deques from the history row after batch updates."""
+        history = self.history
+        window = history.window_prices(symbol)
+        seqs = np.arange(int(history.head[row]), int(history.tail[row]))
+        self._stale[row] = False
+
+        if not window.size:
+            self._min_q[symbol] = deque()
+            self._max_q[symbol] = deque()
+            return
+
+        # A sample stays in the min deque only if it is strictly below every
+        # later sample (and symmetrically for the max deque).
+        keep = np.ones(window.size, dtype=bool)
+        keep[:-1] = window[:-1] < np.minimum.accumulate(window[::-1])[::-1][1:]
+        self._min_q[symbol] = deque(seqs[keep].tolist())
+
+        keep = np.ones(window.size, dtype=bool)
+        keep[:-1] = window[:-1] > np.maximum.accumulate(window[::-1])[::-1][1:]
+        self._max_q[symbol] = deque(seqs[keep].tolist())
+
+    def extremes(self, symbol):
+        """Returns (window_min, window_max) or None for an empty window."""
+        row = self.history.row(symbol)
+        if self._stale[row]:
+            self._rebuild(symbol, row)
+
+        min_q = self._min_q[symbol]
+        if not min_q:
+            return None
+        prices = self.history.prices[row]
+        capacity = self.history.capacity
+        return float(prices[min_q[0] % capacity]), float(prices[self._max_q[symbol][0] % capacity])
+
+    def update(self, symbol, now, price):
+        history = self.history
+        row = history.row(symbol)
+        if self._stale[row]:
+            self._rebuild(symbol, row)
+
+        seq = history.append(symbol, now, price)
+        history.evict(symbol, now)
+
+        head = history.head[row]
+        prices = history.prices[row]
+        capacity = history.capacity
+
+        min_q = self._min_q[symbol]
+        while min_q and prices[min_q[-1] % capacity] >= price:
+            min_q.pop()
+        min_q.append(seq)
+        while min_q[0] < head:
+            min_q.popleft()
+
+        max_q = self._max_q[symbol]
+        while max_q and prices[max_q[-1] % capacity] <= price:
+            max_q.pop()
+        max_q.append(seq)
+        while max_q[0] < head:
+            max_q.popleft()
+
+        window_min = prices[min_q[0] % capacity]
+        window_max = prices[max_q[0] % capacity]
+        self._lo[row] = window_min
+        self._hi[row] = window_max
+        return self._change(price, window_min, window_max)
+
+    def peek(self, symbol, price):
+        row = self.history.row(symbol)
+        lo = min(self._lo[row], price)
+        hi = max(self._hi[row], price)
+        if self._change(price, lo, hi) is None:
+            return None
+
+        # The bounds passed: confirm against the exact window.
+        extremes = self.extremes(symbol)
+        if extremes is None:
+            return None
+        window_min, window_max = extremes
+        self._lo[row] = window_min
+        self._hi[row] = window_max
+        return self._change(price, min(window_min, price), max(window_max, price))
+
+    def near_threshold(self, rows, prices, ratio):
+        lo = self._lo[rows]
+        hi = self._hi[rows]
+        limit = self.threshold * ratio
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rise = ((prices - lo) / lo) * 100
+            drop = ((hi - prices) / hi) * 100
+        candidates = np.flatnonzero((rise >= limit) | (drop >= limit))
+
+        # Bounds can still hold evicted extremes; tighten them for the
+        # candidates so a symbol is not kept armed by an old move.
+        positions = []
+        history = self.history
+        capacity = history.capacity
+        for i in candidates.tolist():
+            row = int(rows[i])
+            slots = np.arange(int(history.head[row]), int(history.tail[row])) % capacity
+            if not slots.size:
+                continue
+            window = history.prices[row, slots]
+            window_min = window.min()
+            window_max = window.max()
+            self._lo[row] = window_min
+            self._hi[row] = window_max
+
+            price = float(prices[i])
+            if window_min > 0 and (price - window_min) / window_min * 100 >= limit:
+                positions.append(i)
+            elif window_max > 0 and (window_max - price) / window_max * 100 >= limit:
+                positions.append(i)
+
+        return np.array(positions, dtype=np.int64)
+
+    def _change(self, price, window_min, window_max):
+        if window_min <= 0:
+            return None
+
+        rise = ((price - window_min) / window_min) * 100
+        drop = ((window_max - price) / window_max) * 100
+
+        if rise >= drop:
+            if rise >= self.threshold:
+                return float(rise)
+        elif drop >= self.threshold:
+            return float(-drop)
+        return None
+
+    def update_batch(self, rows, now, prices):
+        history = self.history
+        history.append_batch(rows, now, prices)
+        history.evict_rows(rows, now)
+        self._ensure_rows()
+
+        lo = np.minimum(self._lo[rows], prices)
+        hi = np.maximum(self._hi[rows], prices)
+        self._lo[rows] = lo
+        self._hi[rows] = hi
+        self._stale[rows] = True
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rise = ((prices - lo) / lo) * 100
+            drop = ((hi - prices) / hi) * 100
+        candidates = np.flatnonzero((rise >= self.threshold) | (drop >= self.threshold))
+
+        positions = []
+        changes = []
+        capacity = history.capacity
+        for i in candidates.tolist():
+            row = int(rows[i])
+            slots = np.arange(int(history.head[row]), int(history.tail[row])) % capacity
+            window = history.prices[row, slots]
+            window_min = window.min()
+            window_max = window.max()
+            self._lo[row] = window_min
+            self._hi[row] = window_max
+
+            change = self._change(float(prices[i]), window_min, window_max)
+            if change is not None:
+                positions.append(i)
+                changes.append(change)
+
+        return np.array(positions, dtype=np.int64), np.array(changes, dtype=np.float64)
+
+
+DETECTORS = {
+    'oldest': OldestPriceDetector,
+    'minmax': MinMaxDetector,
+}
+
+
+def create_detector(name, history, threshold):
+    try:
+        return DETECTORS[name](history, threshold)
+    except KeyError:
+        raise ValueError(f"Unknown detector '{name}'. Options: {', '.join(DETECTORS)}")
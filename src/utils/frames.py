@@ -0,0 +1,44 @@
+import numpy as np
+
+from utils.decoder import TickerBatch
+
+
+def parse_mini_ticker_frame(tickers, index):
+    """
+    Parses the payload of one !miniTicker@arr frame into arrays.
+
+    Only 24hrMiniTicker events whose symbol is in ``index`` (symbol ->
+    history row) are kept; malformed entries are skipped. Returns
+    ``(rows, closes, volumes)``. ``tickers`` is the list of ticker dicts or
+    an already decoded TickerBatch.
+    """
+    if isinstance(tickers, TickerBatch):
+        rows = np.fromiter((index.get(s, -1) for s in tickers.symbols), dtype=np.int64, count=len(tickers))
+        keep = rows >= 0
+        return rows[keep], tickers.closes[keep], tickers.volumes[keep]
+
+    rows = []
+    closes = []
+    volumes = []
+
+    for ticker in tickers:
+        try:
+            if ticker.get('e') != '24hrMiniTicker':
+                continue
+            row = index.get(ticker['s'])
+            if row is None:
+                continue
+            close = float(ticker['c'])
+            volume = float(ticker.get('q') or 0.0)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+
+        rows.append(row)
+        closes.append(close)
+        volumes.append(volume)
+
+    return (
+        np.array(rows, dtype=np.int64),
+        np.array(closes, dtype=np.float64),
+        np.array(volumes, dtype=np.float64),
+    )
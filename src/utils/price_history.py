@@ -0,0 +1,245 @@
+import numpy as np
+
+
+class PriceHistory:
+    """
+    Compact per-symbol price history.
+
+    Every symbol owns one row of two preallocated float64 matrices (times and
+    prices) used as a fixed-capacity ring buffer. Samples are addressed by a
+    monotonically increasing sequence number: a row holds the samples in
+    ``[head, tail)`` and sample ``seq`` lives in slot ``seq % capacity``.
+    Appending and evicting the window head are O(1) and allocate nothing.
+    """
+
+    def __init__(self, window, capacity, rows=256):
+        self.window = float(window)
+        self.capacity = int(capacity)
+        self._rows = {}
+        self._symbols = [None] * rows
+        self._free = []
+        self._next_row = 0
+        self.times = np.zeros((rows, self.capacity), dtype=np.float64)
+        self.prices = np.zeros((rows, self.capacity), dtype=np.float64)
+        self.head = np.zeros(rows, dtype=np.int64)
+        self.tail = np.zeros(rows, dtype=np.int64)
+
+    def __contains__(self, symbol):
+        return symbol in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def symbols(self):
+        return self._rows.keys()
+
+    @property
+    def index(self):
+        """Read-only view of the symbol -> row mapping."""
+        return self._rows
+
+    @property
+    def rows_allocated(self):
+        return self.times.shape[0]
+
+    def row(self, symbol):
+        return self._rows[symbol]
+
+    def symbol_at(self, row):
+        return self._symbols[row]
+
+    def _grow(self):
+        rows = self.times.shape[0] * 2
+        for name in ('times', 'prices'):
+            old = getattr(self, name)
+            new = np.zeros((rows, self.capacity), dtype=np.float64)
+            new[:old.shape[0]] = old
+            setattr(self, name, new)
+        for name in ('head', 'tail'):
+            old = getattr(self, name)
+            new = np.zeros(rows, dtype=np.int64)
+            new[:old.shape[0]] = old
+            setattr(self, name, new)
+        self._symbols.extend([None] * (rows - len(self._symbols)))
+
+    def add(self, symbol):
+        """Reserves an empty row for a symbol."""
+        if symbol in self._rows:
+            return self._rows[symbol]
+
+        if self._free:
+            row = self._free.pop()
+        else:
+            if self._next_row == self.times.shape[0]:
+                self._grow()
+            row = self._next_row
+            self._next_row += 1
+
+        self.head[row] = 0
+        self.tail[row] = 0
+        self._rows[symbol] = row
+        self._symbols[row] = symbol
+        return row
+
+    def remove(self, symbol):
+        row = self._rows.pop(symbol, None)
+        if row is not None:
+            self.head[row] = self.tail[row] = 0
+            self._symbols[row] = None
+            self._free.append(row)
+
+    def append(self, symbol, t, price):
+        row = self._rows[symbol]
+        tail = int(self.tail[row])
+
+        # Full ring: overwrite the oldest sample.
+        if tail - int(self.head[row]) == self.capacity:
+            self.head[row] += 1
+
+        slot = tail % self.capacity
+        self.times[row, slot] = t
+        self.prices[row, slot] = price
+        self.tail[row] = tail + 1
+        return tail
+
+    def append_batch(self, rows, t, prices):
+        """
+        Vectorized append of one sample per row (rows must be unique, which
+        holds for a single !miniTicker@arr frame).
+        """
+        tail = self.tail[rows]
+        full = (tail - self.head[rows]) == self.capacity
+        if full.any():
+            self.head[rows[full]] += 1
+
+        slots = tail % self.capacity
+        self.times[rows, slots] = t
+        self.prices[rows, slots] = prices
+        self.tail[rows] = tail + 1
+
+    def evict(self, symbol, now):
+        """Drops samples older than the window from the head of one row."""
+        row = self._rows[symbol]
+        cutoff = now - self.window
+        head = int(self.head[row])
+        tail = int(self.tail[row])
+        times = self.times[row]
+        capacity = self.capacity
+
+        while head < tail and times[head % capacity] < cutoff:
+            head += 1
+        self.head[row] = head
+
+    def evict_all(self, now):
+        """Vectorized window-head eviction over every row."""
+        self.evict_rows(np.arange(self._next_row), now)
+
+    def evict_rows(self, rows, now):
+        """Vectorized window-head eviction over the given (unique) rows."""
+        cutoff = now - self.window
+        while rows.size:
+            head = self.head[rows]
+            stale = (head < self.tail[rows]) & (self.times[rows, head % self.capacity] < cutoff)
+            rows = rows[stale]
+            self.head[rows] += 1
+
+    def count(self, symbol):
+        row = self._rows[symbol]
+        return int(self.tail[row] - self.head[row])
+
+    def oldest(self, symbol):
+        """Returns (time, price) of the oldest sample still in the row, or None."""
+        row = self._rows[symbol]
+        head = int(self.head[row])
+        if head == self.tail[row]:
+            return None
+        slot = head % self.capacity
+        return float(self.times[row, slot]), float(self.prices[row, slot])
+
+    def latest(self, symbol):
+        row = self._rows[symbol]
+        tail = int(self.tail[row])
+        if tail == self.head[row]:
+            return None
+        slot = (tail - 1) % self.capacity
+        return float(self.times[row, slot]), float(self.prices[row, slot])
+
+    def window_prices(self, symbol):
+        """Returns a copy of the prices in the row, oldest first."""
+        row = self._rows[symbol]
+        head = int(self.head[row])
+        tail = int(self.tail[row])
+        slots = np.arange(head, tail) % self.capacity
+        return self.prices[row, slots]
+
+    def window_samples(self, symbol):
+        """Returns copies of the (times, prices) in the row, oldest first."""
+        row = self._rows[symbol]
+        slots = np.arange(int(self.head[row]), int(self.tail[row])) % self.capacity
+        return self.times[row, slots], self.prices[row, slots]
+
+    def restore(self, symbol, times, prices):
+        """
+        Replaces a symbol's row with the given samples (oldest first), keeping
+        the newest ``capacity`` of them. Sequence numbers restart at 0.
+        """
+        row = self.add(symbol)
+        n = min(len(times), self.capacity)
+        if n:
+            self.times[row, :n] = times[-n:]
+            self.prices[row, :n] = prices[-n:]
+        self.head[row] = 0
+        self.tail[row] = n
+
+    def rings(self):
+        """
+        Cheap copy of the raw state for a snapshot: the ring rows in use and
+        the head/tail of every symbol (contiguous copies, no reordering).
+        Pass it to export_rings(), e.g. from a worker thread.
+        """
+        symbols = list(self._rows)
+        rows = np.array([self._rows[s] for s in symbols], dtype=np.int64)
+        used = self._next_row
+        return (
+            self.capacity, symbols, rows, self.head[rows], self.tail[rows],
+            self.times[:used].copy(), self.prices[:used].copy()
+        )
+
+    def export(self):
+        """
+        Copies every row out for a snapshot. Returns ``(symbols, counts,
+        times, prices)``: the samples of all symbols concatenated in
+        ``symbols`` order, ``counts[i]`` of them for symbols[i].
+        """
+        return export_rings(self.rings())
+
+    def reset(self, symbol):
+        """Empties one row (after an alert the window starts again)."""
+        row = self._rows[symbol]
+        self.head[row] = self.tail[row]
+
+    def memory_usage(self):
+        allocated = sum(a.nbytes for a in (self.times, self.prices, self.head, self.tail))
+        samples = 0
+        for row in self._rows.values():
+            samples += int(self.tail[row] - self.head[row])
+        return {
+            'symbols': len(self._rows),
+            'rows_allocated': self.rows_allocated,
+            'capacity': self.capacity,
+            'samples': samples,
+            'bytes_allocated': allocated,
+            'bytes_used': samples * 2 * self.times.itemsize,
+        }
+
+
+def export_rings(rings):
+    """Turns PriceHistory.rings() into the (symbols, counts, times, prices) of export()."""
+    capacity, symbols, rows, head, tail, times, prices = rings
+    counts = tail - head
+
+    owner = np.repeat(rows, counts)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    seqs = np.repeat(head, counts) + np.arange(int(counts.sum())) - starts
+    slots = seqs % capacity
+    return symbols, counts, times[owner, slots], prices[owner, slots]
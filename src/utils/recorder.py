@@ -0,0 +1,242 @@
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from utils.decoder import TickerBatch
+
+# One file per column inside a segment directory; every column is a flat,
+# fixed-width little-endian array, so a segment can be opened with np.memmap.
+COLUMNS = {
+    'time': np.dtype('<f8'),
+    'symbol': np.dtype('<u4'),
+    'close': np.dtype('<f8'),
+    'volume': np.dtype('<f8'),
+}
+SYMBOLS_FILE = 'symbols.json'
+
+
+class TickRecorder:
+    """
+    Append-only recorder of raw mini-ticker updates.
+
+    record() only hands the frame to a bounded queue; a background thread
+    parses it into (recv time, symbol id, close, quote volume) columns,
+    buffers them and appends them to the current segment. Segments rotate
+    every ``segment_seconds`` and stay memory-mappable column files, unless
+    ``compress`` is set: closed segments then become .npz archives, which
+    are smaller but are read into memory. Symbol ids index the list stored in ``symbols.json``. Writer
+    errors go to ``log`` (called from the writer thread, so it must be
+    thread-safe, like log_event).
+    """
+
+    def __init__(self, directory, segment_seconds=3600, compress=False, queue_size=10_000,
+                 flush_ticks=50_000, flush_interval=1.0, log=print):
+        self.directory = directory
+        self.log = log
+        self.segment_seconds = segment_seconds
+        self.compress = compress
+        self.flush_ticks = flush_ticks
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._symbols = load_symbols(directory)
+        self._ids = {symbol: i for i, symbol in enumerate(self._symbols)}
+        self._segment = None
+        self._segment_start = 0.0
+        self._files = {}
+        self._buffers = {name: [] for name in COLUMNS}
+        self._buffered = 0
+        self.stats = {'frames': 0, 'ticks': 0, 'dropped': 0, 'segments': 0, 'errors': 0}
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            os.makedirs(self.directory, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name="tick-recorder", daemon=True)
+            self._thread.start()
+
+    def record(self, recv_time, tickers):
+        """Queues one frame without blocking; returns False if it was dropped."""
+        try:
+            self._queue.put_nowait((recv_time, tickers))
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+
+    def close(self):
+        """Writes everything still queued, finalizes the open segment and stops the thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        last_flush = time.monotonic()
+
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = False
+
+            if item is None:
+                break
+
+            try:
+                if item:
+                    self._append(*item)
+                if self._buffered >= self.flush_ticks or time.monotonic() - last_flush >= self.flush_interval:
+                    self._flush()
+                    last_flush = time.monotonic()
+            except Exception as e:
+                self.stats['errors'] += 1
+                self.log(f"❌ [RECORDER] Error writing ticks: {e}")
+
+        try:
+            self._flush()
+            self._finish_segment()
+        except Exception as e:
+            self.log(f"❌ [RECORDER] Error closing segment: {e}")
+
+    def _append(self, recv_time, tickers):
+        if self._segment is None or recv_time - self._segment_start >= self.segment_seconds:
+            self._flush()
+            self._finish_segment()
+            self._open_segment(recv_time)
+
+        if isinstance(tickers, TickerBatch):
+            self._append_batch(recv_time, tickers)
+            return
+
+        symbols = []
+        closes = []
+        volumes = []
+        new_symbols = False
+
+        for ticker in tickers:
+            try:
+                symbol = ticker['s']
+                close = float(ticker['c'])
+                volume = float(ticker.get('q') or 0.0)
+            except (KeyError, TypeError, ValueError, AttributeError):
+                continue
+
+            symbol_id = self._ids.get(symbol)
+            if symbol_id is None:
+                symbol_id = self._ids[symbol] = len(self._symbols)
+                self._symbols.append(symbol)
+                new_symbols = True
+
+            symbols.append(symbol_id)
+            closes.append(close)
+            volumes.append(volume)
+
+        if new_symbols:
+            self._save_symbols()
+
+        self._buffer(recv_time, np.array(symbols, dtype=np.uint32), np.array(closes), np.array(volumes))
+
+    def _append_batch(self, recv_time, batch):
+        new_symbols = False
+        for symbol in batch.symbols:
+            if symbol not in self._ids:
+                self._ids[symbol] = len(self._symbols)
+                self._symbols.append(symbol)
+                new_symbols = True
+        if new_symbols:
+            self._save_symbols()
+
+        ids = np.fromiter((self._ids[symbol] for symbol in batch.symbols), dtype=np.uint32, count=len(batch))
+        self._buffer(recv_time, ids, batch.closes, batch.volumes)
+
+    def _buffer(self, recv_time, symbols, closes, volumes):
+        n = len(symbols)
+        self._buffers['time'].append(np.full(n, recv_time))
+        self._buffers['symbol'].append(symbols)
+        self._buffers['close'].append(closes)
+        self._buffers['volume'].append(volumes)
+        self._buffered += n
+        self.stats['frames'] += 1
+        self.stats['ticks'] += n
+
+    def _flush(self):
+        if not self._buffered:
+            return
+        for name, dtype in COLUMNS.items():
+            f = self._files[name]
+            np.concatenate(self._buffers[name]).astype(dtype, copy=False).tofile(f)
+            f.flush()
+            self._buffers[name].clear()
+        self._buffered = 0
+
+    def _open_segment(self, start):
+        stamp = datetime.fromtimestamp(start, tz=timezone.utc).strftime('%Y%m%d-%H%M%S')
+        self._segment = os.path.join(self.directory, stamp)
+        self._segment_start = start
+        os.makedirs(self._segment, exist_ok=True)
+        self._files = {name: open(os.path.join(self._segment, f"{name}.bin"), 'ab') for name in COLUMNS}
+        self.stats['segments'] += 1
+
+    def _finish_segment(self):
+        if self._segment is None:
+            return
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+        if self.compress:
+            columns = {name: np.array(column) for name, column in load_segment(self._segment).items()}
+            np.savez_compressed(f"{self._segment}.npz", **columns)
+            shutil.rmtree(self._segment)
+        self._segment = None
+
+    def _save_symbols(self):
+        path = os.path.join(self.directory, SYMBOLS_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._symbols, f)
+        os.replace(tmp_path, path)
+
+
+def load_symbols(directory):
+    path = os.path.join(directory, SYMBOLS_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def list_segments(directory):
+    """Segment paths in time order (open segment directories and .npz archives)."""
+    if not os.path.isdir(directory):
+        return []
+    names = [n for n in os.listdir(directory) if n != SYMBOLS_FILE and not n.endswith('.tmp')]
+    return [os.path.join(directory, n) for n in sorted(names)]
+
+
+def load_segment(path):
+    """
+    Returns the columns of a segment as {name: array}. Segment directories,
+    closed or open (read while it is being written), are memory-mapped;
+    .npz archives of RECORDER_COMPRESS are decompressed into memory.
+    """
+    if path.endswith('.npz'):
+        with np.load(path) as data:
+            return {name: data[name] for name in COLUMNS}
+
+    sizes = {name: os.path.getsize(os.path.join(path, f"{name}.bin")) // dtype.itemsize
+             for name, dtype in COLUMNS.items()}
+    n = min(sizes.values())
+    if not n:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+    return {
+        name: np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode='r', shape=(n,))
+        for name, dtype in COLUMNS.items()
+    }
@@ -0,0 +1,175 @@
+import queue
+import zlib
+
+import numpy as np
+
+from utils.detector import create_detector
+from utils.price_history import PriceHistory
+from utils.shm_ring import ShmRing, FRAME
+
+
+def shard_of(symbol, shards):
+    """Stable shard for a symbol (crc32: Python's hash() differs per process)."""
+    return zlib.crc32(symbol.encode()) % shards
+
+
+class ShardScanner:
+    """
+    Detection state of one shard: its own PriceHistory and detector for the
+    symbols routed to it, plus the TP/SL trigger bands of its open trades.
+
+    Events go to ``emit`` as tuples:
+    ``('signal', symbol, change, price, volume, time)``,
+    ``('trade', symbol, price)`` when a trigger band is crossed and
+    ``('armed', shard, symbols)`` when the near-threshold set changes.
+    """
+
+    def __init__(self, shard, emit, time_window, history_capacity, detector, threshold, arm_ratio):
+        self.shard = shard
+        self.emit = emit
+        self.arm_ratio = arm_ratio
+        self.history = PriceHistory(time_window, history_capacity)
+        self.detector = create_detector(detector, self.history, threshold)
+        self.symbols = {}
+        self.rows = np.full(256, -1, dtype=np.int64)
+        self.volumes = {}
+        self.bands = {}
+        self.armed = set()
+
+    def add(self, entries):
+        for symbol_id, symbol in entries:
+            if symbol_id >= self.rows.shape[0]:
+                grown = np.full(max(symbol_id + 1, 2 * self.rows.shape[0]), -1, dtype=np.int64)
+                grown[:self.rows.shape[0]] = self.rows
+                self.rows = grown
+            self.detector.add(symbol)
+            self.symbols[symbol_id] = symbol
+            self.rows[symbol_id] = self.history.row(symbol)
+
+    def remove(self, ids):
+        for symbol_id in ids:
+            symbol = self.symbols.pop(symbol_id, None)
+            if symbol is None:
+                continue
+            self.detector.remove(symbol)
+            self.rows[symbol_id] = -1
+            self.volumes.pop(symbol_id, None)
+            self.bands.pop(symbol_id, None)
+            self.armed.discard(symbol)
+
+    def set_bands(self, changes):
+        for symbol_id, band in changes.items():
+            if band is None:
+                self.bands.pop(symbol_id, None)
+            else:
+                self.bands[symbol_id] = band
+
+    def _check_band(self, symbol_id, price):
+        band = self.bands.get(symbol_id)
+        if band is not None and (price <= band[0] or price >= band[1]):
+            self.emit(('trade', self.symbols[symbol_id], price))
+
+    def process(self, batch):
+        """Handles a popped batch, split into runs of one frame or one tick."""
+        if not len(batch):
+            return
+        times = batch['time']
+        kinds = batch['kind']
+        cuts = np.flatnonzero((times[1:] != times[:-1]) | (kinds[1:] != kinds[:-1])) + 1
+
+        for group in np.split(batch, cuts):
+            if group['kind'][0] == FRAME:
+                self._frame(group)
+            else:
+                for record in group:
+                    self._tick(record)
+
+    def _frame(self, group):
+        ids = group['id'].astype(np.int64)
+        known = ids < self.rows.shape[0]
+        known[known] = self.rows[ids[known]] >= 0
+        group = group[known]
+        if not len(group):
+            return
+
+        ids = ids[known]
+        rows = self.rows[ids]
+        prices = group['price']
+        volumes = group['volume']
+        now = float(group['time'][0])
+
+        positions, changes = self.detector.update_batch(rows, now, prices)
+        for i, change in zip(positions.tolist(), changes.tolist()):
+            symbol = self.history.symbol_at(int(rows[i]))
+            self.emit(('signal', symbol, change, float(prices[i]), float(volumes[i]), now))
+            self.detector.reset(symbol)
+
+        if self.bands:
+            position = dict(zip(ids.tolist(), range(len(ids))))
+            for symbol_id in list(self.bands):
+                i = position.get(symbol_id)
+                if i is not None:
+                    self._check_band(symbol_id, float(prices[i]))
+
+        if self.arm_ratio:
+            self.volumes.update(zip(ids.tolist(), volumes.tolist()))
+            armed = {
+                self.history.symbol_at(int(rows[i]))
+                for i in self.detector.near_threshold(rows, prices, self.arm_ratio).tolist()
+            }
+            if armed != self.armed:
+                self.armed = armed
+                self.emit(('armed', self.shard, sorted(armed)))
+
+    def _tick(self, record):
+        symbol_id = int(record['id'])
+        symbol = self.symbols.get(symbol_id)
+        if symbol is None:
+            return
+        price = float(record['price'])
+        self._check_band(symbol_id, price)
+
+        change = self.detector.peek(symbol, price)
+        if change is not None:
+            self.emit(('signal', symbol, change, price, self.volumes.get(symbol_id, 0.0), float(record['time'])))
+            self.detector.reset(symbol)
+
+
+def run_worker(shard, ring_name, ring_size, ready, control, events, time_window, history_capacity,
+               detector, threshold, arm_ratio):
+    """
+    Worker process entry point. Sleeps on ``ready`` until the coordinator
+    pushed ticks or control messages, then drains both. Control messages:
+    ``('add', [(id, symbol), ...])``, ``('remove', [id, ...])``,
+    ``('bands', {id: (low, high) | None})`` and ``('stop',)``.
+    """
+    ring = ShmRing.attach(ring_name, ring_size)
+    scanner = ShardScanner(shard, events.put, time_window, history_capacity, detector, threshold, arm_ratio)
+
+    try:
+        while True:
+            ready.wait(0.5)
+            ready.clear()
+
+            while True:
+                try:
+                    message = control.get_nowait()
+                except queue.Empty:
+                    break
+                if message[0] == 'stop':
+                    return
+                if message[0] == 'add':
+                    scanner.add(message[1])
+                elif message[0] == 'remove':
+                    scanner.remove(message[1])
+                elif message[0] == 'bands':
+                    scanner.set_bands(message[1])
+
+            try:
+                scanner.process(ring.pop())
+            except Exception as e:
+                events.put(('error', shard, repr(e)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
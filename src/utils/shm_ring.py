@@ -0,0 +1,102 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# One tick fanned out to a scan worker. ``kind`` tells a frame sample (stored
+# in the history) from a per-symbol stream tick (only checked).
+RECORD = np.dtype([
+    ('time', 'f8'),
+    ('id', 'i4'),
+    ('kind', 'i4'),
+    ('price', 'f8'),
+    ('volume', 'f8'),
+])
+
+FRAME = 0
+TICK = 1
+
+HEADER = 128
+_HEAD = 0   # int64 slot written by the consumer only
+_TAIL = 8   # int64 slot written by the producer only (own cache line)
+
+
+class ShmRing:
+    """
+    Single-producer / single-consumer ring of RECORDs in shared memory.
+
+    The header holds two monotonically increasing counters: ``tail`` is only
+    written by the producer after the records are copied in, ``head`` only by
+    the consumer after it copied them out, so no lock is needed. A push that
+    does not fit is dropped whole (and counted) instead of blocking the
+    producer, which keeps frames intact on the consumer side.
+    """
+
+    def __init__(self, shm, capacity, owner):
+        self.shm = shm
+        self.capacity = capacity
+        self.owner = owner
+        self.dropped = 0
+        self._counters = np.ndarray((HEADER // 8,), dtype=np.int64, buffer=shm.buf)
+        self._records = np.ndarray((capacity,), dtype=RECORD, buffer=shm.buf, offset=HEADER)
+
+    @classmethod
+    def create(cls, capacity):
+        shm = shared_memory.SharedMemory(create=True, size=HEADER + capacity * RECORD.itemsize)
+        ring = cls(shm, capacity, owner=True)
+        ring._counters[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, capacity):
+        return cls(shared_memory.SharedMemory(name=name), capacity, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __len__(self):
+        return int(self._counters[_TAIL] - self._counters[_HEAD])
+
+    def push(self, batch):
+        """Appends ``batch`` (a RECORD array); False if it did not fit."""
+        n = len(batch)
+        if not n:
+            return True
+        head = int(self._counters[_HEAD])
+        tail = int(self._counters[_TAIL])
+        if tail + n - head > self.capacity:
+            self.dropped += n
+            return False
+
+        start = tail % self.capacity
+        first = min(n, self.capacity - start)
+        self._records[start:start + first] = batch[:first]
+        if first < n:
+            self._records[:n - first] = batch[first:]
+        self._counters[_TAIL] = tail + n
+        return True
+
+    def pop(self, limit=None):
+        """Copies out and releases up to ``limit`` records (all by default)."""
+        head = int(self._counters[_HEAD])
+        tail = int(self._counters[_TAIL])
+        n = tail - head if limit is None else min(tail - head, limit)
+        if n <= 0:
+            return np.empty(0, dtype=RECORD)
+
+        start = head % self.capacity
+        first = min(n, self.capacity - start)
+        if first == n:
+            out = self._records[start:start + n].copy()
+        else:
+            out = np.concatenate((self._records[start:], self._records[:n - first]))
+        self._counters[_HEAD] = head + n
+        return out
+
+    def close(self):
+        # Views on the buffer must go before the mapping can be closed.
+        self._counters = None
+        self._records = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
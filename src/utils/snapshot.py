@@ -0,0 +1,72 @@
+import json
+import os
+
+import numpy as np
+
+HISTORY_FILE = 'history.npy'
+META_FILE = 'snapshot.json'
+
+
+def write_snapshot(directory, symbols, counts, times, prices, trades, saved_at):
+    """
+    Writes a history export (see PriceHistory.export) and open trades.
+
+    Samples go to ``history.npy`` as an (n, 2) float64 array of (time,
+    price), readable with mmap_mode='r'; ``snapshot.json`` holds the symbol
+    table, the per-symbol counts and the trade states. Each file is replaced
+    atomically and the metadata is written last, so a reader never pairs it
+    with a partial sample file.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    history_path = os.path.join(directory, HISTORY_FILE)
+    with open(f"{history_path}.tmp", 'wb') as f:
+        np.save(f, np.column_stack((times, prices)))
+    os.replace(f"{history_path}.tmp", history_path)
+
+    meta_path = os.path.join(directory, META_FILE)
+    with open(f"{meta_path}.tmp", 'w') as f:
+        json.dump({
+            'saved_at': saved_at,
+            'samples': int(len(times)),
+            'symbols': symbols,
+            'counts': [int(c) for c in counts],
+            'trades': trades,
+        }, f, separators=(',', ':'))
+    os.replace(f"{meta_path}.tmp", meta_path)
+
+
+def read_snapshot(directory, now, window):
+    """
+    Loads a snapshot, dropping samples older than ``now - window``.
+
+    Returns ``(series, trades, saved_at)`` where ``series`` maps each symbol
+    to its (times, prices) arrays. A missing or inconsistent snapshot gives
+    ``({}, [], None)``.
+    """
+    meta_path = os.path.join(directory, META_FILE)
+    history_path = os.path.join(directory, HISTORY_FILE)
+    if not os.path.exists(meta_path) or not os.path.exists(history_path):
+        return {}, [], None
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+
+    samples = np.load(history_path, mmap_mode='r')
+    if samples.shape != (meta['samples'], 2) or sum(meta['counts']) != meta['samples']:
+        return {}, [], None
+
+    cutoff = now - window
+    series = {}
+    start = 0
+    for symbol, count in zip(meta['symbols'], meta['counts']):
+        times = samples[start:start + count, 0]
+        keep = np.searchsorted(times, cutoff, side='left')
+        if keep < count:
+            series[symbol] = (
+                np.array(times[keep:]),
+                np.array(samples[start + keep:start + count, 1]),
+            )
+        start += count
+
+    return series, meta['trades'], meta['saved_at']
@@ -0,0 +1,109 @@
+import json
+import os
+import time
+from collections import namedtuple
+
+SymbolFilters = namedtuple(
+    'SymbolFilters',
+    ['price_precision', 'qty_precision', 'tick_size', 'step_size', 'min_qty', 'min_notional']
+)
+
+
+def parse_exchange_info(info):
+    """Builds {symbol: SymbolFilters} from a futures exchangeInfo payload."""
+    filters = {}
+
+    for s in info.get('symbols', []):
+        price_precision = s.get('pricePrecision', 2)
+        qty_precision = s.get('quantityPrecision', 3)
+        tick_size = None
+        step_size = None
+        min_qty = 0.0
+        min_notional = 0.0
+
+        for f in s.get('filters', []):
+            if f['filterType'] == 'PRICE_FILTER':
+                tick_size = float(f['tickSize'])
+            elif f['filterType'] == 'LOT_SIZE':
+                step_size = float(f['stepSize'])
+                min_qty = float(f.get('minQty', 0))
+            elif f['filterType'] == 'MIN_NOTIONAL':
+                min_notional = float(f.get('notional', f.get('minNotional', 0)))
+
+        if tick_size is None:
+            tick_size = 1 / (10**price_precision)
+        if step_size is None:
+            step_size = 1 / (10**qty_precision)
+
+        filters[s['symbol']] = SymbolFilters(
+            price_precision, qty_precision, tick_size, step_size, min_qty, min_notional
+        )
+
+    return filters
+
+
+class SymbolFilterIndex:
+    """
+    Per-symbol order filters, built once from exchangeInfo.
+
+    The index is considered stale after ``ttl`` seconds or when mark_stale()
+    is called (e.g. after the coin list refresh). It is persisted to ``path``
+    as one compact row per symbol so a restart can reuse it.
+    """
+
+    def __init__(self, ttl, path=None):
+        self.ttl = ttl
+        self.path = path
+        self.updated = 0.0
+        self._filters = {}
+        self._stale = True
+
+    def __len__(self):
+        return len(self._filters)
+
+    def get(self, symbol):
+        return self._filters.get(symbol)
+
+    def is_stale(self):
+        return self._stale or time.time() - self.updated > self.ttl
+
+    def mark_stale(self):
+        self._stale = True
+
+    def update(self, info):
+        self._filters = parse_exchange_info(info)
+        self.updated = time.time()
+        self._stale = False
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'updated': self.updated,
+                'fields': SymbolFilters._fields,
+                'symbols': {symbol: list(row) for symbol, row in self._filters.items()},
+            }, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """Warm start from disk. Returns True if a fresh-enough index was loaded."""
+        if not self.path or not os.path.exists(self.path):
+            return False
+
+        with open(self.path) as f:
+            data = json.load(f)
+
+        if tuple(data.get('fields', ())) != SymbolFilters._fields:
+            return False
+
+        self._filters = {symbol: SymbolFilters(*row) for symbol, row in data['symbols'].items()}
+        self.updated = data['updated']
+        self._stale = False
+        return not self.is_stale()
@@ -0,0 +1,63 @@
+import math
+import time
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel.
+
+    Timers live in one of ``slots`` buckets, each ``tick`` seconds wide;
+    deadlines further away than one revolution carry a remaining-rounds
+    counter. Scheduling and cancelling are O(1) dict operations and
+    advancing the wheel only touches the buckets that the clock passes.
+    """
+
+    def __init__(self, tick=1.0, slots=512, now=None):
+        self.tick = tick
+        self._slots = [{} for _ in range(slots)]
+        self._where = {}
+        self._cursor = 0
+        self._time = time.time() if now is None else now
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, key):
+        return key in self._where
+
+    def schedule(self, key, deadline):
+        """Schedules (or reschedules) ``key`` to expire at ``deadline``."""
+        self.cancel(key)
+
+        n = len(self._slots)
+        ticks = max(1, math.ceil((deadline - self._time) / self.tick))
+        slot = (self._cursor + ticks) % n
+        self._slots[slot][key] = [deadline, (ticks - 1) // n]
+        self._where[key] = slot
+
+    def cancel(self, key):
+        slot = self._where.pop(key, None)
+        if slot is not None:
+            del self._slots[slot][key]
+
+    def advance(self, now):
+        """Moves the wheel up to ``now`` and returns the keys that expired."""
+        expired = []
+        n = len(self._slots)
+
+        while self._time + self.tick <= now:
+            self._time += self.tick
+            self._cursor = (self._cursor + 1) % n
+            bucket = self._slots[self._cursor]
+            if not bucket:
+                continue
+
+            for key, entry in list(bucket.items()):
+                if entry[1] == 0:
+                    del bucket[key]
+                    del self._where[key]
+                    expired.append(key)
+                else:
+                    entry[1] -= 1
+
+        return expired